@@ -1,55 +1,301 @@
 import os
-import platform
-import serial.tools.list_ports
+import json
+import functools
 from datetime import datetime
 from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+ENV_PREFIX = "RVM_"
+CONFIG_FILE_ENV = "RVM_CONFIG_FILE"
+
+@functools.lru_cache(maxsize=None)
+def find_arduino_port(vid: Optional[int] = None,
+                      pid: Optional[int] = None,
+                      serial_number: Optional[str] = None) -> str:
+    """Locate the Arduino serial port, cached per USB VID/PID/serial number"""
+    # Imported here so that importing the settings module never touches USB
+    import serial.tools.list_ports
 
-def find_arduino_port():
     ports = serial.tools.list_ports.comports()
+
+    # Prefer an exact USB identity match when one is configured
+    if vid is not None or pid is not None or serial_number:
+        for port in ports:
+            if vid is not None and port.vid != vid:
+                continue
+            if pid is not None and port.pid != pid:
+                continue
+            if serial_number and port.serial_number != serial_number:
+                continue
+            return port.device
+
     for port in ports:
         if 'Arduino' in port.description or 'USB' in port.description:
             return port.device
     return 'COM3'
 
+def _hostname(cls) -> str:
+    # socket is only needed for this default, so import it on first use
+    import socket
+    return socket.gethostname()
+
+def _parse_usb_id(value) -> Optional[int]:
+    """Parse a USB VID/PID given as an int or a hex string such as '2341'"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, int):
+        return value
+    return int(str(value), 16)
+
+def _coerce(value, default):
+    """Convert a config file or environment value to the type of its default"""
+    if isinstance(default, bool):
+        if isinstance(value, str):
+            return value.strip().lower() in ("1", "true", "yes", "on")
+        return bool(value)
+    if isinstance(default, Path):
+        return Path(value)
+    if isinstance(default, (int, float)):
+        return type(default)(value)
+    if isinstance(default, (list, tuple)):
+        if isinstance(value, str):
+            value = [item.strip() for item in value.split(",") if item.strip()]
+        if default and isinstance(default[0], (int, float)):
+            value = [type(default[0])(item) for item in value]
+        return type(default)(value)
+    return value
+
+class _Setting:
+    """Class attribute resolved on first access: environment, then config file, then default"""
+
+    def __init__(self, default: Any = None,
+                 factory: Optional[Callable[[type], Any]] = None,
+                 cast: Optional[Callable[[Any], Any]] = None):
+        self.default = default
+        self.factory = factory
+        self.cast = cast
+        self.name = None
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        try:
+            return owner._resolved[self.name]
+        except KeyError:
+            value = self._resolve(owner)
+            owner._resolved[self.name] = value
+            return value
+
+    def _resolve(self, owner):
+        env_value = os.environ.get(ENV_PREFIX + self.name)
+        if env_value is not None:
+            return self._convert(env_value)
+
+        file_values = owner._load_config_file()
+        if self.name in file_values:
+            return self._convert(file_values[self.name])
+
+        if self.factory is not None:
+            return self.factory(owner)
+        return self.default
+
+    def _convert(self, value):
+        if self.cast is not None:
+            return self.cast(value)
+        return _coerce(value, self.default)
+
 class Settings:
+    """
+    Layered configuration: built-in defaults, then a JSON config file, then
+    RVM_<NAME> environment variables. Values are resolved on first access, so
+    importing this module performs no file or device I/O.
+    """
     # Convert BASE_DIR to Path object
     BASE_DIR = Path(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
-    
+    CONFIG_FILE = BASE_DIR / "rvm_config.json"
+
+    # Resolved values and the parsed config file, filled in lazily
+    _resolved: Dict[str, Any] = {}
+    _file_values: Optional[Dict[str, Any]] = None
+
     # Hardware Configuration
-    SERIAL_PORT = find_arduino_port()
-    BAUD_RATE = 9600
-    SERIAL_TIMEOUT = 1
-    ULTRASONIC_THRESHOLD_CM = 10.0
+    SERIAL_VID = _Setting(None, cast=_parse_usb_id)
+    SERIAL_PID = _Setting(None, cast=_parse_usb_id)
+    SERIAL_NUMBER = _Setting(None, cast=str)
+    SERIAL_PORT = _Setting(
+        factory=lambda cls: find_arduino_port(cls.SERIAL_VID, cls.SERIAL_PID, cls.SERIAL_NUMBER),
+        cast=str
+    )
+    BAUD_RATE = _Setting(9600)
+    SERIAL_TIMEOUT = _Setting(1)
+    ULTRASONIC_THRESHOLD_CM = _Setting(10.0)
 
     # Camera configuration
-    CAMERA_INDEX = 0
-    IMAGE_COUNT = 3
-    IMAGE_DELAY = 0.5
+    CAMERA_INDEX = _Setting(0)
+    IMAGE_COUNT = _Setting(3)
+    IMAGE_DELAY = _Setting(0.5)
+
+    # Extra captures when a result lands in the rejection band, before rejecting the item
+    CAPTURE_RETRY_ENABLED = _Setting(True)
+    CAPTURE_RETRY_BUDGET = _Setting(2.5)  # seconds from the first retry
+    CAPTURE_RETRY_MAX_ATTEMPTS = _Setting(2)
+    # Exposure offsets tried per attempt, in the backend's CAP_PROP_EXPOSURE units; empty leaves it alone
+    CAPTURE_RETRY_EXPOSURE_STEPS = _Setting(
+        [], cast=lambda value: [float(step) for step in (value.split(",") if isinstance(value, str) else value)
+                                if str(step).strip()]
+    )
+    CAPTURE_RETRY_AUTO_WB = _Setting(False)  # switch on auto white balance for retries
+    CAPTURE_RETRY_SETTLE_FRAMES = _Setting(2)  # frames skipped after changing camera properties
+
+    # Shared-memory ring of camera frames for consumers in other processes
+    FRAME_RING_ENABLED = _Setting(False)
+    FRAME_RING_NAME = _Setting("rvm_frames")
+    FRAME_RING_SLOTS = _Setting(8)
+    FRAME_RING_SHAPE = _Setting((480, 640, 3))  # height, width, channels
+
+    # Multi-lane operation: one dict of per-lane overrides per chute, e.g.
+    # [{"SERIAL_PORT": "COM3", "CAMERA_INDEX": 0}, {"SERIAL_PORT": "COM4", "CAMERA_INDEX": 1}]
+    LANES = _Setting([], cast=lambda value: json.loads(value) if isinstance(value, str) else list(value))
+
+    # Shared inference scheduler used when several lanes share one model
+    INFERENCE_MAX_BATCH = _Setting(8)
+    INFERENCE_BATCH_WAIT_MS = _Setting(15.0)
+    INFERENCE_LATENCY_TARGET_MS = _Setting(1500.0)
+    INFERENCE_REQUEST_TIMEOUT_MS = _Setting(10000.0)  # a lane gives up on a stuck scheduler after this
+
+    # CPU budget for inference; see `python -m utils.inference_benchmark`
+    INFERENCE_RESERVED_CORES = _Setting(1)  # kept free for UI, serial and disk I/O
+    INFERENCE_BUSY_THREADS = _Setting(0)  # intra-op threads during a session; 0 uses every other core
+    INFERENCE_IDLE_THREADS = _Setting(1)  # intra-op threads between sessions
+    INFERENCE_INTEROP_THREADS = _Setting(1)
+    INFERENCE_CPU_AFFINITY = _Setting(False)  # pin inference and UI threads to their cores (Linux)
 
     # AI/ML Configuration
-    YOLO_MODEL_PATH = r"C:\Users\Acer\Documents\PlatformIO\Projects\RVMachine\src\rvmachine\models\best.pt"
-    CONFIDENCE_THRESHOLD = 0.5
-    MATERIAL_TYPES = ["plastic", "can"]
+    YOLO_MODEL_PATH = _Setting(BASE_DIR / "src" / "models" / "best.pt")
+    CONFIDENCE_THRESHOLD = _Setting(0.5)
+    MATERIAL_TYPES = _Setting(["plastic", "can"])
+
+    # Detection mode: "capture" classifies frames grabbed after the trigger;
+    # "continuous" classifies the stream during a session and tracks objects
+    DETECTION_MODE = _Setting("capture")
+    TRACKING_FPS = _Setting(2.0)
+    TRACKING_IOU = _Setting(0.3)  # min overlap to continue a track
+    TRACKING_MAX_AGE = _Setting(2.0)  # seconds unseen before a track is dropped
+    TRACKING_MIN_HITS = _Setting(2)  # frames agreeing on a material before it is settled
+    TRACKING_SETTLED_MAX_AGE = _Setting(1.0)  # a settled track must be this fresh at the trigger
+
+    # Bulk intake: credit every item seen in one drop instead of the single best one
+    BULK_MODE = _Setting(False)
+    BULK_MAX_ITEMS = _Setting(10)
+    BULK_OVERLAP_IOU = _Setting(0.5)  # boxes overlapping more than this are one item
+
+    # Near-duplicate result cache: reuse a confident result for an almost identical frame
+    DETECTION_CACHE_ENABLED = _Setting(False)  # set DETECTION_CACHE_ROI to the chute before enabling
+    DETECTION_CACHE_SIZE = _Setting(32)
+    DETECTION_CACHE_DISTANCE = _Setting(3)  # max dHash Hamming distance counted as a match
+    DETECTION_CACHE_TTL = _Setting(10.0)  # seconds
+    DETECTION_CACHE_VERIFY_RATE = _Setting(0.1)  # fraction of hits re-run to measure accuracy
+    DETECTION_CACHE_ROI = _Setting((0.0, 0.0, 1.0, 1.0))  # x0, y0, x1, y1 as fractions of the frame
 
     # Image paths - now using Path objects consistently
-    IMAGE_SAVE_PATH = BASE_DIR.parent / "captured_images"  # Using parent to go up one level
-    DETECTED_IMAGE_PATH = BASE_DIR.parent / "detected_images"
-    
+    IMAGE_SAVE_PATH = _Setting(BASE_DIR.parent / "captured_images")  # Using parent to go up one level
+    DETECTED_IMAGE_PATH = _Setting(BASE_DIR.parent / "detected_images")
+
+    # Training-image archive: content-addressed, deduplicated, with retention
+    ARCHIVE_ENABLED = _Setting(True)
+    ARCHIVE_DIR = _Setting(BASE_DIR.parent / "image_archive")
+    ARCHIVE_DUP_DISTANCE = _Setting(4)  # max dHash Hamming distance treated as a duplicate
+    ARCHIVE_DUP_WINDOW = _Setting(256)  # recent hashes compared against
+    ARCHIVE_MAX_MB = _Setting(2048)
+    ARCHIVE_MAX_AGE_DAYS = _Setting(90)
+    ARCHIVE_RETENTION_INTERVAL = _Setting(300.0)  # seconds
+
     # Logging Configuration
-    LOG_FILE = BASE_DIR.parent / "logs" / "detection.log"
-    LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+    LOG_FILE = _Setting(BASE_DIR.parent / "logs" / "detection.log")
+    LOG_FORMAT = _Setting('%(asctime)s - %(levelname)s - [%(correlation_id)s] %(message)s')
+    LOG_LEVEL = _Setting("INFO")
+    LOG_JSON = _Setting(False)  # JSON lines instead of LOG_FORMAT text
+    LOG_MAX_BYTES = _Setting(10 * 2**20)  # rotate at this size...
+    LOG_ROTATE_WHEN = _Setting("midnight")  # ...or at this interval
+    LOG_BACKUP_COUNT = _Setting(14)
+    LOG_RATE_LIMIT_PER_MINUTE = _Setting(30)  # per message template, INFO and below; 0 disables
 
     # QR Code Settings
-    QR_CODES_DIR = BASE_DIR / "static" / "qr_codes"
-    QR_CODE_SIZE = (300, 300)
-    QR_CODE_EXPIRE_MINUTES = 15
+    QR_CODES_DIR = _Setting(BASE_DIR / "static" / "qr_codes")
+    QR_CODE_SIZE = _Setting((300, 300))
+    QR_CODE_EXPIRE_MINUTES = _Setting(15)
+    QR_SIGNING_KEY = _Setting(None, cast=str)  # adds an HMAC signature to receipts when set
+
+    SESSION_TIMEOUT = _Setting(30)
+
+    # Durable session ledger (SQLite WAL, group commit)
+    LEDGER_PATH = _Setting(BASE_DIR.parent / "data" / "ledger.db")
+    LEDGER_BATCH_SIZE = _Setting(64)
+    LEDGER_FLUSH_INTERVAL = _Setting(0.2)  # seconds to gather a commit batch
+
+    # Offline-first upload of session records; empty URL disables uploading
+    MACHINE_ID = _Setting(factory=_hostname, cast=str)
+    UPLOAD_URL = _Setting("")
+    UPLOAD_AUTH_TOKEN = _Setting(None, cast=str)
+    UPLOAD_DB_PATH = _Setting(BASE_DIR.parent / "data" / "outbox.db")
+    UPLOAD_BATCH_SIZE = _Setting(50)
+    UPLOAD_INTERVAL = _Setting(10.0)  # seconds between uploads, and the base backoff
+    UPLOAD_MAX_BACKOFF = _Setting(300.0)
+    UPLOAD_TIMEOUT = _Setting(10.0)
+    UPLOAD_MAX_DB_MB = _Setting(50)
+    UPLOAD_MAX_ATTEMPTS = _Setting(3)  # permanent rejections before a record is dead-lettered
+
+    # Receipt printer: ESC/POS device path or tcp://host:port; empty uses the OS print dialog
+    PRINTER_DEVICE = _Setting("")
+    PRINTER_WIDTH_DOTS = _Setting(384)  # 58 mm paper; use 576 for 80 mm
+    PRINTER_TIMEOUT = _Setting(5.0)
+
+    # UI camera preview and debug overlay
+    PREVIEW_ENABLED = _Setting(True)
+    PREVIEW_FPS = _Setting(5.0)
+    PREVIEW_SIZE = _Setting((320, 240))
+    UI_DEBUG_OVERLAY = _Setting(False)  # also toggled with F12
+
+    # "tk" for the touchscreen window, "web" for a headless local web page
+    UI_MODE = _Setting("tk")
+    WEB_UI_HOST = _Setting("127.0.0.1")
+    WEB_UI_PORT = _Setting(8080)
+    WEB_UI_QR_CACHE = _Setting(16)  # recent receipts kept rendered as PNG/SVG
+
+    # UI queues: bounded so a stalled UI cannot grow memory without limit
+    UI_RESPONSE_QUEUE_SIZE = _Setting(100)
+    UI_COMMAND_QUEUE_SIZE = _Setting(16)
+
+    # Memory watchdog
+    MEMORY_SAMPLE_INTERVAL = _Setting(300.0)  # seconds
+    MEMORY_BUDGET_MB = _Setting(256)  # RSS growth over the post-startup baseline; 0 disables the UI and process restarts
+    MEMORY_TRACEMALLOC_FRAMES = _Setting(0)  # 0 disables tracemalloc
+    MEMORY_TOP_ALLOCATORS = _Setting(10)
+
+    @classmethod
+    def _load_config_file(cls) -> Dict[str, Any]:
+        """Read the JSON config file once; a missing file means no overrides"""
+        if cls._file_values is None:
+            path = Path(os.environ.get(CONFIG_FILE_ENV, cls.CONFIG_FILE))
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    cls._file_values = json.load(f)
+            except FileNotFoundError:
+                cls._file_values = {}
+        return cls._file_values
+
+    @classmethod
+    def reload(cls):
+        """Drop resolved values so the next access re-reads file and environment"""
+        cls._resolved.clear()
+        cls._file_values = None
+        find_arduino_port.cache_clear()
 
-    SESSION_TIMEOUT = 30 
-    
     @staticmethod
     def get_timestamp():
         return datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-    
+
     @classmethod
     def create_directories(cls):
         """Initialize all required directories"""
@@ -58,8 +304,28 @@ class Settings:
         os.makedirs(str(cls.DETECTED_IMAGE_PATH), exist_ok=True)
         os.makedirs(str(cls.LOG_FILE.parent), exist_ok=True)
         os.makedirs(str(cls.QR_CODES_DIR), exist_ok=True)
-        
+
         # Create material-specific directories
         for material in cls.MATERIAL_TYPES:
             os.makedirs(str(cls.IMAGE_SAVE_PATH / material), exist_ok=True)
-            os.makedirs(str(cls.DETECTED_IMAGE_PATH / material), exist_ok=True)
\ No newline at end of file
+            os.makedirs(str(cls.DETECTED_IMAGE_PATH / material), exist_ok=True)
+
+class LaneSettings:
+    """Per-lane view of Settings: the lane's overrides first, then the shared values"""
+
+    def __init__(self, base: Settings, lane_id: int, overrides: Optional[Dict[str, Any]] = None):
+        self._base = base
+        self._overrides = {}
+        for name, value in (overrides or {}).items():
+            descriptor = type(base).__dict__.get(name)
+            self._overrides[name] = descriptor._convert(value) if isinstance(descriptor, _Setting) else value
+        self._overrides.setdefault("IMAGE_SAVE_PATH", base.IMAGE_SAVE_PATH / f"lane_{lane_id}")
+        self._overrides.setdefault("FRAME_RING_NAME", f"{base.FRAME_RING_NAME}_lane{lane_id}")
+        self._overrides.setdefault("WEB_UI_PORT", base.WEB_UI_PORT + lane_id)
+        self.LANE_ID = lane_id
+
+    def __getattr__(self, name):
+        overrides = self.__dict__.get("_overrides", {})
+        if name in overrides:
+            return overrides[name]
+        return getattr(self._base, name)
@@ -1,31 +1,167 @@
-import cv2
 import time
 import os
 import logging
-from typing import List
+import threading
+from typing import List, Optional, Tuple
 from ..config.settings import Settings
+from ..utils.helpers import lazy_import
+from ..utils.frame_ring import FrameRing
+
+cv2 = lazy_import("cv2")
+
+# CAP_PROP_AUTO_EXPOSURE value that selects manual exposure; V4L2 uses the
+# driver's menu index, DirectShow and Media Foundation a 0.25/0.75 switch
+MANUAL_EXPOSURE = {"V4L2": 1, "DSHOW": 0.25, "MSMF": 0.25}
 
 class CameraController:
+    """
+    Owns the only reader of the VideoCapture device. A grabber thread keeps
+    the latest frame; detection captures and the UI preview both consume
+    frames from it instead of reading the device themselves. With
+    FRAME_RING_ENABLED, every frame is also published to a shared-memory
+    ring that other processes can attach to with FrameRing.attach().
+    """
+
     def __init__(self, settings: Settings):
         self.settings = settings
         self.logger = logging.getLogger(__name__)
         self.camera = cv2.VideoCapture(settings.CAMERA_INDEX, cv2.CAP_DSHOW)
         os.makedirs(settings.IMAGE_SAVE_PATH, exist_ok=True)
 
-    def capture_images(self) -> List[str]:
+        self.frame_ring = None
+        if settings.FRAME_RING_ENABLED:
+            self.frame_ring = FrameRing.create(
+                settings.FRAME_RING_NAME, settings.FRAME_RING_SHAPE, settings.FRAME_RING_SLOTS
+            )
+
+        # Serialises device reads with property changes made for capture retries
+        self._device_lock = threading.Lock()
+        self._saved_props = None
+        self._exposure_warned = False
+
+        self._frame_cond = threading.Condition()
+        self._latest_frame = None
+        self._frame_seq = 0
+        self.ring_errors = 0
+        self._running = True
+        self._grab_thread = threading.Thread(target=self._grab_loop, name="camera-grabber", daemon=True)
+        self._grab_thread.start()
+
+    def _grab_loop(self):
+        """Read frames continuously so consumers always see the newest one"""
+        while self._running:
+            with self._device_lock:
+                ret, frame = self.camera.read()
+            if not ret:
+                time.sleep(0.05)
+                continue
+            with self._frame_cond:
+                self._latest_frame = frame
+                self._frame_seq += 1
+                self._frame_cond.notify_all()
+            if self.frame_ring is not None:
+                self._publish(frame)
+
+    def _publish(self, frame):
+        """Copy a frame into the shared ring; a failure must not stop the grabber"""
+        try:
+            self.frame_ring.write(frame)
+        except Exception as e:
+            self.ring_errors += 1
+            # Log the first failure in full, then every 100th
+            if self.ring_errors == 1 or self.ring_errors % 100 == 0:
+                self.logger.error(f"Frame ring write failed for frame of shape "
+                                  f"{getattr(frame, 'shape', None)}: {str(e)} "
+                                  f"({self.ring_errors} failures)", exc_info=self.ring_errors == 1)
+
+    def get_latest_frame(self) -> Tuple[int, Optional[object]]:
+        """Return (sequence number, frame) of the newest frame without copying"""
+        with self._frame_cond:
+            return self._frame_seq, self._latest_frame
+
+    def wait_for_frame(self, after_seq: int, timeout: float = 1.0) -> Tuple[int, Optional[object]]:
+        """Block until a frame newer than ``after_seq`` arrives or the timeout expires"""
+        with self._frame_cond:
+            self._frame_cond.wait_for(lambda: self._frame_seq > after_seq or not self._running, timeout)
+            if self._frame_seq > after_seq:
+                return self._frame_seq, self._latest_frame
+            return after_seq, None
+
+    def adjust_for_retry(self, attempt: int):
+        """Nudge exposure/white balance for capture retry ``attempt``; restore_settings() undoes it"""
+        steps = self.settings.CAPTURE_RETRY_EXPOSURE_STEPS
+        auto_wb = self.settings.CAPTURE_RETRY_AUTO_WB
+        if not steps and not auto_wb:
+            return
+        with self._device_lock:
+            if self._saved_props is None:
+                # Auto exposure last, so restoring it hands exposure back to the driver
+                self._saved_props = {
+                    prop: self.camera.get(prop)
+                    for prop in (cv2.CAP_PROP_EXPOSURE, cv2.CAP_PROP_AUTO_WB, cv2.CAP_PROP_AUTO_EXPOSURE)
+                }
+            if steps:
+                step = steps[(attempt - 1) % len(steps)]
+                base = self._saved_props[cv2.CAP_PROP_EXPOSURE]
+                # UVC cameras ignore CAP_PROP_EXPOSURE while auto exposure is on
+                self.camera.set(cv2.CAP_PROP_AUTO_EXPOSURE, self._manual_exposure_value())
+                self.camera.set(cv2.CAP_PROP_EXPOSURE, base + step)
+                applied = self.camera.get(cv2.CAP_PROP_EXPOSURE)
+                if step and abs(applied - base) < abs(step) / 2 and not self._exposure_warned:
+                    self._exposure_warned = True
+                    self.logger.warning(f"Camera ignored the retry exposure step: asked for "
+                                        f"{base + step}, still at {applied}")
+            if auto_wb:
+                self.camera.set(cv2.CAP_PROP_AUTO_WB, 1)
+        self.logger.debug("Camera adjusted for retry %d: %s", attempt, self._saved_props)
+
+        # Frames already in flight were exposed with the old settings
+        seq, _ = self.get_latest_frame()
+        for _ in range(self.settings.CAPTURE_RETRY_SETTLE_FRAMES):
+            seq, _ = self.wait_for_frame(seq)
+
+    def _manual_exposure_value(self) -> float:
+        try:
+            backend = self.camera.getBackendName()
+        except Exception:
+            backend = None
+        return MANUAL_EXPOSURE.get(backend, MANUAL_EXPOSURE["DSHOW"])
+
+    def restore_settings(self):
+        """Put back the camera properties changed by adjust_for_retry()"""
+        if self._saved_props is None:
+            return
+        with self._device_lock:
+            for prop, value in self._saved_props.items():
+                self.camera.set(prop, value)
+        self._saved_props = None
+
+    def capture_images(self, count: Optional[int] = None, delay: Optional[float] = None) -> List[str]:
+        """Save ``count`` fresh frames (default IMAGE_COUNT) ``delay`` seconds apart (default IMAGE_DELAY)"""
+        count = self.settings.IMAGE_COUNT if count is None else count
+        delay = self.settings.IMAGE_DELAY if delay is None else delay
         images = []
-        for i in range(self.settings.IMAGE_COUNT):
-            ret, frame = self.camera.read()
-            if ret:
+        seq, _ = self.get_latest_frame()
+        for i in range(count):
+            seq, frame = self.wait_for_frame(seq)
+            if frame is not None:
                 path = os.path.join(
                     self.settings.IMAGE_SAVE_PATH,
                     f"img_{self.settings.get_timestamp()}_{i}.jpg"
                 )
                 cv2.imwrite(path, frame)
                 images.append(path)
-                time.sleep(self.settings.IMAGE_DELAY)
+                time.sleep(delay)
         return images
 
     def release(self):
+        self._running = False
+        with self._frame_cond:
+            self._frame_cond.notify_all()
+        if hasattr(self, '_grab_thread'):
+            self._grab_thread.join(timeout=2)
         if hasattr(self, 'camera'):
-            self.camera.release()
\ No newline at end of file
+            self.camera.release()
+        if getattr(self, 'frame_ring', None) is not None:
+            self.frame_ring.close()
+            self.frame_ring = None
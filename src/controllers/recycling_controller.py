@@ -1,11 +1,38 @@
+import time
+import uuid
 import logging
-from typing import Dict
+from typing import Dict, Iterable, List, Optional, Tuple
 
 class RecyclingSession:
-    def __init__(self):
+    def __init__(self, ledger=None, lane_id: int = 0):
         self.logger = logging.getLogger(__name__)
+        self.ledger = ledger
+        self.lane_id = lane_id
+        self.session_id = None
         self.reset_session()
 
+    def start_session(self) -> str:
+        """Reset counts and open a new session in the ledger"""
+        self.reset_session()
+        self.session_id = uuid.uuid4().hex
+        if self.ledger:
+            self.ledger.open_session(self.session_id, self.lane_id)
+        return self.session_id
+
+    def close_session(self, qr_id: Optional[str]):
+        """Record the session as closed with the qr_id issued for it"""
+        if self.ledger and self.session_id:
+            self.ledger.close_session(self.session_id, qr_id, counts=self.get_session_data())
+        self.session_id = None
+
+    def restore_session(self, session_id: str, items: Iterable[Tuple[str, float]]):
+        """Rebuild counts for a session recovered from the ledger without re-recording items"""
+        self.reset_session()
+        self.session_id = session_id
+        for material, created_at in items:
+            if self._count(material):
+                self.items.append((material, created_at))
+
     def reset_session(self):
         """Reset all counts for a new session"""
         self.plastic_count = 0
@@ -13,6 +40,7 @@ class RecyclingSession:
         self.rejected_count = 0
         self.no_detection_count = 0
         self.total_count = 0
+        self.items = []
         self.logger.debug("Recycling session reset")
 
     def add_item(self, material_type: str):
@@ -22,7 +50,14 @@ class RecyclingSession:
             return
             
         material_type = material_type.lower()
-        
+        if not self._count(material_type):
+            return
+        self.items.append((material_type, time.time()))
+        if self.ledger and self.session_id:
+            self.ledger.record_item(self.session_id, material_type)
+
+    def _count(self, material_type: str) -> bool:
+        """Update in-memory counts; returns False for unknown material types"""
         if material_type == "plastic":
             self.plastic_count += 1
             self.total_count += 1
@@ -37,13 +72,17 @@ class RecyclingSession:
             # Note: no_detection items don't count toward total_count
         else:
             self.logger.warning(f"Unknown material type detected: {material_type}")
-            return
+            return False
             
-        self.logger.debug(f"Added {material_type} item. Current counts - "
-                         f"Plastic: {self.plastic_count}, "
-                         f"Can: {self.can_count}, "
-                         f"Rejected: {self.rejected_count}, "
-                         f"No Detection: {self.no_detection_count}")
+        self.logger.debug("Added %s item. Current counts - "
+                          "Plastic: %d, Can: %d, Rejected: %d, No Detection: %d",
+                          material_type, self.plastic_count, self.can_count,
+                          self.rejected_count, self.no_detection_count)
+        return True
+
+    def get_items(self) -> List[Tuple[str, float]]:
+        """Items counted this session as (material, timestamp), oldest first"""
+        return list(self.items)
 
     def get_session_data(self) -> Dict:
         """Get current session data as a dictionary"""
@@ -62,7 +62,7 @@ class SerialController:
                     line = self.input_buffer.strip()
                     self.input_buffer = ""
                     if line:
-                        self.logger.debug(f"Received: {line}")
+                        self.logger.debug("Received: %s", line)
                         return line
                 else:
                     self.input_buffer += byte
@@ -88,7 +88,7 @@ class SerialController:
             
             self.serial_conn.write(data)
             self.serial_conn.flush()
-            self.logger.debug(f"Sent: {data.decode('utf-8').strip()}")
+            self.logger.debug("Sent: %r", data)
             return True
         except serial.SerialTimeoutException:
             self.logger.warning("Write timeout - data not sent")
@@ -1,43 +1,141 @@
+import sys
 import time
+import uuid
 import logging
 import threading
-from queue import Queue, Empty
+from queue import Empty
 from pathlib import Path
+from typing import List, Optional, Tuple
 
 from controllers.recycling_controller import RecyclingSession
 from services.qr_service import QRService
-from ui.main_ui import RVMachineUI
-from .config.settings import Settings
+from ui.messages import (
+    DetectionResult, DisplayQR, QRGenerationFailed, RestartUI, SessionData,
+    SessionStarted, SystemShutdown
+)
+from utils.bounded_queue import BoundedQueue
+from .config.settings import Settings, LaneSettings
 from .controllers.camera_controller import CameraController
 from .controllers.serial_controller import SerialController
+from .models.inference_scheduler import InferenceScheduler
 from .services.detection_service import DetectionService
-from .services.logging_service import setup_logging
+from .services.continuous_detection import ContinuousClassifier
+from .services.resource_scheduler import ResourceScheduler
+from .services.logging_service import setup_logging, set_correlation_id, reset_correlation_id
+from .services.memory_watchdog import MemoryWatchdog
+from .services.session_ledger import SessionLedger
+from .services.upload_service import UploadQueue
+from .services.image_archive import ImageArchive
+
+class SharedServices:
+    """Process-wide services shared by every lane"""
+
+    def __init__(self, settings: Settings, multi_lane: bool = False):
+        self.settings = settings
+        self.log_listener = setup_logging(settings)
+        self.logger = logging.getLogger(__name__)
+        
+        # Must run before the detector first imports torch
+        self.resources = ResourceScheduler(settings)
+        self.resources.configure_environment()
+        
+        # With several lanes, one scheduler batches frames for a single model
+        self.scheduler = InferenceScheduler(settings) if multi_lane else None
+        self.archive = ImageArchive(settings) if settings.ARCHIVE_ENABLED else None
+        self.ledger = SessionLedger(settings)
+        self.qr_service = QRService(settings)
+        self.uploader = UploadQueue(settings)
+        
+        # Memory watchdog; each lane restarts its UI once no session is active,
+        # and the process exits non-zero if that did not help
+        self.lanes = []
+        self.exit_code = 0
+        self.memory_watchdog = MemoryWatchdog(settings, on_budget_exceeded=self._request_ui_restart,
+                                              on_restart_failed=self._request_exit)
+
+    def detection_service(self, lane_id: int) -> DetectionService:
+        if self.scheduler is not None:
+            return DetectionService(self.settings, detector=self.scheduler.client(lane_id))
+        return DetectionService(self.settings)
+
+    def _request_ui_restart(self, rss: int):
+        """Called from the memory watchdog thread when RSS growth exceeds the budget"""
+        for lane in self.lanes:
+            lane.ui_restart_pending = True
+
+    def _request_exit(self, rss: int):
+        """Called from the memory watchdog thread when a UI restart did not bring RSS back under budget"""
+        self.exit_code = 1
+        for lane in self.lanes:
+            lane.exit_pending = True
+
+    def start(self):
+        self.memory_watchdog.start()
+        self.ledger.start()
+        self.uploader.start()
+        if self.archive:
+            self.archive.start()
+        # Threads started from here on inherit the inference cores
+        self.resources.apply(ResourceScheduler.IDLE)
+        self.resources.pin_inference_thread()
+        if self.scheduler is not None:
+            self.scheduler.start()
+
+    def stop(self):
+        self.memory_watchdog.stop()
+        if self.scheduler is not None:
+            self.scheduler.stop()
+        self.ledger.close()
+        self.uploader.stop()
+        if self.archive:
+            self.archive.stop()
+        self.qr_service.close()
 
 class MainController:
-    def __init__(self, settings: Settings):
+    def __init__(self, settings: Settings, lane_id: int = 0, shared: SharedServices = None):
         self.settings = settings
-        setup_logging(settings)
+        self.lane_id = lane_id
+        
+        # A standalone controller owns its shared services; lanes borrow them
+        self.owns_shared = shared is None
+        self.shared = shared or SharedServices(settings)
         
         self.logger = logging.getLogger(__name__)
-        self.logger.info("Initializing Reverse Vending Machine System")
+        self.logger.info("Initializing Reverse Vending Machine System (lane %d)", lane_id)
         
         # Initialize hardware controllers
         self.camera = CameraController(settings)
         self.serial = SerialController(settings)
-        self.detector = DetectionService(settings)
+        self.detector = self.shared.detection_service(lane_id)
+        self.archive = self.shared.archive
+        self.continuous = None
+        if settings.DETECTION_MODE == "continuous":
+            self.continuous = ContinuousClassifier(settings, self.camera, self.detector)
         
-        # Initialize recycling session and QR service
-        self.recycling_session = RecyclingSession()
-        self.qr_service = QRService(settings)
+        # Initialize recycling session, its durable ledger and QR service
+        self.ledger = self.shared.ledger
+        self.recycling_session = RecyclingSession(ledger=self.ledger, lane_id=lane_id)
+        self.qr_service = self.shared.qr_service
+        self.uploader = self.shared.uploader
         
         # Communication queues with UI
-        self.ui_command_queue = Queue()
-        self.ui_response_queue = Queue()
+        self.ui_command_queue = BoundedQueue(settings.UI_COMMAND_QUEUE_SIZE, "ui_command_queue")
+        self.ui_response_queue = BoundedQueue(settings.UI_RESPONSE_QUEUE_SIZE, "ui_response_queue")
+        
+        self.memory_watchdog = self.shared.memory_watchdog
+        self.ui_restart_pending = False
+        self.exit_pending = False
+        self.shared.lanes.append(self)
         
         # System state variables
         self.processing = False
         self.detection_count = 0
         self.servo_activations = 0
+        self.capture_retries = 0
+        # Rejections since the last accepted item, i.e. times the user had to re-insert it
+        self.pending_reinsertions = 0
+        self.accepted_items = 0
+        self.total_reinsertions = 0
         self.session_active = False
         self.last_detection_time = 0
         self.should_exit = False
@@ -53,6 +151,10 @@ class MainController:
             daemon=True
         )
         ui_thread.start()
+        if self.owns_shared:
+            self.shared.start()
+        self.shared.resources.pin_inference_thread()
+        self._recover_sessions()
         
         try:
             # Initial delay to let Arduino initialize
@@ -61,16 +163,17 @@ class MainController:
             while not self.should_exit:
                 self._check_session_timeout()
                 self._process_ui_commands()
+                self._check_ui_restart()
                 
                 # Read serial messages
                 message = self.serial.read_line()
                 if message:
-                    self.logger.info(f"Arduino message: {message}")
+                    self.logger.info("Arduino message: %s", message)
                     
                     # Process detection during active session
                     if "OBJECT_DETECTED" in message and self.session_active and not self.processing:
                         self.detection_count += 1
-                        self.logger.info(f"Detection #{self.detection_count}")
+                        self.logger.info("Detection #%d", self.detection_count)
                         
                         self.processing = True
                         self._handle_detection()
@@ -81,17 +184,50 @@ class MainController:
                 
         except KeyboardInterrupt:
             self.logger.info("Shutting down system")
-            self.ui_response_queue.put("SYSTEM_SHUTDOWN")
+            self.ui_response_queue.put(SystemShutdown())
         finally:
+            if self.continuous is not None:
+                self.continuous.stop()
+            if self.owns_shared:
+                self.shared.stop()
             self.camera.release()
             self.serial.close()
             self.should_exit = True
 
     def _run_ui(self, command_queue, response_queue):
         """Run the UI in the main thread (required for Tkinter)"""
+        # Imported here so tkinter/PIL only load when a UI is actually shown
+        if self.settings.UI_MODE == "web":
+            from ui.web_ui import WebKioskUI as UI
+        else:
+            from ui.main_ui import RVMachineUI as UI
+
+        self.shared.resources.pin_io_thread()
+        while not self.should_exit:
+            ui = UI(
+                command_queue, response_queue,
+                settings=self.settings,
+                frame_source=self.camera.get_latest_frame
+            )
+            ui.run()
+            if not ui.restart_requested:
+                break
+            del ui
+            self.memory_watchdog.reset_budget()
+            self.logger.info("UI restarted")
 
-        ui = RVMachineUI(command_queue, response_queue)
-        ui.run()
+    def _check_ui_restart(self):
+        """Restart the UI, or exit for the supervisor to restart us, between sessions so no user is interrupted"""
+        if self.exit_pending and not self.session_active:
+            self.logger.error("Exiting to free memory")
+            self.ui_response_queue.put(SystemShutdown())
+            self.should_exit = True
+            return
+        if self.ui_restart_pending and not self.session_active:
+            self.ui_restart_pending = False
+            self.logger.info("Requesting UI restart; queue stats: responses %s, commands %s",
+                             self.ui_response_queue.stats(), self.ui_command_queue.stats())
+            self.ui_response_queue.put(RestartUI())
 
     def _process_ui_commands(self):
         """Process commands from the UI"""
@@ -108,74 +244,224 @@ class MainController:
         except Empty:
             pass
 
+    def _recover_sessions(self):
+        """Resume the newest session left open by a crash; close any older ones with a receipt"""
+        open_sessions = self.ledger.find_open_sessions(self.lane_id)
+        if not open_sessions:
+            return
+        
+        for session_id, opened_at, items in open_sessions[:-1]:
+            self._close_abandoned_session(session_id, items)
+        
+        session_id, opened_at, items = open_sessions[-1]
+        self.recycling_session.restore_session(session_id, items)
+        self.session_active = True
+        self.last_detection_time = time.time()
+        self.shared.resources.session_started()
+        if self.continuous is not None:
+            self.continuous.start()
+        self.logger.warning(f"Recovered open session {session_id} with {len(items)} items")
+        self.ui_response_queue.put(SessionStarted())
+        self.ui_response_queue.put(SessionData(self.recycling_session.get_session_data()))
+
+    def _close_abandoned_session(self, session_id: str, items: List[Tuple[str, float]]):
+        """
+        Close a session its user can no longer finish. Credited items still
+        get a redeemable receipt, logged so staff can hand it out, and the
+        session is queued for upload like any other.
+        """
+        session = RecyclingSession(lane_id=self.lane_id)
+        session.restore_session(session_id, items)
+        counts = session.get_session_data()
+        qr_id = str(uuid.uuid4()) if counts['total_count'] else None
+        self.ledger.close_session(session_id, qr_id, status="abandoned", counts=counts)
+        if qr_id:
+            self.uploader.enqueue_session(qr_id, session_id, counts, session.get_items())
+        self.logger.warning("Closed abandoned session %s with %d items (%d plastic, %d can, %d rejected); "
+                            "receipt %s", session_id, len(items), counts['plastic_count'],
+                            counts['can_count'], counts['rejected_count'], qr_id or "not issued")
+
     def _start_new_session(self):
         """Start a new recycling session"""
+        if not self.session_active:
+            self.shared.resources.session_started()
         self.session_active = True
-        self.recycling_session.reset_session()
+        self.recycling_session.start_session()
         self.last_detection_time = time.time()
         self.detection_count = 0
+        self.pending_reinsertions = 0
+        self.accepted_items = 0
+        self.total_reinsertions = 0
+        self.detector.reset_cache()
+        if self.continuous is not None:
+            self.continuous.start()
         self.logger.info("New recycling session started")
-        self.ui_response_queue.put("SESSION_STARTED")
+        self.ui_response_queue.put(SessionStarted())
 
     def _handle_detection(self):
         """Handle the complete detection pipeline"""
+        # Tag every log line for this item so it can be traced end to end
+        session_id = self.recycling_session.session_id or "nosession"
+        token = set_correlation_id(f"L{self.lane_id}-{session_id[:8]}-{self.detection_count}")
         try:
             self.last_detection_time = time.time()
             
-            # Capture images
-            self.logger.info("Capturing images")
-            image_paths = self.camera.capture_images()
-            if not image_paths:
-                self.logger.warning("No images captured")
-                return
-            
-            # Process detection
-            self.logger.info("Processing images with AI model")
-            detection_made, summary = self.detector.process_images(image_paths)
-            print(f"\n{summary}")  # Keep the detailed summary output
-            
-            # Determine material type from detection results
-            material = self._determine_material(summary, detection_made)
-            result_text = ""
-            
-            if not detection_made:
-                if "NO VALID DETECTION" in summary:
-                    result_text = "Item rejected: Confidence too low"
-                    material = "rejected"
-                else:
-                    result_text = "No object detected"
-                    material = "no_detection"
+            # In continuous mode the material is usually settled before the trigger
+            settled = self._take_settled()
+            if settled:
+                materials, result_text = settled
             else:
-                result_text = f"Item accepted: {material}"
+                materials, result_text = self._capture_and_classify()
+            if materials is None:
+                return
             
-            # Update session counts with the detected material
-            if material:
+            # Update session counts with the detected materials
+            for material in materials:
                 self.recycling_session.add_item(material)
+            self._record_reinsertions(materials)
+            
+            # Only activate servo for valid materials (plastic or can); one cycle drops them all
+            if any(material in ["plastic", "can"] for material in materials):
+                # The credited item is gone; its result must not stand in for the next one
+                self.detector.reset_cache()
                 
-                # Only activate servo for valid materials (plastic or can)
-                if material in ["plastic", "can"]:
-                    # Activate servo
-                    self.servo_activations += 1
-                    self.serial.write("ACTIVATE_SERVO")
-                    
-                    # Wait for servo confirmation
-                    if not self._wait_for_servo_confirmation():
-                        result_text = "Error processing item"
-                        self.logger.warning("Servo activation not confirmed")
+                # Activate servo
+                self.servo_activations += 1
+                self.serial.write("ACTIVATE_SERVO")
+                
+                # Wait for servo confirmation
+                if not self._wait_for_servo_confirmation():
+                    result_text = "Error processing item"
+                    self.logger.warning("Servo activation not confirmed")
             
             # Update UI with detection result and latest counts
-            self.ui_response_queue.put(f"DETECTION_RESULT:{result_text}")
+            self.ui_response_queue.put(DetectionResult(result_text))
             
             # Get updated counts and send to UI
             counts = self.recycling_session.get_session_data()
-            self.ui_response_queue.put(f"SESSION_DATA:{counts}")
+            self.ui_response_queue.put(SessionData(counts))
             
             # System stabilization delay
             time.sleep(1)
             
         except Exception as e:
             self.logger.error(f"Detection error: {str(e)}", exc_info=True)
-            self.ui_response_queue.put(f"DETECTION_RESULT:Error: {str(e)}")
+            self.ui_response_queue.put(DetectionResult(f"Error: {str(e)}"))
+        finally:
+            reset_correlation_id(token)
+
+    def _record_reinsertions(self, materials: List[str]):
+        """Log how many times an item was re-inserted before it was accepted"""
+        if any(material in ["plastic", "can"] for material in materials):
+            self.accepted_items += 1
+            self.total_reinsertions += self.pending_reinsertions
+            self.logger.info("Item accepted after %d re-insertion(s)", self.pending_reinsertions)
+            self.pending_reinsertions = 0
+        elif "rejected" in materials:
+            self.pending_reinsertions += 1
+
+    def _take_settled(self) -> Optional[Tuple[List[str], str]]:
+        """Materials already settled by the continuous classifier, or None to capture"""
+        if self.continuous is None:
+            return None
+        tracks = self.continuous.take_settled(all_tracks=self.settings.BULK_MODE)
+        if not tracks:
+            self.logger.info("No settled track at trigger; capturing")
+            return None
+        materials = [track['label'] for track in tracks]
+        for track in tracks:
+            self.logger.info("Track %d settled as %s (%d frames, confidence %.2f)",
+                             track['track_id'], track['label'], track['hits'], track['confidence'])
+        return materials, "Item accepted: " + ", ".join(materials)
+
+    def _capture_and_classify(self) -> Tuple[Optional[List[str]], str]:
+        """Capture frames after the trigger and classify them; materials is None if capture failed"""
+        # Capture images
+        self.logger.info("Capturing images")
+        image_paths = self.camera.capture_images()
+        if not image_paths:
+            self.logger.warning("No images captured")
+            return None, ""
+        
+        # Process detection
+        self.logger.info("Processing images with AI model")
+        materials, result_text = self._classify(image_paths)
+        image_results = list(self.detector.last_image_results)
+        
+        # An inconclusive rejection gets another look right away instead of a re-insertion
+        attempt = 0
+        deadline = time.monotonic() + self.settings.CAPTURE_RETRY_BUDGET
+        try:
+            while (self.settings.CAPTURE_RETRY_ENABLED
+                   and materials == ["rejected"]
+                   and self.detector.is_inconclusive()
+                   and attempt < self.settings.CAPTURE_RETRY_MAX_ATTEMPTS
+                   and time.monotonic() < deadline):
+                attempt += 1
+                self.capture_retries += 1
+                self.logger.info("Inconclusive result; capture retry %d", attempt)
+                self.camera.adjust_for_retry(attempt)
+                retry_paths = self.camera.capture_images(delay=self._retry_frame_spacing(deadline, attempt))
+                if not retry_paths:
+                    break
+                materials, result_text = self._classify(retry_paths)
+                image_results.extend(self.detector.last_image_results)
+        finally:
+            if attempt:
+                self.camera.restore_settings()
+        if attempt:
+            self.logger.info("After %d capture retries: %s", attempt, result_text)
+        
+        # Hand the frames to the training archive instead of keeping them flat on disk
+        if self.archive:
+            for image_path, image_result in image_results:
+                self.archive.submit(image_path, image_result['label'], image_result['confidence'],
+                                    self.recycling_session.session_id)
+        return materials, result_text
+
+    def _retry_frame_spacing(self, deadline: float, attempt: int) -> float:
+        """Gap between retry frames within the budget, leaving half of this attempt's share for inference"""
+        remaining = max(0.0, deadline - time.monotonic())
+        attempts_left = max(1, self.settings.CAPTURE_RETRY_MAX_ATTEMPTS - attempt + 1)
+        share = remaining / attempts_left / 2
+        return min(self.settings.IMAGE_DELAY, share / max(1, self.settings.IMAGE_COUNT))
+
+    def _classify(self, image_paths: List[str]) -> Tuple[List[str], str]:
+        if self.settings.BULK_MODE:
+            return self._classify_bulk(image_paths)
+        return self._classify_single(image_paths)
+
+    def _classify_single(self, image_paths: List[str]) -> Tuple[List[str], str]:
+        """Classify one item from its frames; returns (materials to record, UI text)"""
+        detection_made, summary = self.detector.process_images(image_paths)
+        self.logger.info("Detection summary:\n%s", summary)
+        
+        # Determine material type from detection results
+        material = self._determine_material(summary, detection_made)
+        
+        if not detection_made:
+            if "NO VALID DETECTION" in summary:
+                return ["rejected"], "Item rejected: Confidence too low"
+            return ["no_detection"], "No object detected"
+        return ([material] if material else []), f"Item accepted: {material}"
+
+    def _classify_bulk(self, image_paths: List[str]) -> Tuple[List[str], str]:
+        """Count every item in the drop; returns (materials to record, UI text)"""
+        counts, summary = self.detector.count_instances(image_paths)
+        self.logger.info("Bulk detection summary:\n%s", summary)
+        
+        if counts['rejected']:
+            # The servo drops everything at once, so an item that was not
+            # identified would go in uncredited with the others; reject the drop
+            self.logger.info("Bulk drop rejected: %d item(s) not identified, counts %s", counts['rejected'], counts)
+            return ["rejected"], "Items rejected: Some items could not be identified, please insert them again"
+        accepted = {material: counts[material] for material in self.settings.MATERIAL_TYPES if counts[material]}
+        if accepted:
+            materials = [material for material, count in accepted.items() for _ in range(count)]
+            text = ", ".join(f"{count} {material}" for material, count in accepted.items())
+            self.logger.info("Bulk drop accepted: %s", text)
+            return materials, f"Items accepted: {text}"
+        return ["no_detection"], "No object detected"
 
     def _determine_material(self, summary: str, detection_made: bool) -> str:
         """Determine material type from detection summary"""
@@ -221,27 +507,56 @@ class MainController:
         
         # Get session data
         counts = self.recycling_session.get_session_data()
+        session_id = self.recycling_session.session_id
+        items = self.recycling_session.get_items()
+        qr_id = None
         
         try:
             # Generate QR image and get qr_id
             qr_image, qr_id = self.qr_service.generate_qr_image(counts)
             
             if qr_image and qr_id:
-                # Save the QR code to file (optional)
-                qr_path = self.qr_service.generate_qr_code(counts)
+                # Save the same QR that is displayed, on the writer thread
+                self.qr_service.save_qr_image(qr_image, qr_id)
+                
+                # Commit the receipt before the QR is shown, so a redemption
+                # made straight away finds it
+                self.recycling_session.close_session(qr_id)
+                if not self.ledger.flush():
+                    self.logger.warning(f"Receipt {qr_id} not yet committed to the ledger")
                 
                 # Tell UI to display QR window with all required data
-                self.ui_response_queue.put("DISPLAY_QR")
-                self.ui_response_queue.put((qr_image, counts, qr_id))
+                self.ui_response_queue.put(DisplayQR(qr_image, counts, qr_id))
             else:
                 self.logger.error("QR image generation failed")
-                self.ui_response_queue.put("QR_GENERATION_FAILED")
+                self.ui_response_queue.put(QRGenerationFailed())
         except Exception as e:
             self.logger.error(f"QR generation failed: {str(e)}")
-            self.ui_response_queue.put("QR_GENERATION_FAILED")
+            self.ui_response_queue.put(QRGenerationFailed())
+        
+        # Queue the session for upload; never touches the network on this thread
+        if qr_id:
+            self.uploader.enqueue_session(qr_id, session_id, counts, items)
+        
+        if self.detector.result_cache is not None:
+            self.logger.info("Detection cache stats: %s", self.detector.result_cache.stats())
+        self.detector.reset_cache()
+        if self.accepted_items:
+            self.logger.info("Re-insertions per accepted item: %.2f (%d items, %d capture retries so far)",
+                             self.total_reinsertions / self.accepted_items, self.accepted_items,
+                             self.capture_retries)
+        
+        if self.continuous is not None:
+            self.continuous.stop()
+            self.logger.info("Continuous classifier: %d frames, %d settled triggers, %d fallbacks",
+                             self.continuous.frames_processed, self.continuous.settled_hits,
+                             self.continuous.misses)
         
         # Reset for next user
         self.session_active = False
+        self.shared.resources.session_ended()
+        # No-op when the receipt was already committed above
+        self.recycling_session.close_session(qr_id)
         self.recycling_session.reset_session()
         self.serial.write("SESSION_ENDED")
 
@@ -252,7 +567,41 @@ class MainController:
             self.logger.info("Session timeout - ending session")
             self._end_session()
 
+def run_lanes(settings: Settings) -> int:
+    """Run one MainController per configured lane, all sharing one model process; returns the exit code"""
+    # A single configured lane still gets its overrides, but needs no scheduler
+    shared = SharedServices(settings, multi_lane=len(settings.LANES) > 1)
+    lanes = [
+        MainController(LaneSettings(settings, lane_id, overrides), lane_id=lane_id, shared=shared)
+        for lane_id, overrides in enumerate(settings.LANES)
+    ]
+    shared.start()
+    threads = [
+        threading.Thread(target=lane.run, name=f"lane-{lane.lane_id}", daemon=True)
+        for lane in lanes
+    ]
+    for thread in threads:
+        thread.start()
+    try:
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(timeout=0.5)
+    except KeyboardInterrupt:
+        shared.logger.info("Shutting down all lanes")
+        for lane in lanes:
+            lane.ui_response_queue.put(SystemShutdown())
+            lane.should_exit = True
+        for thread in threads:
+            thread.join(timeout=10)
+    finally:
+        shared.stop()
+    return shared.exit_code
+
 if __name__ == "__main__":
     settings = Settings()
-    controller = MainController(settings)
-    controller.run()
\ No newline at end of file
+    if settings.LANES:
+        sys.exit(run_lanes(settings))
+    else:
+        controller = MainController(settings)
+        controller.run()
+        sys.exit(controller.shared.exit_code)
\ No newline at end of file
@@ -0,0 +1,196 @@
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Dict, List
+
+from ..config.settings import Settings
+from .object_detector import ObjectDetector
+
+class _Job:
+    """One lane's request: a set of images whose results are returned together"""
+
+    def __init__(self, lane_id: int, image_paths: List[str]):
+        self.lane_id = lane_id
+        self.image_paths = list(image_paths)
+        self.results = [None] * len(self.image_paths)
+        self.remaining = len(self.image_paths)
+        self.future = Future()
+        self.submitted = time.monotonic()
+
+class InferenceScheduler:
+    """
+    Runs one shared ObjectDetector for several lanes. Images from all lanes
+    are batched into single model calls; lanes are served round-robin one
+    image at a time, and lanes whose oldest request is past the latency
+    target go first, so a busy lane cannot starve the others.
+    """
+
+    def __init__(self, settings: Settings, detector: ObjectDetector = None):
+        self.settings = settings
+        self.logger = logging.getLogger(__name__)
+        self.detector = detector or ObjectDetector(settings)
+        self.max_batch = settings.INFERENCE_MAX_BATCH
+        self.batch_wait = settings.INFERENCE_BATCH_WAIT_MS / 1000.0
+        self.latency_target = settings.INFERENCE_LATENCY_TARGET_MS / 1000.0
+        self.request_timeout = settings.INFERENCE_REQUEST_TIMEOUT_MS / 1000.0
+
+        self._cond = threading.Condition()
+        self._pending: Dict[int, deque] = {}
+        self._rotation = 0
+        self._running = False
+        self._thread = None
+        self.lane_stats: Dict[int, Dict] = {}
+
+    def start(self):
+        if self._thread is None:
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="inference-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
+
+    def client(self, lane_id: int) -> "LaneDetector":
+        return LaneDetector(self, lane_id)
+
+    def submit(self, lane_id: int, image_paths: List[str]) -> Future:
+        """Queue a lane's images; the future resolves to per-image results in order"""
+        job = _Job(lane_id, image_paths)
+        if not job.image_paths:
+            job.future.set_result([])
+            return job.future
+        with self._cond:
+            queue = self._pending.setdefault(lane_id, deque())
+            queue.extend((job, index) for index in range(len(job.image_paths)))
+            self._cond.notify()
+        return job.future
+
+    def detect(self, lane_id: int, image_paths: List[str]) -> list:
+        """
+        Results for a lane's images, waiting at most request_timeout. Runs
+        the model directly if the scheduler thread is not running, and
+        raises TimeoutError rather than leave the lane hanging in a session.
+        """
+        if not self.is_running():
+            self.logger.warning("Inference scheduler is not running; lane %d calls the model directly", lane_id)
+            return self.detector.detect_batch(image_paths)
+        future = self.submit(lane_id, image_paths)
+        try:
+            return future.result(timeout=self.request_timeout)
+        except FutureTimeoutError:
+            self._cancel(lane_id, future)
+            raise TimeoutError(f"Lane {lane_id} inference gave no result within "
+                               f"{self.request_timeout:.1f} s") from None
+
+    def is_running(self) -> bool:
+        return self._running and self._thread is not None and self._thread.is_alive()
+
+    def _cancel(self, lane_id: int, future: Future):
+        """Drop a job's images that are still queued so the model never runs them"""
+        with self._cond:
+            queue = self._pending.get(lane_id)
+            if queue:
+                kept = [(job, index) for job, index in queue if job.future is not future]
+                queue.clear()
+                queue.extend(kept)
+
+    def _pending_count(self) -> int:
+        return sum(len(queue) for queue in self._pending.values())
+
+    def _oldest_submitted(self) -> float:
+        return min(queue[0][0].submitted for queue in self._pending.values() if queue)
+
+    def _take_batch(self) -> list:
+        """Pick up to max_batch images round-robin across lanes, overdue lanes first"""
+        now = time.monotonic()
+        lanes = sorted(lane for lane, queue in self._pending.items() if queue)
+        if not lanes:
+            return []
+        start = self._rotation % len(lanes)
+        lanes = lanes[start:] + lanes[:start]
+        lanes.sort(key=lambda lane: now - self._pending[lane][0][0].submitted < self.latency_target)
+        self._rotation += 1
+
+        batch = []
+        while len(batch) < self.max_batch and any(self._pending[lane] for lane in lanes):
+            for lane in lanes:
+                if self._pending[lane] and len(batch) < self.max_batch:
+                    batch.append(self._pending[lane].popleft())
+        return batch
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: not self._running or self._pending_count() > 0)
+                if not self._running:
+                    break
+                # Give other lanes a short window to join the batch
+                deadline = self._oldest_submitted() + self.batch_wait
+                while self._running and self._pending_count() < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._take_batch()
+
+            if batch:
+                self._execute(batch)
+
+        # Fail anything still queued so no lane waits forever
+        with self._cond:
+            for queue in self._pending.values():
+                for job, _ in queue:
+                    if not job.future.done():
+                        job.future.set_exception(RuntimeError("Inference scheduler stopped"))
+                queue.clear()
+
+    def _execute(self, batch: list):
+        paths = [job.image_paths[index] for job, index in batch]
+        try:
+            results = self.detector.detect_batch(paths)
+        except Exception as e:
+            self.logger.error(f"Batched inference of {len(paths)} images failed: {str(e)}", exc_info=True)
+            for job, _ in batch:
+                if not job.future.done():
+                    job.future.set_exception(e)
+            return
+
+        for (job, index), result in zip(batch, results):
+            job.results[index] = result
+            job.remaining -= 1
+            if job.remaining == 0 and not job.future.done():
+                job.future.set_result(job.results)
+                self._record_latency(job)
+
+    def _record_latency(self, job: _Job):
+        latency = time.monotonic() - job.submitted
+        stats = self.lane_stats.setdefault(job.lane_id, {
+            'requests': 0, 'images': 0, 'avg_latency_ms': 0.0, 'over_target': 0
+        })
+        stats['requests'] += 1
+        stats['images'] += len(job.image_paths)
+        stats['avg_latency_ms'] += (latency * 1000.0 - stats['avg_latency_ms']) * 0.2
+        if latency > self.latency_target:
+            stats['over_target'] += 1
+            self.logger.warning(f"Lane {job.lane_id} inference took {latency * 1000:.0f} ms "
+                                f"(target {self.latency_target * 1000:.0f} ms)")
+
+class LaneDetector:
+    """ObjectDetector-compatible handle that routes a lane's calls through the shared scheduler"""
+
+    def __init__(self, scheduler: InferenceScheduler, lane_id: int):
+        self.scheduler = scheduler
+        self.lane_id = lane_id
+
+    def detect_batch(self, image_paths: List[str]) -> list:
+        return self.scheduler.detect(self.lane_id, image_paths)
+
+    def detect_objects(self, image_path: str):
+        return self.detect_batch([image_path])[0]
@@ -1,12 +1,26 @@
-from ultralytics import YOLO
 import logging
+import threading
 from ..config.settings import Settings
+from ..utils.helpers import lazy_import
+
+# torch/ultralytics take seconds to import; defer until a detector is built
+ultralytics = lazy_import("ultralytics")
 
 class ObjectDetector:
     def __init__(self, settings: Settings):
         self.settings = settings
         self.logger = logging.getLogger(__name__)
-        self.model = YOLO(settings.YOLO_MODEL_PATH)
+        self.model = ultralytics.YOLO(settings.YOLO_MODEL_PATH)
+        # The YOLO predictor keeps per-call state and is not thread-safe; the
+        # continuous classifier and the capture path may call it concurrently
+        self._lock = threading.Lock()
 
     def detect_objects(self, image_path: str):
-        return self.model(image_path, conf=self.settings.CONFIDENCE_THRESHOLD)
\ No newline at end of file
+        with self._lock:
+            return self.model(image_path, conf=self.settings.CONFIDENCE_THRESHOLD)
+
+    def detect_batch(self, image_paths: list) -> list:
+        """Run one batched model call on image paths or BGR frames; returns detect_objects-style results per image"""
+        with self._lock:
+            results = self.model(list(image_paths), conf=self.settings.CONFIDENCE_THRESHOLD)
+        return [[result] for result in results]
@@ -0,0 +1,155 @@
+import time
+import logging
+import threading
+from typing import Dict, List, Tuple
+
+from utils.detection_helper import iou
+
+from ..config.settings import Settings
+
+class Track:
+    """One object followed across frames, with a running vote on its material"""
+
+    def __init__(self, track_id: int, box: List[float], now: float):
+        self.track_id = track_id
+        self.box = box
+        self.first_seen = now
+        self.last_seen = now
+        self.hits = 0
+        self.votes: Dict[str, List[float]] = {}  # label -> [hits, confidence sum]
+        self.consumed = False
+
+    def update(self, label: str, confidence: float, box: List[float], now: float):
+        self.box = box
+        self.last_seen = now
+        self.hits += 1
+        vote = self.votes.setdefault(label, [0, 0.0])
+        vote[0] += 1
+        vote[1] += confidence
+
+    def leading(self) -> Tuple[str, int, float]:
+        """(label, hits, mean confidence) of the material with the most votes"""
+        label, (hits, total) = max(self.votes.items(), key=lambda item: (item[1][0], item[1][1]))
+        return label, hits, total / hits
+
+class IoUTracker:
+    """
+    Greedy IoU tracker: each detection joins the unmatched track it overlaps
+    most, above ``min_iou``, or starts a new track. Tracks not seen for
+    ``max_age`` seconds are dropped. Cheap enough to run per frame on a CPU.
+    """
+
+    def __init__(self, min_iou: float = 0.3, max_age: float = 2.0):
+        self.min_iou = min_iou
+        self.max_age = max_age
+        self.tracks: Dict[int, Track] = {}
+        self._next_id = 1
+
+    def update(self, detections: List[Tuple[str, float, List[float]]], now: float):
+        unmatched = dict(self.tracks)
+        for label, confidence, box in sorted(detections, key=lambda d: d[1], reverse=True):
+            best, best_iou = None, self.min_iou
+            for track in unmatched.values():
+                overlap = iou(box, track.box)
+                if overlap >= best_iou:
+                    best, best_iou = track, overlap
+            if best is None:
+                best = Track(self._next_id, box, now)
+                self.tracks[best.track_id] = best
+                self._next_id += 1
+            else:
+                del unmatched[best.track_id]
+            best.update(label, confidence, box, now)
+
+        for track_id, track in list(self.tracks.items()):
+            if now - track.last_seen > self.max_age:
+                del self.tracks[track_id]
+
+    def reset(self):
+        self.tracks.clear()
+
+class ContinuousClassifier:
+    """
+    Runs the detector on the newest camera frame at TRACKING_FPS while a
+    session is active and keeps object identity with an IoUTracker, so the
+    material is usually settled before the sensor reports OBJECT_DETECTED.
+    Frames are passed to the model in memory; nothing is written to disk.
+    """
+
+    def __init__(self, settings: Settings, camera, detection_service):
+        self.settings = settings
+        self.logger = logging.getLogger(__name__)
+        self.camera = camera
+        self.detection_service = detection_service
+        self.interval = 1.0 / max(settings.TRACKING_FPS, 0.1)
+        self.tracker = IoUTracker(settings.TRACKING_IOU, settings.TRACKING_MAX_AGE)
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        self.frames_processed = 0
+        self.settled_hits = 0
+        self.misses = 0
+
+    def start(self):
+        if self._thread is None:
+            with self._lock:
+                self.tracker.reset()
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name="continuous-classifier", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        last_seq = 0
+        while not self._stop_event.is_set():
+            started = time.monotonic()
+            seq, frame = self.camera.get_latest_frame()
+            if frame is not None and seq != last_seq:
+                last_seq = seq
+                try:
+                    results = self.detection_service.detector.detect_batch([frame])[0]
+                    detections = self.detection_service.distinct_boxes(results)
+                    with self._lock:
+                        self.tracker.update(detections, time.monotonic())
+                    self.frames_processed += 1
+                except Exception as e:
+                    self.logger.error(f"Continuous classification failed: {str(e)}", exc_info=True)
+            self._stop_event.wait(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def _is_settled(self, track: Track, now: float) -> bool:
+        if track.consumed or now - track.last_seen > self.settings.TRACKING_SETTLED_MAX_AGE:
+            return False
+        _, hits, confidence = track.leading()
+        return (hits >= self.settings.TRACKING_MIN_HITS
+                and confidence >= self.detection_service.REJECTION_THRESHOLD)
+
+    def take_settled(self, all_tracks: bool = False) -> List[Dict]:
+        """
+        Claim the settled classification of the most recently seen object, or
+        of every settled object with ``all_tracks``. Claimed tracks are never
+        returned again, so one object is only credited once. Returns an empty
+        list when nothing is settled and the caller should capture instead.
+        """
+        now = time.monotonic()
+        with self._lock:
+            settled = [track for track in self.tracker.tracks.values() if self._is_settled(track, now)]
+            settled.sort(key=lambda track: track.last_seen, reverse=True)
+            if not all_tracks:
+                settled = settled[:1]
+            taken = []
+            for track in settled:
+                track.consumed = True
+                label, hits, confidence = track.leading()
+                taken.append({'label': label, 'confidence': confidence,
+                              'track_id': track.track_id, 'hits': hits})
+        if taken:
+            self.settled_hits += 1
+        else:
+            self.misses += 1
+        return taken
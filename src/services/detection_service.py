@@ -1,21 +1,26 @@
 import logging
-from typing import Tuple, List, Dict
+from typing import Tuple, List, Dict, Optional
 from pathlib import Path
 from collections import Counter
+from statistics import median_low
 
-from utils.detection_helper import DecisionHelper
+from utils.detection_helper import DecisionHelper, iou
 
 from ..config.settings import Settings
 from ..models.object_detector import ObjectDetector
+from .result_cache import DetectionResultCache
 
 class DetectionService:
-    def __init__(self, settings: Settings):
+    def __init__(self, settings: Settings, detector=None):
         self.settings = settings
         self.logger = logging.getLogger(__name__)
-        self.detector = ObjectDetector(settings)
+        # A shared scheduler's LaneDetector can stand in for a private model
+        self.detector = detector or ObjectDetector(settings)
         self.decision_helper = DecisionHelper()  # Add this line
         self.CONFIDENCE_THRESHOLD = settings.CONFIDENCE_THRESHOLD
         self.REJECTION_THRESHOLD = 0.85  # Minimum confidence to accept a detection
+        self.last_image_results = []  # (image_path, per-image result) from the latest call
+        self.result_cache = DetectionResultCache(settings) if settings.DETECTION_CACHE_ENABLED else None
         
     def process_images(self, image_paths: List[str]) -> Tuple[bool, str]:
         """
@@ -27,52 +32,85 @@ class DetectionService:
         material_counts = {"plastic": 0, "can": 0, "rejected": 0, "no_detection": 0}
         confidence_sums = {"plastic": 0.0, "can": 0.0}
         
+        # Reuse recent confident results for near-identical frames
+        count = len(image_paths)
+        cache_keys = [None] * count
+        cached_results = [None] * count
+        verify = [False] * count
+        followers = {}  # image index -> near-identical earlier image in this call
+        if self.result_cache is not None:
+            leaders = []
+            for i, image_path in enumerate(image_paths):
+                try:
+                    cache_keys[i] = self.result_cache.key(image_path)
+                except Exception as e:
+                    self.logger.warning(f"Could not hash {image_path} for the result cache: {str(e)}")
+                cached_results[i] = self.result_cache.lookup(cache_keys[i])
+                if cached_results[i] is not None:
+                    verify[i] = self.result_cache.should_verify()
+                    continue
+                leader = next((j for j in leaders if self.result_cache.matches(cache_keys[i], cache_keys[j])), None)
+                if leader is None:
+                    leaders.append(i)
+                else:
+                    followers[i] = leader
+        needs_model = [(cached_results[i] is None and i not in followers) or verify[i] for i in range(count)]
+        
+        # Run the images that need the model in one batch; fall back to per-image calls
+        detections = self._detect_batch(image_paths, [i for i in range(count) if needs_model[i]])
+        
+        # Near-identical frames share one confident result; otherwise they get their own run
+        retry = []
+        for i, leader in followers.items():
+            leader_result = detections.get(leader)
+            if leader_result is not None and self._classify(leader_result)['label'] != 'rejected':
+                cached_results[i] = dict(leader_result)
+                self.result_cache.record_reuse()
+            else:
+                needs_model[i] = True
+                retry.append(i)
+        detections.update(self._detect_batch(image_paths, retry))
+        
         # Process each image
         for i, image_path in enumerate(image_paths):
             try:
-                self.logger.info(f"Processing image {i+1}/{len(image_paths)}: {image_path}")
-                
-                # Get detection results for this image
-                results = self.detector.detect_objects(image_path)
+                self.logger.debug("Processing image %d/%d: %s", i + 1, count, image_path)
                 
-                # Store the best detection for this image
-                image_result = None
-                
-                # Process each detection in this image
-                for result in results:
-                    for box in result.boxes:
-                        cls = int(box.cls[0])  # class index
-                        conf = float(box.conf[0])  # confidence score
-                        label = result.names[cls]  # class name
-                        
-                        # Only consider detections that match our material types
-                        if label.lower() in self.settings.MATERIAL_TYPES:
-                            # Track the best detection in this image
-                            if image_result is None or conf > image_result['confidence']:
-                                image_result = {
-                                    'label': label.lower(),
-                                    'confidence': conf,
-                                    'class_id': cls
-                                }
+                if needs_model[i]:
+                    # Get detection results for this image
+                    if i in detections:
+                        image_result = detections[i]
+                    else:
+                        image_result = self._best_detection(self.detector.detect_objects(image_path))
+                    if cached_results[i] is not None:
+                        self.result_cache.record_verification(
+                            cached_results[i],
+                            self._classify(image_result) if image_result else {'label': 'no_detection', 'confidence': 0.0}
+                        )
+                else:
+                    image_result = cached_results[i]
                 
                 # Handle the detection logic for this image
                 if image_result is None:
                     # No objects detected in this image
                     image_result = {'label': 'no_detection', 'confidence': 0.0}
                     material_counts["no_detection"] += 1
-                    self.logger.info(f"Image {i+1}: No detection")
+                    self.logger.info("Image %d: No detection", i + 1)
                 else:
                     # Check if the detection meets the rejection threshold
-                    if image_result['confidence'] < self.REJECTION_THRESHOLD:
-                        image_result['label'] = 'rejected'
+                    image_result = self._classify(image_result)
+                    if image_result['label'] == 'rejected':
                         material_counts["rejected"] += 1
-                        self.logger.info(f"Image {i+1}: Rejected (confidence: {image_result['confidence']:.2f})")
+                        self.logger.info("Image %d: Rejected (confidence: %.2f)", i + 1, image_result['confidence'])
                     else:
                         # Valid detection
                         material = image_result['label']
                         material_counts[material] += 1
                         confidence_sums[material] += image_result['confidence']
-                        self.logger.info(f"Image {i+1}: Detected {material} (confidence: {image_result['confidence']:.2f})")
+                        self.logger.info("Image %d: Detected %s (confidence: %.2f)", i + 1, material, image_result['confidence'])
+                        # Only confident results are worth reusing
+                        if self.result_cache is not None and needs_model[i] and cached_results[i] is None:
+                            self.result_cache.store(cache_keys[i], image_result)
                 
                 # Add this image's result to our collection
                 all_image_results.append(image_result)
@@ -82,6 +120,8 @@ class DetectionService:
                 all_image_results.append({'label': 'rejected', 'confidence': 0.0})
                 material_counts["rejected"] += 1
         
+        self.last_image_results = list(zip(image_paths, all_image_results))
+        
         # Determine final classification using the helper
         final_material, final_confidence = self.decision_helper.determine_final_decision(all_image_results)
         
@@ -94,6 +134,131 @@ class DetectionService:
         
         return detection_made, summary
     
+    def reset_cache(self):
+        """Forget cached results so none carries over to another item or user"""
+        if self.result_cache is not None:
+            self.result_cache.clear()
+    
+    def is_inconclusive(self) -> bool:
+        """
+        True when at least one frame of the latest call saw a material in the
+        rejection band, so a rejected item might be settled by another look.
+        """
+        return any(result['label'] == 'rejected' and result['confidence'] > 0
+                   for _, result in self.last_image_results)
+    
+    def count_instances(self, image_paths: List[str]) -> Tuple[Dict[str, int], str]:
+        """
+        Bulk mode: count distinct items of each material in every frame and
+        take the per-class median across frames, so one bad frame can neither
+        add nor drop items. Returns (counts per material, summary).
+        """
+        raw_results = self._run_model(image_paths, list(range(len(image_paths))))
+        frame_counts = []
+        all_image_results = []
+        for i, image_path in enumerate(image_paths):
+            try:
+                if i in raw_results:
+                    results = raw_results[i]
+                else:
+                    results = self.detector.detect_objects(image_path)
+                boxes = self.distinct_boxes(results)
+            except Exception as e:
+                self.logger.error(f"Error processing {image_path}: {str(e)}", exc_info=True)
+                boxes = []
+            
+            counts = {material: 0 for material in self.settings.MATERIAL_TYPES}
+            counts['rejected'] = 0
+            for label, conf, _ in boxes:
+                counts[label if conf >= self.REJECTION_THRESHOLD else 'rejected'] += 1
+            frame_counts.append(counts)
+            self.logger.info("Image %d: %s", i + 1, counts)
+            
+            # The best box stands in for the frame in the training archive
+            if boxes:
+                label, conf, _ = max(boxes, key=lambda box: box[1])
+                all_image_results.append(self._classify({'label': label, 'confidence': conf}))
+            else:
+                all_image_results.append({'label': 'no_detection', 'confidence': 0.0})
+        
+        self.last_image_results = list(zip(image_paths, all_image_results))
+        
+        consensus = {
+            label: median_low([counts[label] for counts in frame_counts]) if frame_counts else 0
+            for label in [*self.settings.MATERIAL_TYPES, 'rejected']
+        }
+        # Never credit more than a plausible handful in one drop
+        budget = self.settings.BULK_MAX_ITEMS
+        for material in self.settings.MATERIAL_TYPES:
+            consensus[material] = min(consensus[material], budget)
+            budget -= consensus[material]
+        
+        summary = "Bulk Detection Results:\n"
+        for i, counts in enumerate(frame_counts):
+            summary += f"\nImage {i+1}: " + ", ".join(f"{label} {count}" for label, count in counts.items()) + "\n"
+        summary += "\nCONSENSUS COUNTS: " + ", ".join(f"{label.upper()} {count}" for label, count in consensus.items()) + "\n"
+        return consensus, summary
+    
+    def distinct_boxes(self, results) -> List[Tuple[str, float, List[float]]]:
+        """
+        Material boxes as (label, confidence, xyxy), one per physical item.
+        The model suppresses overlaps within a class only, so a bottle seen as
+        both plastic and can is merged into its more confident box here.
+        """
+        boxes = []
+        for result in results:
+            for box in result.boxes:
+                label = result.names[int(box.cls[0])].lower()
+                if label in self.settings.MATERIAL_TYPES:
+                    boxes.append((label, float(box.conf[0]), [float(v) for v in box.xyxy[0]]))
+        
+        distinct = []
+        for box in sorted(boxes, key=lambda box: box[1], reverse=True):
+            if all(iou(box[2], kept[2]) < self.settings.BULK_OVERLAP_IOU for kept in distinct):
+                distinct.append(box)
+        return distinct
+    
+    def _run_model(self, image_paths: List[str], indices: List[int]) -> Dict[int, list]:
+        """Raw model results per image index from one batched call; empty if the batch fails"""
+        if not indices:
+            return {}
+        try:
+            batch_results = self.detector.detect_batch([image_paths[i] for i in indices])
+        except Exception as e:
+            self.logger.warning(f"Batched detection failed, retrying per image: {str(e)}")
+            return {}
+        return dict(zip(indices, batch_results))
+    
+    def _detect_batch(self, image_paths: List[str], indices: List[int]) -> Dict[int, Optional[Dict]]:
+        """Best detection per image index from one batched call; empty if the batch fails"""
+        return {i: self._best_detection(results)
+                for i, results in self._run_model(image_paths, indices).items()}
+    
+    def _best_detection(self, results) -> Optional[Dict]:
+        """Highest-confidence box of a known material type across a model result"""
+        image_result = None
+        for result in results:
+            for box in result.boxes:
+                cls = int(box.cls[0])  # class index
+                conf = float(box.conf[0])  # confidence score
+                label = result.names[cls]  # class name
+                
+                # Only consider detections that match our material types
+                if label.lower() in self.settings.MATERIAL_TYPES:
+                    if image_result is None or conf > image_result['confidence']:
+                        image_result = {
+                            'label': label.lower(),
+                            'confidence': conf,
+                            'class_id': cls
+                        }
+        return image_result
+    
+    def _classify(self, image_result: Dict) -> Dict:
+        """Relabel a detection below the rejection threshold as rejected"""
+        if image_result['confidence'] < self.REJECTION_THRESHOLD:
+            return dict(image_result, label='rejected')
+        return image_result
+    
     def _generate_summary(self, 
                          all_image_results: List[Dict], 
                          material_counts: Dict[str, int],
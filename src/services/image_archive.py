@@ -0,0 +1,246 @@
+import os
+import csv
+import time
+import shutil
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import deque
+from pathlib import Path
+from queue import Queue, Full, Empty
+from typing import Iterable, Optional, Sequence
+
+from ..config.settings import Settings
+from ..utils.helpers import lazy_import
+
+cv2 = lazy_import("cv2")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (
+    sha256 TEXT PRIMARY KEY,
+    label TEXT NOT NULL,
+    confidence REAL NOT NULL,
+    created_at REAL NOT NULL,
+    session_id TEXT,
+    dhash INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_images_label ON images(label, confidence);
+CREATE INDEX IF NOT EXISTS idx_images_created ON images(created_at);
+"""
+
+def dhash(image_path: str, roi: Optional[Sequence[float]] = None) -> Optional[int]:
+    """
+    64-bit difference hash of an image file, or None if it cannot be read.
+    ``roi`` optionally restricts it to (x0, y0, x1, y1) given as fractions of the frame.
+    """
+    # Decoding at 1/8 scale is much cheaper than a full decode
+    gray = cv2.imread(image_path, cv2.IMREAD_REDUCED_GRAYSCALE_8)
+    if gray is None:
+        return None
+    if roi is not None:
+        height, width = gray.shape[:2]
+        x0, y0, x1, y1 = roi
+        gray = gray[int(y0 * height):max(int(y1 * height), int(y0 * height) + 1),
+                    int(x0 * width):max(int(x1 * width), int(x0 * width) + 1)]
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    value = 0
+    for bit in bits:
+        value = (value << 1) | int(bit)
+    # SQLite integers are signed 64-bit
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+def hamming(a: int, b: int) -> int:
+    return bin((a ^ b) & 0xFFFFFFFFFFFFFFFF).count("1")
+
+class ImageArchive:
+    """
+    Content-addressed store for captured frames, used to build retraining
+    sets. Files live at ARCHIVE_DIR/<sha[:2]>/<sha[2:4]>/<sha>.jpg with a
+    SQLite index of label, confidence, timestamp and session. Exact and
+    near-duplicate frames are skipped, and a size/age retention policy is
+    applied. All file work happens on a background worker.
+    """
+
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self.logger = logging.getLogger(__name__)
+        self.root = Path(settings.ARCHIVE_DIR)
+        self.index_path = str(self.root / "index.db")
+        self._queue = Queue(maxsize=256)
+        self._thread = None
+        self._recent = deque(maxlen=settings.ARCHIVE_DUP_WINDOW)
+        self._total_bytes = 0
+        self._last_retention = 0.0
+
+        self.stored = 0
+        self.duplicates = 0
+        self.dropped = 0
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="image-archive", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=10)
+            self._thread = None
+
+    def submit(self, image_path: str, label: str, confidence: float, session_id: Optional[str] = None):
+        """Hand a captured file to the archive; the file is moved or deleted by the worker"""
+        try:
+            self._queue.put_nowait((image_path, label, confidence, session_id, time.time()))
+        except Full:
+            self.dropped += 1
+            self.logger.warning(f"Archive queue full; leaving {image_path} in place")
+
+    def _connect(self) -> sqlite3.Connection:
+        self.root.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.index_path, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        return conn
+
+    def _run(self):
+        conn = self._connect()
+        self._total_bytes = conn.execute("SELECT COALESCE(SUM(size), 0) FROM images").fetchone()[0]
+        for (value,) in conn.execute(
+            "SELECT dhash FROM images ORDER BY created_at DESC LIMIT ?", (self._recent.maxlen,)
+        ):
+            self._recent.appendleft(value)
+        try:
+            while True:
+                try:
+                    item = self._queue.get(timeout=self.settings.ARCHIVE_RETENTION_INTERVAL)
+                except Empty:
+                    item = ()
+                if item is None:
+                    break
+                if item:
+                    try:
+                        self._ingest(conn, *item)
+                    except Exception as e:
+                        self.logger.error(f"Archiving {item[0]} failed: {str(e)}", exc_info=True)
+                if time.monotonic() - self._last_retention >= self.settings.ARCHIVE_RETENTION_INTERVAL:
+                    self._apply_retention(conn)
+        finally:
+            conn.close()
+
+    def _path_for(self, sha: str) -> Path:
+        return self.root / sha[:2] / sha[2:4] / f"{sha}.jpg"
+
+    def _ingest(self, conn: sqlite3.Connection, image_path: str, label: str,
+                confidence: float, session_id: Optional[str], created_at: float):
+        with open(image_path, "rb") as f:
+            data = f.read()
+        sha = hashlib.sha256(data).hexdigest()
+
+        if conn.execute("SELECT 1 FROM images WHERE sha256 = ?", (sha,)).fetchone():
+            self._discard(image_path)
+            return
+
+        phash = dhash(image_path)
+        if phash is None:
+            self._discard(image_path)
+            return
+        distance = self.settings.ARCHIVE_DUP_DISTANCE
+        if any(hamming(phash, recent) <= distance for recent in self._recent):
+            self._discard(image_path)
+            return
+
+        target = self._path_for(sha)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.move(image_path, target)
+        with conn:
+            conn.execute(
+                "INSERT INTO images (sha256, label, confidence, created_at, session_id, dhash, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (sha, label, confidence, created_at, session_id, phash, len(data))
+            )
+        self._recent.append(phash)
+        self._total_bytes += len(data)
+        self.stored += 1
+
+    def _discard(self, image_path: str):
+        self.duplicates += 1
+        try:
+            os.remove(image_path)
+        except OSError:
+            pass
+
+    def _apply_retention(self, conn: sqlite3.Connection):
+        """Delete images older than ARCHIVE_MAX_AGE_DAYS, then oldest first until under ARCHIVE_MAX_MB"""
+        self._last_retention = time.monotonic()
+        cutoff = time.time() - self.settings.ARCHIVE_MAX_AGE_DAYS * 86400
+        expired = conn.execute("SELECT sha256, size FROM images WHERE created_at < ?", (cutoff,)).fetchall()
+
+        over = self._total_bytes - self.settings.ARCHIVE_MAX_MB * 2**20
+        if over > 0:
+            expired_shas = {sha for sha, _ in expired}
+            over -= sum(size for _, size in expired)
+            for sha, size in conn.execute("SELECT sha256, size FROM images ORDER BY created_at"):
+                if over <= 0:
+                    break
+                if sha not in expired_shas:
+                    expired.append((sha, size))
+                    over -= size
+        if not expired:
+            return
+
+        for sha, size in expired:
+            try:
+                os.remove(self._path_for(sha))
+            except OSError:
+                pass
+            self._total_bytes -= size
+        with conn:
+            conn.executemany("DELETE FROM images WHERE sha256 = ?", [(sha,) for sha, _ in expired])
+        self.logger.info("Archive retention removed %d images; %.1f MB remain",
+                         len(expired), self._total_bytes / 2**20)
+
+    def export(self, dest_dir: Optional[str] = None, labels: Optional[Iterable[str]] = None,
+               min_confidence: float = 0.0, limit: Optional[int] = None) -> int:
+        """
+        Export a labeled subset as <dest>/<label>/<sha>.jpg plus labels.csv.
+        Files are hard-linked where possible, so exports are fast and take no space.
+        """
+        dest = Path(dest_dir or self.settings.DETECTED_IMAGE_PATH)
+        labels = list(labels or self.settings.MATERIAL_TYPES)
+        query = (f"SELECT sha256, label, confidence, created_at, session_id FROM images "
+                 f"WHERE label IN ({','.join('?' * len(labels))}) AND confidence >= ? "
+                 f"ORDER BY created_at DESC")
+        params = [*labels, min_confidence]
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+
+        conn = self._connect()
+        try:
+            rows = conn.execute(query, params).fetchall()
+        finally:
+            conn.close()
+
+        dest.mkdir(parents=True, exist_ok=True)
+        exported = 0
+        with open(dest / "labels.csv", "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["file", "label", "confidence", "created_at", "session_id"])
+            for sha, label, confidence, created_at, session_id in rows:
+                source = self._path_for(sha)
+                if not source.exists():
+                    continue
+                target = dest / label / source.name
+                target.parent.mkdir(exist_ok=True)
+                if not target.exists():
+                    try:
+                        os.link(source, target)
+                    except OSError:
+                        shutil.copy2(source, target)
+                writer.writerow([f"{label}/{source.name}", label, f"{confidence:.4f}", created_at, session_id or ""])
+                exported += 1
+        self.logger.info("Exported %d images to %s", exported, dest)
+        return exported
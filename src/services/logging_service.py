@@ -1,14 +1,197 @@
-import logging
 import os
+import copy
+import json
+import time
+import atexit
+import logging
+import threading
+import contextvars
+from queue import Queue
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
 from ..config.settings import Settings
 
-def setup_logging(settings: Settings):
+# Correlation ID of the item being processed, attached to every log record
+correlation_id = contextvars.ContextVar("correlation_id", default="-")
+
+def set_correlation_id(value: str) -> contextvars.Token:
+    return correlation_id.set(value)
+
+def reset_correlation_id(token: contextvars.Token):
+    correlation_id.reset(token)
+
+class CorrelationFilter(logging.Filter):
+    """Stamp records with the caller's correlation ID before they leave its thread"""
+
+    def filter(self, record):
+        record.correlation_id = correlation_id.get()
+        return True
+
+class RateLimitFilter(logging.Filter):
+    """
+    Let at most ``limit`` records per message template through per ``interval``
+    seconds. WARNING and above always pass. The next record let through
+    carries the number suppressed in between. Windows idle for a whole
+    interval are dropped, so messages that are not templates (f-strings)
+    cannot grow the table without limit.
+    """
+
+    def __init__(self, limit: int, interval: float = 60.0):
+        super().__init__()
+        self.limit = limit
+        self.interval = interval
+        self._windows = {}
+        self._last_prune = time.monotonic()
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if self.limit <= 0 or record.levelno >= logging.WARNING:
+            return True
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_prune >= self.interval:
+                self._prune(now)
+            start, count, suppressed = self._windows.get(key, (now, 0, 0))
+            if now - start >= self.interval:
+                start, count = now, 0
+            if count >= self.limit:
+                self._windows[key] = (start, count, suppressed + 1)
+                return False
+            self._windows[key] = (start, count + 1, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+    def _prune(self, now: float):
+        """Forget windows with no record for a full interval after they ended"""
+        self._last_prune = now
+        expired = [key for key, (start, _, _) in self._windows.items() if now - start >= 2 * self.interval]
+        for key in expired:
+            del self._windows[key]
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler that leaves record formatting (timestamps, JSON, tracebacks)
+    to the listener thread. The stock prepare() runs the full formatter in
+    the caller, which is the cost we want off the hot path; records stay
+    in-process so they need no pickling.
+    """
+
+    def prepare(self, record):
+        # Merge the args into the message here: they may be mutable objects,
+        # such as the session counts, that change before the listener runs
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per line, including correlation ID and suppressed counts"""
+
+    def format(self, record):
+        entry = {
+            'ts': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'correlation_id': getattr(record, 'correlation_id', '-'),
+            'message': record.getMessage(),
+        }
+        suppressed = getattr(record, 'suppressed', 0)
+        if suppressed:
+            entry['suppressed'] = suppressed
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+class TextFormatter(logging.Formatter):
+    def format(self, record):
+        text = super().format(record)
+        suppressed = getattr(record, 'suppressed', 0)
+        if suppressed:
+            text += f" [{suppressed} similar suppressed]"
+        return text
+
+class SizeAndTimeRotatingFileHandler(TimedRotatingFileHandler):
+    """
+    Rotates at the configured time interval or when the file exceeds
+    max_bytes. Backups are named ``<file>.<interval start>.<n>``, n counting
+    up within the interval, so a size rollover never replaces an earlier
+    backup; backupCount limits backups of both kinds together.
+    """
+
+    def __init__(self, filename, max_bytes: int = 0, **kwargs):
+        super().__init__(filename, **kwargs)
+        self.max_bytes = max_bytes
+
+    def _backups(self):
+        """(interval start, index, path) of every backup, oldest first"""
+        directory, base = os.path.split(self.baseFilename)
+        backups = []
+        for name in os.listdir(directory):
+            if not name.startswith(base + "."):
+                continue
+            suffix = name[len(base) + 1:]
+            stamp, _, index = suffix.rpartition(".")
+            if not index.isdigit():
+                # Backup from before indexed names
+                stamp, index = suffix, "0"
+            if self.extMatch.match(stamp):
+                backups.append((stamp, int(index), os.path.join(directory, name)))
+        backups.sort()
+        return backups
+
+    def rotation_filename(self, default_name):
+        # default_name is <file>.<interval start>; take the next index after
+        # the newest backup of that interval
+        stamp = default_name[len(self.baseFilename) + 1:]
+        index = max((i for s, i, _ in self._backups() if s == stamp), default=0) + 1
+        return super().rotation_filename(f"{default_name}.{index}")
+
+    def getFilesToDelete(self):
+        backups = self._backups()
+        return [path for _, _, path in backups[:max(0, len(backups) - self.backupCount)]]
+
+    def shouldRollover(self, record):
+        if super().shouldRollover(record):
+            return True
+        if self.max_bytes > 0 and self.stream is not None:
+            self.stream.seek(0, 2)
+            return self.stream.tell() >= self.max_bytes
+        return False
+
+def setup_logging(settings: Settings) -> QueueListener:
+    """Route all logging through a queue to file/console handlers on a listener thread"""
     os.makedirs(os.path.dirname(settings.LOG_FILE), exist_ok=True)
-    logging.basicConfig(
-        level=logging.INFO,
-        format=settings.LOG_FORMAT,
-        handlers=[
-            logging.FileHandler(settings.LOG_FILE),
-            logging.StreamHandler()
-        ]
-    )
\ No newline at end of file
+
+    if settings.LOG_JSON:
+        formatter = JsonLinesFormatter()
+    else:
+        formatter = TextFormatter(settings.LOG_FORMAT)
+
+    file_handler = SizeAndTimeRotatingFileHandler(
+        settings.LOG_FILE,
+        max_bytes=settings.LOG_MAX_BYTES,
+        when=settings.LOG_ROTATE_WHEN,
+        backupCount=settings.LOG_BACKUP_COUNT,
+        encoding="utf-8"
+    )
+    console_handler = logging.StreamHandler()
+    for handler in (file_handler, console_handler):
+        handler.setFormatter(formatter)
+
+    log_queue = Queue(-1)
+    queue_handler = DeferredQueueHandler(log_queue)
+    queue_handler.addFilter(CorrelationFilter())
+    queue_handler.addFilter(RateLimitFilter(settings.LOG_RATE_LIMIT_PER_MINUTE))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(getattr(logging, str(settings.LOG_LEVEL).upper(), logging.INFO))
+
+    listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
@@ -0,0 +1,133 @@
+import os
+import gc
+import logging
+import threading
+import tracemalloc
+from typing import Callable, Optional
+
+from ..config.settings import Settings
+
+def get_rss_bytes() -> Optional[int]:
+    """Current resident set size of this process, or None if unavailable"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        # Linux fallback: second field of statm is resident pages
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+class MemoryWatchdog:
+    """
+    Periodically samples RSS and, optionally, tracemalloc top allocators.
+    Logs growth between samples and calls ``on_budget_exceeded`` once when
+    RSS grows more than MEMORY_BUDGET_MB above its baseline, so the owner
+    can restart the UI. The baseline is the first sample after startup,
+    once the model and UI are loaded: the budget bounds growth, not the
+    size of the whole process. It is kept across UI restarts, and if RSS
+    is still over budget after one, ``on_restart_failed`` is called so the
+    owner can exit and leave the restart to the process supervisor.
+    """
+
+    def __init__(self, settings: Settings, on_budget_exceeded: Optional[Callable[[int], None]] = None,
+                 on_restart_failed: Optional[Callable[[int], None]] = None):
+        self.settings = settings
+        self.logger = logging.getLogger(__name__)
+        self.on_budget_exceeded = on_budget_exceeded
+        self.on_restart_failed = on_restart_failed
+        self.start_rss = None
+        self.baseline_rss = None
+        self.last_rss = None
+        self.budget_exceeded = False
+        # Set by reset_budget() until a sample shows the restart freed memory
+        self.restarted = False
+        self._last_snapshot = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start sampling on a background thread"""
+        if self._thread is not None:
+            return
+        if self.settings.MEMORY_TRACEMALLOC_FRAMES > 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(self.settings.MEMORY_TRACEMALLOC_FRAMES)
+        self._thread = threading.Thread(target=self._run, name="memory-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def reset_budget(self):
+        """Re-arm the budget after the UI has been restarted; the baseline is kept"""
+        gc.collect()
+        self.budget_exceeded = False
+        self.restarted = True
+
+    def _run(self):
+        while not self._stop_event.wait(self.settings.MEMORY_SAMPLE_INTERVAL):
+            try:
+                self.sample()
+            except Exception as e:
+                self.logger.error(f"Memory sampling failed: {str(e)}", exc_info=True)
+
+    def sample(self) -> Optional[int]:
+        """Take one RSS (and tracemalloc) sample and enforce the budget"""
+        rss = get_rss_bytes()
+        if rss is None:
+            return None
+
+        if self.start_rss is None:
+            self.start_rss = rss
+        if self.baseline_rss is None:
+            self.baseline_rss = rss
+        growth_mb = (rss - (self.last_rss or rss)) / 2**20
+        self.logger.info("Memory: RSS %.1f MB (%+.1f MB since last sample, %+.1f MB since start)",
+                         rss / 2**20, growth_mb, (rss - self.start_rss) / 2**20)
+        self.last_rss = rss
+
+        if tracemalloc.is_tracing():
+            self._log_top_allocators()
+
+        budget = self.settings.MEMORY_BUDGET_MB * 2**20
+        growth = rss - self.baseline_rss
+        if budget <= 0 or growth <= budget:
+            self.restarted = False
+        elif not self.budget_exceeded:
+            self.budget_exceeded = True
+            if self.restarted:
+                # Restarting the UI did not bring memory back; it is not the UI leaking
+                self.logger.error(f"RSS is still {growth / 2**20:.1f} MB above its baseline of "
+                                  f"{self.baseline_rss / 2**20:.1f} MB after a UI restart, over the "
+                                  f"budget of {self.settings.MEMORY_BUDGET_MB} MB; restarting the process")
+                if self.on_restart_failed:
+                    self.on_restart_failed(rss)
+            else:
+                self.logger.warning(f"RSS grew {growth / 2**20:.1f} MB above its baseline of "
+                                    f"{self.baseline_rss / 2**20:.1f} MB, over the budget of "
+                                    f"{self.settings.MEMORY_BUDGET_MB} MB")
+                if self.on_budget_exceeded:
+                    self.on_budget_exceeded(rss)
+        return rss
+
+    def _log_top_allocators(self):
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        if self._last_snapshot is None:
+            stats = snapshot.statistics("lineno")
+            title = "Top allocators"
+        else:
+            stats = snapshot.compare_to(self._last_snapshot, "lineno")
+            title = "Top allocation growth"
+        self._last_snapshot = snapshot
+
+        lines = [str(stat) for stat in stats[:self.settings.MEMORY_TOP_ALLOCATORS]]
+        self.logger.info("%s:\n  %s", title, "\n  ".join(lines))
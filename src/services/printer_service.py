@@ -0,0 +1,116 @@
+import socket
+import logging
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+from utils.helpers import lazy_import
+
+if TYPE_CHECKING:
+    from PIL import Image as PILImage
+
+Image = lazy_import("PIL.Image")
+ImageDraw = lazy_import("PIL.ImageDraw")
+ImageFont = lazy_import("PIL.ImageFont")
+ImageOps = lazy_import("PIL.ImageOps")
+
+# ESC/POS commands
+ESC_INIT = b"\x1b\x40"
+ESC_ALIGN_CENTER = b"\x1b\x61\x01"
+GS_CUT_FEED = b"\x1d\x56\x42\x00"
+
+# Rows per GS v 0 command; many printers buffer a limited band height
+RASTER_BAND_ROWS = 256
+
+def feed_lines(n: int) -> bytes:
+    return b"\x1b\x64" + bytes([max(0, min(255, n))])
+
+def raster_bytes(image: "PILImage.Image") -> bytes:
+    """Encode a 1-bit image as ESC/POS 'GS v 0' raster bands (1 = black dot)"""
+    # PIL packs mode '1' rows MSB first with 1 = white; ESC/POS wants 1 = black
+    image = ImageOps.invert(image.convert("L")).convert("1")
+    width, height = image.size
+    width_bytes = (width + 7) // 8
+    data = image.tobytes()
+
+    out = bytearray()
+    for top in range(0, height, RASTER_BAND_ROWS):
+        rows = min(RASTER_BAND_ROWS, height - top)
+        out += b"\x1d\x76\x30\x00"
+        out += bytes([width_bytes & 0xFF, width_bytes >> 8, rows & 0xFF, rows >> 8])
+        out += data[top * width_bytes:(top + rows) * width_bytes]
+    return bytes(out)
+
+class ReceiptPrinter:
+    """
+    Renders receipts (QR, counts, qr_id) straight to ESC/POS raster bytes and
+    streams them to PRINTER_DEVICE: a device/file path such as /dev/usb/lp0,
+    or tcp://host:port for network printers. Rendered receipts are cached per
+    qr_id so reprints cost only the transfer.
+    """
+    CACHE_SIZE = 8
+
+    def __init__(self, settings):
+        self.settings = settings
+        self.logger = logging.getLogger(__name__)
+        self.device = settings.PRINTER_DEVICE
+        self.width = settings.PRINTER_WIDTH_DOTS // 8 * 8
+        self._cache = OrderedDict()
+
+    def render_receipt(self, qr_image: "PILImage.Image", counts: dict, qr_id: str) -> bytes:
+        """Return the ESC/POS byte stream for a receipt, rendering it once per qr_id"""
+        cached = self._cache.get(qr_id)
+        if cached is not None:
+            self._cache.move_to_end(qr_id)
+            return cached
+
+        lines = [
+            "Recycling Receipt",
+            "",
+            f"Plastic Bottles: {counts.get('plastic_count', 0)}",
+            f"Cans: {counts.get('can_count', 0)}",
+            f"Total Items: {counts.get('total_count', 0)}",
+            "",
+            f"QR ID: {qr_id}",
+        ]
+        data = (ESC_INIT + ESC_ALIGN_CENTER
+                + raster_bytes(self._compose(qr_image, lines))
+                + feed_lines(4) + GS_CUT_FEED)
+
+        self._cache[qr_id] = data
+        if len(self._cache) > self.CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return data
+
+    def _compose(self, qr_image: "PILImage.Image", lines) -> "PILImage.Image":
+        """Lay out the QR code above the text lines on a printer-width canvas"""
+        font = ImageFont.load_default()
+        line_height = 14
+        qr_size = min(self.width, qr_image.size[0])
+        qr = qr_image.convert("L").resize((qr_size, qr_size), Image.NEAREST)
+
+        canvas = Image.new("L", (self.width, qr_size + line_height * len(lines) + 8), 255)
+        canvas.paste(qr, ((self.width - qr_size) // 2, 0))
+
+        draw = ImageDraw.Draw(canvas)
+        y = qr_size + 4
+        for line in lines:
+            text_width = draw.textlength(line, font=font)
+            draw.text(((self.width - text_width) // 2, y), line, fill=0, font=font)
+            y += line_height
+        return canvas
+
+    def send(self, data: bytes):
+        """Stream raw bytes to the configured printer"""
+        if self.device.startswith("tcp://"):
+            host, _, port = self.device[len("tcp://"):].partition(":")
+            with socket.create_connection((host, int(port or 9100)),
+                                          timeout=self.settings.PRINTER_TIMEOUT) as conn:
+                conn.sendall(data)
+        else:
+            with open(self.device, "wb") as device:
+                device.write(data)
+        self.logger.info("Sent %d bytes to printer %s", len(data), self.device)
+
+    def print_receipt(self, qr_image: "PILImage.Image", counts: dict, qr_id: str):
+        """Render (or reuse) the receipt and send it to the printer"""
+        self.send(self.render_receipt(qr_image, counts, qr_id))
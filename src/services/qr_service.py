@@ -1,69 +1,135 @@
-import qrcode
 import logging
 import time
 import uuid
-from PIL import Image
-from typing import Optional, Tuple
+import hmac
+import base64
+import hashlib
+import threading
+from queue import Queue
+from typing import Optional, Tuple, TYPE_CHECKING
 from pathlib import Path
 import json
 
+from utils.helpers import lazy_import
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+qrcode = lazy_import("qrcode")
+
+def sign_payload(body: str, key: str) -> str:
+    """Short HMAC-SHA256 signature (128 bits, base64url) of a payload body"""
+    digest = hmac.new(key.encode("utf-8"), body.encode("utf-8"), hashlib.sha256).digest()[:16]
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode("ascii")
+
+def verify_payload(qr_text: str, key: str) -> Optional[dict]:
+    """Return the receipt object if its signature matches ``key``, else None"""
+    try:
+        receipt = json.loads(qr_text)[0]
+    except (ValueError, IndexError, KeyError, TypeError):
+        return None
+    sig = receipt.pop("sig", None)
+    if sig is None:
+        return None
+    body = json.dumps([receipt], separators=(",", ":"))
+    if not hmac.compare_digest(sig, sign_payload(body, key)):
+        return None
+    return receipt
+
 class QRService:
     def __init__(self, settings):
         self.settings = settings
         self.logger = logging.getLogger(__name__)
         self.output_dir = Path(getattr(settings, 'QR_OUTPUT_DIR', 'qr_codes'))
-        
+        self.signing_key = getattr(settings, 'QR_SIGNING_KEY', None)
+
         # Create output directory if it doesn't exist
         self.output_dir.mkdir(exist_ok=True, parents=True)
 
-    def generate_qr_image(self, data: dict) -> Tuple[Optional[Image.Image], Optional[str]]:
+        # PNG files are written by a background thread so saving never
+        # delays the end of a session
+        self._save_queue = Queue()
+        self._writer = None
+
+    def build_payload(self, data: dict, qr_id: str) -> str:
+        """Build the minified JSON receipt payload, signed when a key is configured"""
+        qr_data = [{
+            "qr_id": qr_id,
+            "items": []
+        }]
+
+        if data.get('plastic_count', 0) > 0:
+            qr_data[0]["items"].append({"class": "plastic", "count": data["plastic_count"]})
+
+        if data.get('can_count', 0) > 0:
+            qr_data[0]["items"].append({"class": "can", "count": data["can_count"]})
+
+        # Minified JSON keeps the QR version (and render time) low
+        qr_text = json.dumps(qr_data, separators=(",", ":"))
+        if self.signing_key:
+            qr_data[0]["sig"] = sign_payload(qr_text, self.signing_key)
+            qr_text = json.dumps(qr_data, separators=(",", ":"))
+        return qr_text
+
+    def generate_qr_image(self, data: dict) -> Tuple[Optional["Image.Image"], Optional[str]]:
         """Generate QR code image from recycling data"""
         try:
             # Generate a unique UUID for this QR code
             qr_id = str(uuid.uuid4())
-            
-            # Format the data as a JSON array with one object containing qr_id and items
-            qr_data = [{
-                "qr_id": qr_id,
-                "items": []
-            }]
-            
-            if data.get('plastic_count', 0) > 0:
-                qr_data[0]["items"].append({"class": "plastic", "count": data["plastic_count"]})
-            
-            if data.get('can_count', 0) > 0:
-                qr_data[0]["items"].append({"class": "can", "count": data["can_count"]})
-            
-            # Convert to nicely formatted JSON string
-            qr_text = json.dumps(qr_data, indent=2)
-            
+            qr_text = self.build_payload(data, qr_id)
+
             # Generate QR code
             qr = qrcode.QRCode(
-                version=1,
+                version=None,
                 error_correction=qrcode.constants.ERROR_CORRECT_L,
                 box_size=10,
                 border=4,
             )
             qr.add_data(qr_text)
             qr.make(fit=True)
-            
+
             return qr.make_image(fill_color="black", back_color="white"), qr_id
-            
+
         except Exception as e:
             self.logger.error(f"Error generating QR code: {str(e)}")
             return None, None
-            
+
+    def save_qr_image(self, qr_image: "Image.Image", qr_id: str) -> Path:
+        """Queue an already rendered QR image for saving; returns the target path"""
+        timestamp = int(time.time())
+        filename = self.output_dir / f"recycling_qr_{timestamp}_{qr_id[:8]}.png"
+
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._write_loop, name="qr-writer", daemon=True)
+            self._writer.start()
+        self._save_queue.put((qr_image, filename))
+        return filename
+
+    def _write_loop(self):
+        while True:
+            item = self._save_queue.get()
+            try:
+                if item is None:
+                    return
+                qr_image, filename = item
+                qr_image.save(filename)
+                self.logger.info("QR code saved to %s", filename)
+            except Exception as e:
+                self.logger.error(f"Error saving QR code: {str(e)}")
+            finally:
+                self._save_queue.task_done()
+
     def generate_qr_code(self, data: dict) -> Tuple[Path, str]:
         """Generate QR code and save to file, returning the file path and qr_id"""
         qr_image, qr_id = self.generate_qr_image(data)
         if qr_image and qr_id:
-            # Create a filename based on timestamp and qr_id
-            timestamp = int(time.time())
-            filename = self.output_dir / f"recycling_qr_{timestamp}_{qr_id[:8]}.png"
-            
-            # Save the image
-            qr_image.save(filename)
-            self.logger.info(f"QR code saved to {filename}")
-            return filename, qr_id
+            return self.save_qr_image(qr_image, qr_id), qr_id
         else:
-            raise ValueError("Failed to generate QR code image")
\ No newline at end of file
+            raise ValueError("Failed to generate QR code image")
+
+    def close(self):
+        """Flush pending saves and stop the writer thread"""
+        if self._writer is not None:
+            self._save_queue.put(None)
+            self._writer.join(timeout=5)
+            self._writer = None
@@ -0,0 +1,194 @@
+"""
+Receipt redemption and intake statistics over the session ledger. Run from
+``src`` at the counter, or from a script, against the kiosk's ledger:
+
+    python -m services.redemption_service redeem '<scanned QR text>'
+    python -m services.redemption_service lookup QR_ID
+    python -m services.redemption_service totals [--hours N]
+    python -m services.redemption_service bench [--receipts N]
+"""
+import os
+import sys
+import time
+import json
+import sqlite3
+import logging
+import argparse
+import tempfile
+import threading
+from typing import Dict, List, Optional
+
+from services.qr_service import verify_payload
+from config.settings import Settings
+
+# Redemption outcomes
+REDEEMED = "redeemed"
+NOT_FOUND = "not_found"
+EXPIRED = "expired"
+ALREADY_REDEEMED = "already_redeemed"
+INVALID_SIGNATURE = "invalid_signature"
+
+class RedemptionService:
+    """
+    Local receipt validation and statistics over the session ledger database.
+    Redemption is a single primary-key update on ``receipts``; statistics read
+    the pre-aggregated ``hourly_totals`` table, never the raw item rows.
+    """
+
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self.logger = logging.getLogger(__name__)
+        self.signing_key = getattr(settings, 'QR_SIGNING_KEY', None)
+        # One long-lived connection keeps lookups to a B-tree probe
+        self._conn = sqlite3.connect(str(settings.LEDGER_PATH), timeout=5, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+
+    def lookup(self, qr_id: str) -> Optional[Dict]:
+        """Return the receipt for a qr_id, or None if it was never issued"""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM receipts WHERE qr_id = ?", (qr_id,)).fetchone()
+        return dict(row) if row else None
+
+    def redeem(self, qr_id: str, now: Optional[float] = None) -> Dict:
+        """Atomically redeem a receipt; returns a dict with 'status' and the receipt fields"""
+        now = time.time() if now is None else now
+        with self._lock:
+            with self._conn:
+                updated = self._conn.execute(
+                    "UPDATE receipts SET redeemed_at = ? "
+                    "WHERE qr_id = ? AND redeemed_at IS NULL AND expires_at > ?",
+                    (now, qr_id, now)
+                ).rowcount
+            row = self._conn.execute("SELECT * FROM receipts WHERE qr_id = ?", (qr_id,)).fetchone()
+
+        if row is None:
+            return {'status': NOT_FOUND, 'qr_id': qr_id}
+        result = dict(row)
+        if updated:
+            result['status'] = REDEEMED
+        elif row['redeemed_at'] is not None:
+            result['status'] = ALREADY_REDEEMED
+        else:
+            result['status'] = EXPIRED
+        self.logger.info("Redemption of %s: %s", qr_id, result['status'])
+        return result
+
+    def redeem_payload(self, qr_text: str, now: Optional[float] = None) -> Dict:
+        """Redeem from the scanned QR text, checking its signature when a key is configured"""
+        if self.signing_key:
+            receipt = verify_payload(qr_text, self.signing_key)
+            if receipt is None:
+                return {'status': INVALID_SIGNATURE}
+            return self.redeem(receipt['qr_id'], now)
+
+        try:
+            qr_id = json.loads(qr_text)[0]['qr_id']
+        except (ValueError, IndexError, KeyError, TypeError):
+            return {'status': NOT_FOUND}
+        return self.redeem(qr_id, now)
+
+    def hourly_totals(self, since: Optional[float] = None, until: Optional[float] = None) -> List[Dict]:
+        """Per-hour, per-material counts: [{'hour': epoch_seconds, 'material': ..., 'count': ...}]"""
+        since = 0 if since is None else since - since % 3600
+        until = float("inf") if until is None else until
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT hour, material, count FROM hourly_totals "
+                "WHERE hour >= ? AND hour < ? ORDER BY hour, material",
+                (since, until)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def material_totals(self, since: Optional[float] = None, until: Optional[float] = None) -> Dict[str, int]:
+        """Totals per material over a time range, summed from the hourly aggregates"""
+        totals = {}
+        for row in self.hourly_totals(since, until):
+            totals[row['material']] = totals.get(row['material'], 0) + row['count']
+        return totals
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+def run_benchmark(ledger_path: str, receipts: int = 10000) -> Dict[str, float]:
+    """
+    Time lookups and redemptions on a copy of the ledger padded with
+    ``receipts`` synthetic receipts; the ledger itself is never modified.
+    Returns median and p95 latencies in microseconds.
+    """
+    source = sqlite3.connect(ledger_path)
+    fd, copy_path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    try:
+        copy = sqlite3.connect(copy_path)
+        source.backup(copy)
+        source.close()
+        now = time.time()
+        with copy:
+            copy.executemany(
+                "INSERT OR IGNORE INTO receipts (qr_id, session_id, issued_at, expires_at, "
+                "plastic_count, can_count, total_count) VALUES (?, ?, ?, ?, 1, 0, 1)",
+                ((f"bench-{n}", f"bench-{n}", now, now + 3600) for n in range(receipts))
+            )
+        copy.close()
+
+        service = RedemptionService(type("BenchSettings", (), {'LEDGER_PATH': copy_path})())
+        timings = {}
+        for name, call in (("lookup", service.lookup), ("redeem", service.redeem)):
+            samples = []
+            for n in range(0, receipts, max(1, receipts // 1000)):
+                started = time.perf_counter()
+                call(f"bench-{n}")
+                samples.append((time.perf_counter() - started) * 1e6)
+            samples.sort()
+            timings[f"{name}_p50_us"] = samples[len(samples) // 2]
+            timings[f"{name}_p95_us"] = samples[int(len(samples) * 0.95)]
+        service.close()
+        return timings
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(copy_path + suffix):
+                os.remove(copy_path + suffix)
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Redeem receipts and read intake statistics")
+    commands = parser.add_subparsers(dest="command", required=True)
+    redeem = commands.add_parser("redeem", help="redeem the text scanned from a receipt QR code")
+    redeem.add_argument("qr_text")
+    lookup = commands.add_parser("lookup", help="show a receipt without redeeming it")
+    lookup.add_argument("qr_id")
+    totals = commands.add_parser("totals", help="items per material")
+    totals.add_argument("--hours", type=float, help="only the last N hours")
+    bench = commands.add_parser("bench", help="time lookups and redemptions on a copy of the ledger")
+    bench.add_argument("--receipts", type=int, default=10000)
+    args = parser.parse_args(argv)
+
+    settings = Settings()
+    if not os.path.exists(str(settings.LEDGER_PATH)):
+        print(f"No ledger at {settings.LEDGER_PATH}", file=sys.stderr)
+        return 1
+
+    if args.command == "bench":
+        for name, value in run_benchmark(str(settings.LEDGER_PATH), args.receipts).items():
+            print(f"{name:>15} {value:8.1f}")
+        return 0
+
+    service = RedemptionService(settings)
+    try:
+        if args.command == "redeem":
+            result = service.redeem_payload(args.qr_text)
+            print(json.dumps(result))
+            return 0 if result['status'] == REDEEMED else 2
+        if args.command == "lookup":
+            receipt = service.lookup(args.qr_id)
+            print(json.dumps(receipt) if receipt else f"No receipt {args.qr_id}")
+            return 0 if receipt else 2
+        since = time.time() - args.hours * 3600 if args.hours else None
+        print(json.dumps(service.material_totals(since)))
+        return 0
+    finally:
+        service.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
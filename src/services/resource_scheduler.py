@@ -0,0 +1,91 @@
+import os
+import sys
+import logging
+import threading
+from typing import List
+
+from ..config.settings import Settings
+
+class ResourceScheduler:
+    """
+    CPU budget for the inference path. INFERENCE_RESERVED_CORES are kept for
+    the UI, serial and disk threads; torch gets the rest. Between sessions the
+    intra-op pool is shrunk to the idle profile so a waiting kiosk stays cool
+    and the UI stays smooth, and it grows to the busy profile while a session
+    is active. Optional CPU affinity pins inference and UI/I/O threads to
+    their cores (Linux only, where affinity is per thread).
+    """
+
+    IDLE = "idle"
+    BUSY = "busy"
+
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self.logger = logging.getLogger(__name__)
+        cores = os.cpu_count() or 1
+        reserved = max(0, min(settings.INFERENCE_RESERVED_CORES, cores - 1))
+        self.io_cores: List[int] = list(range(reserved))
+        self.inference_cores: List[int] = list(range(reserved, cores))
+        self.busy_threads = min(settings.INFERENCE_BUSY_THREADS or len(self.inference_cores),
+                                len(self.inference_cores))
+        self.idle_threads = max(1, min(settings.INFERENCE_IDLE_THREADS, self.busy_threads))
+        self.interop_threads = settings.INFERENCE_INTEROP_THREADS
+        self.affinity = settings.INFERENCE_CPU_AFFINITY and hasattr(os, "sched_setaffinity")
+
+        self.profile = None
+        self._active_sessions = 0
+        self._interop_set = False
+        self._lock = threading.Lock()
+
+    def configure_environment(self):
+        """Cap the OpenMP/MKL pools; only effective before torch is first imported"""
+        for name in ("OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+            os.environ.setdefault(name, str(self.busy_threads))
+
+    def apply(self, profile: str):
+        """Switch torch's intra-op thread count to the given profile"""
+        torch = sys.modules.get("torch")
+        threads = self.busy_threads if profile == self.BUSY else self.idle_threads
+        self.profile = profile
+        if torch is None:
+            return
+        if not self._interop_set:
+            # Can only be set once, before the first inter-op parallel work
+            self._interop_set = True
+            try:
+                torch.set_num_interop_threads(self.interop_threads)
+            except RuntimeError as e:
+                self.logger.debug("Inter-op threads already fixed: %s", e)
+        torch.set_num_threads(threads)
+        self.logger.info("Inference profile %s: %d intra-op threads", profile, threads)
+
+    def session_started(self):
+        with self._lock:
+            self._active_sessions += 1
+            if self._active_sessions == 1:
+                self.apply(self.BUSY)
+
+    def session_ended(self):
+        with self._lock:
+            if self._active_sessions == 0:
+                return
+            self._active_sessions -= 1
+            if self._active_sessions == 0:
+                self.apply(self.IDLE)
+
+    def pin_inference_thread(self):
+        """Pin the calling thread (and threads it starts later) to the inference cores"""
+        self._pin(self.inference_cores)
+
+    def pin_io_thread(self):
+        """Pin the calling thread to the cores reserved for UI and I/O"""
+        self._pin(self.io_cores)
+
+    def _pin(self, cores: List[int]):
+        if not self.affinity or not cores:
+            return
+        try:
+            # pid 0 is the calling thread on Linux
+            os.sched_setaffinity(0, cores)
+        except OSError as e:
+            self.logger.warning(f"Could not set CPU affinity {cores}: {str(e)}")
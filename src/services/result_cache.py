@@ -0,0 +1,111 @@
+import time
+import random
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from ..config.settings import Settings
+from .image_archive import dhash, hamming
+
+class DetectionResultCache:
+    """
+    Small LRU cache of confident per-image detection results keyed by a
+    perceptual hash of the detection ROI. Frames of the same bottle across
+    one insertion or its retries hash within a few bits of each other, so a
+    fresh frame close to a recent entry reuses that result instead of
+    running the model. A sampled fraction of hits is still run through the
+    model to measure how often the reused label would have been wrong.
+    """
+
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self.logger = logging.getLogger(__name__)
+        self.max_entries = settings.DETECTION_CACHE_SIZE
+        self.max_distance = settings.DETECTION_CACHE_DISTANCE
+        self.ttl = settings.DETECTION_CACHE_TTL
+        self.verify_rate = settings.DETECTION_CACHE_VERIFY_RATE
+        self.roi = settings.DETECTION_CACHE_ROI
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.lookups = 0
+        self.hits = 0
+        self.verified = 0
+        self.mismatches = 0
+
+    def key(self, image_path: str) -> Optional[int]:
+        return dhash(image_path, self.roi)
+
+    def lookup(self, key: Optional[int]) -> Optional[Dict]:
+        """Return a copy of the closest unexpired result within the distance threshold"""
+        if key is None:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            self.lookups += 1
+            best_key, best_distance = None, self.max_distance + 1
+            for entry_key, (stored_at, _) in list(self._entries.items()):
+                if now - stored_at > self.ttl:
+                    del self._entries[entry_key]
+                    continue
+                distance = hamming(key, entry_key)
+                if distance < best_distance:
+                    best_key, best_distance = entry_key, distance
+            if best_key is None:
+                return None
+            self._entries.move_to_end(best_key)
+            self.hits += 1
+            result = dict(self._entries[best_key][1])
+        self.logger.debug("Detection cache hit at distance %d: %s", best_distance, result['label'])
+        return result
+
+    def matches(self, a: Optional[int], b: Optional[int]) -> bool:
+        return a is not None and b is not None and hamming(a, b) <= self.max_distance
+
+    def record_reuse(self):
+        """Count a result shared between near-identical frames of one call as a hit"""
+        with self._lock:
+            self.hits += 1
+
+    def store(self, key: Optional[int], result: Dict):
+        if key is None:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), dict(result))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def should_verify(self) -> bool:
+        """Whether a hit should also be run through the model to measure accuracy"""
+        return self.verify_rate > 0 and random.random() < self.verify_rate
+
+    def record_verification(self, cached: Dict, fresh: Dict):
+        with self._lock:
+            self.verified += 1
+            if cached['label'] != fresh['label']:
+                self.mismatches += 1
+                mismatched = True
+            else:
+                mismatched = False
+        if mismatched:
+            self.logger.warning(f"Detection cache would have returned {cached['label']} "
+                                f"but the model says {fresh['label']} ({fresh['confidence']:.2f})")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        """Hit rate and measured label agreement of reused results, for tuning"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'lookups': self.lookups,
+                'hits': self.hits,
+                'hit_rate': self.hits / self.lookups if self.lookups else 0.0,
+                'verified': self.verified,
+                'mismatches': self.mismatches,
+                'agreement': 1.0 - self.mismatches / self.verified if self.verified else None,
+            }
@@ -0,0 +1,194 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+from queue import Queue, Empty
+from typing import Dict, List, Optional, Tuple
+
+from ..config.settings import Settings
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    opened_at REAL NOT NULL,
+    closed_at REAL,
+    qr_id TEXT,
+    status TEXT NOT NULL DEFAULT 'open',
+    lane_id INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    material TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_items_session ON items(session_id);
+CREATE INDEX IF NOT EXISTS idx_sessions_status ON sessions(status);
+CREATE TABLE IF NOT EXISTS receipts (
+    qr_id TEXT PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    issued_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    plastic_count INTEGER NOT NULL,
+    can_count INTEGER NOT NULL,
+    total_count INTEGER NOT NULL,
+    redeemed_at REAL
+);
+CREATE TABLE IF NOT EXISTS hourly_totals (
+    hour REAL NOT NULL,
+    material TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (hour, material)
+) WITHOUT ROWID;
+"""
+
+UPSERT_HOURLY = (
+    "INSERT INTO hourly_totals (hour, material, count) VALUES (?, ?, 1) "
+    "ON CONFLICT(hour, material) DO UPDATE SET count = count + 1"
+)
+
+class SessionLedger:
+    """
+    Append-only record of session open/close and every counted item, in
+    SQLite WAL mode, plus the receipts and hourly totals derived from them.
+    Callers only enqueue events; a writer thread commits them in batches
+    (group commit), so the intake loop never waits on fsync.
+    """
+
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self.logger = logging.getLogger(__name__)
+        self.path = str(settings.LEDGER_PATH)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        self._events = Queue()
+        self._writer = None
+
+        # Create the schema up front so recovery can read before the writer starts
+        conn = self._connect()
+        with conn:
+            conn.executescript(SCHEMA)
+            # Ledgers created before multi-lane support lack lane_id
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(sessions)")]
+            if "lane_id" not in columns:
+                conn.execute("ALTER TABLE sessions ADD COLUMN lane_id INTEGER NOT NULL DEFAULT 0")
+        conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=FULL")
+        return conn
+
+    def start(self):
+        """Start the group-commit writer thread"""
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._write_loop, name="session-ledger", daemon=True)
+            self._writer.start()
+
+    def open_session(self, session_id: str, lane_id: int = 0):
+        self._events.put((
+            ("INSERT OR IGNORE INTO sessions (session_id, opened_at, status, lane_id) VALUES (?, ?, 'open', ?)",
+             (session_id, time.time(), lane_id)),
+        ))
+
+    def record_item(self, session_id: str, material: str):
+        now = time.time()
+        self._events.put((
+            ("INSERT INTO items (session_id, material, created_at) VALUES (?, ?, ?)",
+             (session_id, material, now)),
+            # Keep per-hour totals current so statistics never scan items
+            (UPSERT_HOURLY, (now - now % 3600, material)),
+        ))
+
+    def close_session(self, session_id: str, qr_id: Optional[str], status: str = "closed",
+                      counts: Optional[Dict[str, int]] = None):
+        """Close a session; with a qr_id and counts, also issue a redeemable receipt"""
+        now = time.time()
+        statements = [(
+            "UPDATE sessions SET closed_at = ?, qr_id = ?, status = ? WHERE session_id = ?",
+            (now, qr_id, status, session_id)
+        )]
+        if qr_id and counts is not None:
+            statements.append((
+                "INSERT OR IGNORE INTO receipts (qr_id, session_id, issued_at, expires_at, "
+                "plastic_count, can_count, total_count) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (qr_id, session_id, now, now + self.settings.QR_CODE_EXPIRE_MINUTES * 60,
+                 counts.get('plastic_count', 0), counts.get('can_count', 0),
+                 counts.get('total_count', 0))
+            ))
+        self._events.put(tuple(statements))
+
+    def find_open_sessions(self, lane_id: int = 0) -> List[Tuple[str, float, List[Tuple[str, float]]]]:
+        """Return (session_id, opened_at, [(material, created_at), ...]) for a lane's sessions never closed"""
+        conn = self._connect()
+        try:
+            sessions = conn.execute(
+                "SELECT session_id, opened_at FROM sessions WHERE status = 'open' AND lane_id = ? "
+                "ORDER BY opened_at", (lane_id,)
+            ).fetchall()
+            result = []
+            for session_id, opened_at in sessions:
+                items = conn.execute(
+                    "SELECT material, created_at FROM items WHERE session_id = ? ORDER BY id", (session_id,)
+                ).fetchall()
+                result.append((session_id, opened_at, items))
+            return result
+        finally:
+            conn.close()
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Block until everything queued so far is committed"""
+        if self._writer is None:
+            return False
+        done = threading.Event()
+        self._events.put(done)
+        return done.wait(timeout)
+
+    def close(self):
+        """Commit pending events and stop the writer"""
+        if self._writer is not None:
+            self._events.put(None)
+            self._writer.join(timeout=10)
+            self._writer = None
+
+    def _write_loop(self):
+        conn = self._connect()
+        batch_size = self.settings.LEDGER_BATCH_SIZE
+        interval = self.settings.LEDGER_FLUSH_INTERVAL
+        stopping = False
+        try:
+            while not stopping:
+                batch = [self._events.get()]
+                deadline = time.monotonic() + interval
+                while len(batch) < batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(self._events.get(timeout=remaining))
+                    except Empty:
+                        break
+
+                statements = []
+                waiters = []
+                for event in batch:
+                    if event is None:
+                        stopping = True
+                    elif isinstance(event, threading.Event):
+                        waiters.append(event)
+                    else:
+                        statements.extend(event)
+
+                if statements:
+                    try:
+                        with conn:
+                            for sql, params in statements:
+                                conn.execute(sql, params)
+                    except sqlite3.Error as e:
+                        self.logger.error(f"Ledger commit of {len(statements)} events failed: {str(e)}")
+                for waiter in waiters:
+                    waiter.set()
+        finally:
+            conn.close()
@@ -0,0 +1,297 @@
+import os
+import json
+import time
+import random
+import sqlite3
+import hashlib
+import logging
+import threading
+import http.client
+from queue import Queue, Empty
+from typing import Dict, List, Tuple
+from urllib.parse import urlsplit
+
+from ..config.settings import Settings
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    body TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS dead_letter (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    body TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    attempts INTEGER NOT NULL,
+    status INTEGER,
+    rejected_at REAL NOT NULL
+);
+"""
+
+# Responses that reject the records themselves; retrying them unchanged will
+# not help. Other 4xx (auth, rate limits, a wrong URL) are retried with backoff.
+PERMANENT_REJECTIONS = (400, 410, 413, 415, 422)
+
+class KeepAliveClient:
+    """Minimal HTTP/1.1 client that reuses one persistent connection per endpoint"""
+
+    def __init__(self, url: str, timeout: float):
+        parts = urlsplit(url)
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.path = parts.path or "/"
+        if parts.query:
+            self.path += "?" + parts.query
+        self.timeout = timeout
+        self._conn = None
+
+    def _connection(self) -> http.client.HTTPConnection:
+        if self._conn is None:
+            cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+            self._conn = cls(self.host, self.port, timeout=self.timeout)
+        return self._conn
+
+    def post(self, body: bytes, headers: Dict[str, str]) -> Tuple[int, bytes]:
+        """POST to the endpoint; the connection is dropped on any error so the next call reconnects"""
+        try:
+            conn = self._connection()
+            conn.request("POST", self.path, body=body, headers=headers)
+            response = conn.getresponse()
+            data = response.read()
+            if response.will_close:
+                self.close()
+            return response.status, data
+        except Exception:
+            self.close()
+            raise
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+class UploadQueue:
+    """
+    Offline-first outbound queue for session records. Records are handed to a
+    worker thread, persisted in SQLite and uploaded in batches with retries,
+    exponential backoff and per-record idempotency keys (the receipt qr_id).
+    When a batch is permanently rejected, it is resent one record at a time
+    to find the bad record, which moves to ``dead_letter`` after
+    UPLOAD_MAX_ATTEMPTS rejections instead of blocking the queue.
+    The caller never blocks on disk or network I/O.
+    """
+
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self.logger = logging.getLogger(__name__)
+        self.path = str(settings.UPLOAD_DB_PATH)
+        self.enabled = bool(settings.UPLOAD_URL)
+        self._incoming = Queue()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        self.uploaded = 0
+        self.failed_attempts = 0
+        self.evicted = 0
+        self.dead_lettered = 0
+        self.backoff = 0.0
+        self._next_attempt = 0.0
+        self._isolating = 0  # records left to send one at a time after a rejected batch
+
+    def start(self):
+        if self._thread is None and self.enabled:
+            self._thread = threading.Thread(target=self._run, name="upload-queue", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop_event.set()
+            self._incoming.put(None)
+            self._thread.join(timeout=self.settings.UPLOAD_TIMEOUT + 2)
+            self._thread = None
+
+    def enqueue(self, idempotency_key: str, record: Dict):
+        """Queue one record for upload; returns immediately"""
+        if self.enabled:
+            self._incoming.put((idempotency_key, record))
+
+    def enqueue_session(self, qr_id: str, session_id: str, counts: Dict[str, int],
+                        items: List[Tuple[str, float]]):
+        """Queue a closed session with its item records, keyed by the receipt qr_id"""
+        self.enqueue(qr_id, {
+            'type': 'session',
+            'qr_id': qr_id,
+            'session_id': session_id,
+            'machine_id': self.settings.MACHINE_ID,
+            'closed_at': time.time(),
+            'counts': counts,
+            'items': [{'material': material, 'at': at} for material, at in items],
+        })
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10)
+        # auto_vacuum only takes effect before the first table is created
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        return conn
+
+    def _run(self):
+        conn = self._connect()
+        client = KeepAliveClient(self.settings.UPLOAD_URL, self.settings.UPLOAD_TIMEOUT)
+        try:
+            while not self._stop_event.is_set():
+                wait = max(0.0, min(self.settings.UPLOAD_INTERVAL, self._next_attempt - time.monotonic()))
+                self._store_incoming(conn, wait)
+                if self._stop_event.is_set() or time.monotonic() < self._next_attempt:
+                    continue
+                try:
+                    self._upload_batch(conn, client)
+                except Exception as e:
+                    self.logger.error(f"Upload worker error: {str(e)}", exc_info=True)
+                    self._schedule_retry()
+            # Persist anything still in memory so it survives the restart
+            self._store_incoming(conn, 0)
+        finally:
+            client.close()
+            conn.close()
+
+    def _store_incoming(self, conn: sqlite3.Connection, wait: float):
+        """Move queued records to disk, waiting up to ``wait`` seconds for the first one"""
+        records = []
+        try:
+            item = self._incoming.get(timeout=wait) if wait > 0 else self._incoming.get_nowait()
+            while True:
+                if item is not None:
+                    records.append(item)
+                item = self._incoming.get_nowait()
+        except Empty:
+            pass
+        if not records:
+            return
+
+        now = time.time()
+        with conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO outbox (idempotency_key, body, created_at) VALUES (?, ?, ?)",
+                [(key, json.dumps(record, separators=(",", ":")), now) for key, record in records]
+            )
+        self._enforce_disk_cap(conn)
+
+    def _enforce_disk_cap(self, conn: sqlite3.Connection):
+        """Evict the oldest records while the database is over UPLOAD_MAX_DB_MB"""
+        limit = self.settings.UPLOAD_MAX_DB_MB * 2**20
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        while conn.execute("PRAGMA page_count").fetchone()[0] * page_size > limit:
+            with conn:
+                deleted = conn.execute(
+                    "DELETE FROM outbox WHERE id IN (SELECT id FROM outbox ORDER BY id LIMIT ?)",
+                    (self.settings.UPLOAD_BATCH_SIZE,)
+                ).rowcount
+            conn.execute("PRAGMA incremental_vacuum")
+            if not deleted:
+                break
+            self.evicted += deleted
+            self.logger.warning(f"Upload queue over {self.settings.UPLOAD_MAX_DB_MB} MB; "
+                                f"evicted {deleted} oldest records ({self.evicted} total)")
+
+    def _upload_batch(self, conn: sqlite3.Connection, client: KeepAliveClient):
+        rows = conn.execute(
+            "SELECT id, idempotency_key, body, attempts FROM outbox ORDER BY id LIMIT ?",
+            (1 if self._isolating else self.settings.UPLOAD_BATCH_SIZE,)
+        ).fetchall()
+        if not rows:
+            self._next_attempt = time.monotonic() + self.settings.UPLOAD_INTERVAL
+            return
+
+        keys = [key for _, key, _, _ in rows]
+        body = ('{"records":[' + ",".join(
+            '{"idempotency_key":%s,"record":%s}' % (json.dumps(key), record)
+            for _, key, record, _ in rows
+        ) + "]}").encode("utf-8")
+        headers = {
+            "Content-Type": "application/json",
+            "Idempotency-Key": hashlib.sha256("\n".join(keys).encode("utf-8")).hexdigest(),
+        }
+        if self.settings.UPLOAD_AUTH_TOKEN:
+            headers["Authorization"] = f"Bearer {self.settings.UPLOAD_AUTH_TOKEN}"
+
+        ids = [(row_id,) for row_id, _, _, _ in rows]
+        try:
+            status, _ = client.post(body, headers)
+        except (OSError, http.client.HTTPException) as e:
+            status = None
+            self.logger.warning(f"Upload of {len(rows)} records failed: {str(e)}")
+
+        # 409 means the server already has these keys
+        if status is not None and (200 <= status < 300 or status == 409):
+            with conn:
+                conn.executemany("DELETE FROM outbox WHERE id = ?", ids)
+            self.uploaded += len(rows)
+            self.backoff = 0.0
+            # Keep draining a backlog immediately; otherwise wait to batch new records
+            if self._isolating:
+                self._isolating -= 1
+                self._next_attempt = 0.0
+            elif len(rows) < self.settings.UPLOAD_BATCH_SIZE:
+                self._next_attempt = time.monotonic() + self.settings.UPLOAD_INTERVAL
+            else:
+                self._next_attempt = 0.0
+            self.logger.debug("Uploaded %d records", len(rows))
+            return
+
+        if status is not None:
+            self.logger.warning(f"Upload of {len(rows)} records rejected with HTTP {status}")
+        if status not in PERMANENT_REJECTIONS:
+            self._schedule_retry()
+            return
+
+        # attempts counts permanent rejections only
+        with conn:
+            conn.executemany("UPDATE outbox SET attempts = attempts + 1 WHERE id = ?", ids)
+        if len(rows) > 1:
+            # One bad record fails the whole batch; resend it record by record to find it
+            self._isolating = len(rows)
+            self._next_attempt = 0.0
+            return
+        row_id, key, _, attempts = rows[0]
+        if attempts + 1 >= self.settings.UPLOAD_MAX_ATTEMPTS:
+            self._dead_letter(conn, row_id, key, attempts + 1, status)
+            self._isolating = max(0, self._isolating - 1)
+            self._next_attempt = 0.0
+        else:
+            self._schedule_retry()
+
+    def _dead_letter(self, conn: sqlite3.Connection, row_id: int, key: str, attempts: int, status: int):
+        """Move a record the server keeps rejecting out of the outbox"""
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO dead_letter (idempotency_key, body, created_at, attempts, "
+                "status, rejected_at) SELECT idempotency_key, body, created_at, attempts, ?, ? "
+                "FROM outbox WHERE id = ?", (status, time.time(), row_id)
+            )
+            conn.execute("DELETE FROM outbox WHERE id = ?", (row_id,))
+        self.dead_lettered += 1
+        self.logger.error(f"Record {key} rejected {attempts} times with HTTP {status}; "
+                          f"moved to dead_letter")
+
+    def _schedule_retry(self):
+        """Exponential backoff with jitter, capped at UPLOAD_MAX_BACKOFF"""
+        self.failed_attempts += 1
+        base = self.settings.UPLOAD_INTERVAL
+        self.backoff = min(self.settings.UPLOAD_MAX_BACKOFF, max(base, self.backoff * 2))
+        self._next_attempt = time.monotonic() + self.backoff * random.uniform(0.5, 1.0)
+
+    def pending(self) -> int:
+        """Number of records waiting on disk (opens a short-lived connection)"""
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+        finally:
+            conn.close()
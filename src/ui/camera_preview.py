@@ -0,0 +1,94 @@
+import time
+import tkinter as tk
+from tkinter import ttk
+from typing import Callable, Optional, Tuple
+from PIL import Image, ImageTk
+
+from utils.helpers import lazy_import
+
+cv2 = lazy_import("cv2")
+
+class CameraPreview:
+    """
+    Low-rate, downscaled camera preview. Frames come from
+    CameraController.get_latest_frame, so the preview never reads the
+    capture device itself. Resize/colour buffers and the PhotoImage are
+    allocated once and reused every tick, until ``size`` changes.
+    """
+
+    def __init__(self, parent, frame_source: Callable[[], Tuple[int, Optional[object]]],
+                 fps: float = 5.0, size: Tuple[int, int] = (320, 240)):
+        self.parent = parent
+        self.frame_source = frame_source
+        self.interval_ms = max(1, int(1000 / fps))
+        self.size = tuple(size)
+
+        self.frame = ttk.LabelFrame(parent, text="Camera", padding="5")
+        self.label = tk.Label(self.frame, bg="black")
+        self.label.pack()
+
+        self._photo = None
+        self._photo_size = None
+        self._resized = None
+        self._rgb = None
+        self._last_seq = -1
+        self._job = None
+
+        # CPU accounting for the debug overlay
+        self._cpu_time = 0.0
+        self._frames = 0
+        self._window_start = time.perf_counter()
+        self.cpu_percent = 0.0
+        self.ms_per_frame = 0.0
+        self.actual_fps = 0.0
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    def start(self):
+        if self._job is None:
+            self._job = self.frame.after(self.interval_ms, self._tick)
+
+    def stop(self):
+        if self._job is not None:
+            self.frame.after_cancel(self._job)
+            self._job = None
+
+    def _tick(self):
+        started = time.thread_time()
+        try:
+            seq, frame = self.frame_source()
+            if frame is not None and seq != self._last_seq:
+                self._last_seq = seq
+                self._render(frame)
+                self._frames += 1
+        finally:
+            self._cpu_time += time.thread_time() - started
+            self._update_stats()
+            self._job = self.frame.after(self.interval_ms, self._tick)
+
+    def _render(self, frame):
+        self._resized = cv2.resize(frame, self.size, dst=self._resized, interpolation=cv2.INTER_AREA)
+        self._rgb = cv2.cvtColor(self._resized, cv2.COLOR_BGR2RGB, dst=self._rgb)
+        image = Image.frombuffer("RGB", self.size, self._rgb, "raw", "RGB", 0, 1)
+        if self._photo is None or self._photo_size != self.size:
+            self._photo = ImageTk.PhotoImage(image)
+            self._photo_size = self.size
+            self.label.config(image=self._photo, width=self.size[0], height=self.size[1])
+        else:
+            self._photo.paste(image)
+
+    def _update_stats(self):
+        elapsed = time.perf_counter() - self._window_start
+        if elapsed < 2.0:
+            return
+        self.cpu_percent = 100.0 * self._cpu_time / elapsed
+        self.ms_per_frame = 1000.0 * self._cpu_time / self._frames if self._frames else 0.0
+        self.actual_fps = self._frames / elapsed
+        self._cpu_time = 0.0
+        self._frames = 0
+        self._window_start = time.perf_counter()
+
+    def stats_text(self) -> str:
+        return (f"Preview: {self.actual_fps:.1f} fps, "
+                f"{self.ms_per_frame:.1f} ms/frame, {self.cpu_percent:.1f}% CPU")
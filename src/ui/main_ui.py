@@ -1,33 +1,79 @@
 import tkinter as tk
 from tkinter import messagebox, ttk
-from queue import Queue
-import threading
+from queue import Queue, Empty
+import logging
 from PIL import Image
 
 from ui.qr_display import QRDisplayWindow
+from ui.camera_preview import CameraPreview
+from services.printer_service import ReceiptPrinter
+from ui.messages import (
+    coalesce_messages, DetectionResult, DisplayQR, QRGenerationFailed,
+    RestartUI, SessionData, SessionStarted, SystemShutdown
+)
 
 class RVMachineUI:
-    def __init__(self, command_queue: Queue, response_queue: Queue):
+    # How often the Tk thread drains the response queue, and how much per tick
+    POLL_INTERVAL_MS = 50
+    MAX_BATCH = 64
+
+    DEBUG_REFRESH_MS = 1000
+
+    def __init__(self, command_queue: Queue, response_queue: Queue, settings=None, frame_source=None):
         self.command_queue = command_queue
         self.response_queue = response_queue
+        self.settings = settings
+        self.logger = logging.getLogger(__name__)
         self.root = tk.Tk()
         self.root.title("Reverse Vending Machine")
         self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         
         # Configure window size and position
-        self.root.geometry("500x400")
+        show_preview = frame_source is not None and settings is not None and settings.PREVIEW_ENABLED
+        width = 500 + (settings.PREVIEW_SIZE[0] + 30 if show_preview else 0)
+        self.root.geometry(f"{width}x420")
         self.root.resizable(False, False)
         
         # System state
         self.session_active = False
         self.processing_item = False
         
+        # Direct ESC/POS printing when a receipt printer is configured
+        self.printer = None
+        if settings is not None and settings.PRINTER_DEVICE:
+            self.printer = ReceiptPrinter(settings)
+        
+        # Camera preview, fed from the camera grabber's latest frame
+        self.preview = None
+        if show_preview:
+            self.preview = CameraPreview(
+                self.root, frame_source,
+                fps=settings.PREVIEW_FPS,
+                size=settings.PREVIEW_SIZE
+            )
+            self.preview.pack(side=tk.RIGHT, fill=tk.Y, padx=(0, 10), pady=10)
+            self.preview.start()
+        
         # Create UI elements
         self.create_widgets()
+        self._create_debug_overlay()
+        
+        self._handlers = {
+            DetectionResult: self._on_detection_result,
+            SessionData: self._on_session_data,
+            DisplayQR: self._on_display_qr,
+            QRGenerationFailed: self._on_qr_generation_failed,
+            SessionStarted: self._on_session_started,
+            SystemShutdown: self._on_system_shutdown,
+            RestartUI: self._on_restart_ui,
+        }
+        self._clear_result_job = None
+        self._poll_job = None
+        self.qr_window = None
+        self.restart_requested = False
         
-        # Start the UI update thread
-        self.update_thread = threading.Thread(target=self.update_ui, daemon=True)
-        self.update_thread.start()
+        # Drain controller messages on the Tk thread
+        self._poll_job = self.root.after(self.POLL_INTERVAL_MS, self.update_ui)
     
     def create_widgets(self):
         """Create all UI widgets"""
@@ -108,6 +154,37 @@ class RVMachineUI:
         )
         self.detection_result.pack(pady=5)
     
+    def _create_debug_overlay(self):
+        """Small diagnostics line at the bottom of the window, toggled with F12"""
+        self.debug_label = tk.Label(self.root, text="", font=('Courier', 8), fg='gray', anchor=tk.W)
+        self.debug_visible = False
+        self._debug_job = None
+        self.root.bind("<F12>", lambda event: self.toggle_debug_overlay())
+        if self.settings is not None and self.settings.UI_DEBUG_OVERLAY:
+            self.toggle_debug_overlay()
+    
+    def toggle_debug_overlay(self):
+        self.debug_visible = not self.debug_visible
+        if self.debug_visible:
+            self.debug_label.place(relx=0, rely=1, anchor=tk.SW)
+            self._refresh_debug_overlay()
+        else:
+            self.debug_label.place_forget()
+            if self._debug_job is not None:
+                self.root.after_cancel(self._debug_job)
+                self._debug_job = None
+    
+    def _refresh_debug_overlay(self):
+        parts = []
+        if self.preview is not None:
+            parts.append(self.preview.stats_text())
+        parts.append(f"UI queue: {self.response_queue.qsize()}")
+        dropped = getattr(self.response_queue, 'dropped', None)
+        if dropped is not None:
+            parts.append(f"dropped: {dropped}")
+        self.debug_label.config(text=" | ".join(parts))
+        self._debug_job = self.root.after(self.DEBUG_REFRESH_MS, self._refresh_debug_overlay)
+    
     def start_session(self):
         """Handle start session button click"""
         self.command_queue.put("START_SESSION")
@@ -125,73 +202,95 @@ class RVMachineUI:
         self.session_active = False
     
     def update_ui(self):
-        """Continuously update UI based on responses from main controller"""
-        while True:
+        """Drain pending controller messages in one batch and reschedule"""
+        batch = []
+        try:
+            while len(batch) < self.MAX_BATCH:
+                batch.append(self.response_queue.get_nowait())
+        except Empty:
+            pass
+        
+        for message in coalesce_messages(batch):
+            handler = self._handlers.get(type(message))
+            if handler is None:
+                self.logger.warning(f"Unhandled UI message: {message!r}")
+                continue
             try:
-                # Check for messages from main controller
-                message = self.response_queue.get(timeout=0.1)
-                
-                if message.startswith("DETECTION_RESULT:"):
-                    result = message.split(":")[1]
-                    self.detection_result.config(text=result)
-                    self.root.after(3000, lambda: self.detection_result.config(text=""))
-                
-                elif message.startswith("SESSION_DATA:"):
-                    try:
-                        data_str = message.split("SESSION_DATA:")[1]
-                        data = eval(data_str)  # Safe because we control the input
-                        
-                        # Update all counters
-                        self.plastic_count.config(text=f"Plastic Bottles: {data.get('plastic_count', 0)}")
-                        self.can_count.config(text=f"Cans: {data.get('can_count', 0)}")
-                        self.reject_count.config(text=f"Rejected Items: {data.get('rejected_count', 0)}")
-                        self.total_count.config(text=f"Total Items: {data.get('total_count', 0)}")
-                        
-                        # Flash the background to show update
-                        self._flash_background()
-                        
-                    except Exception as e:
-                        print(f"Error processing session data: {e}")
-                
-                elif message == "DISPLAY_QR":
-                    # Get the next item from queue which contains the QR data
-                    qr_data = self.response_queue.get()
-                    if len(qr_data) == 3:  # Ensure we have all three components
-                        qr_image, counts, qr_id = qr_data
-                        self.display_qr_window(qr_image, counts, qr_id)
-                    else:
-                        self.logger.error("Invalid QR data received")
-                
-                elif message == "SHOW_QR":
-                    # For backward compatibility
-                    qr_path = self.response_queue.get()
-                    self.show_qr_message(qr_path)
-                
-                elif message == "QR_GENERATION_FAILED":
-                    messagebox.showerror(
-                        "Error",
-                        "Failed to generate QR code for your session."
-                    )
-                
-                elif message == "SESSION_STARTED":
-                    # Reset the session counters
-                    self.plastic_count.config(text="Plastic Bottles: 0")
-                    self.can_count.config(text="Cans: 0")
-                    self.total_count.config(text="Total Items: 0")
-                    self.detection_result.config(text="")
-                
-                elif message == "SYSTEM_SHUTDOWN":
-                    self.root.after(0, lambda: messagebox.showinfo(
-                        "System Shutting Down",
-                        "The system is shutting down. Please complete your session."
-                    ))
-            
+                handler(message)
             except Exception as e:
-                continue
+                self.logger.error(f"Error handling {type(message).__name__}: {e}", exc_info=True)
+        
+        if not self.restart_requested:
+            self._poll_job = self.root.after(self.POLL_INTERVAL_MS, self.update_ui)
+    
+    def _on_detection_result(self, message: DetectionResult):
+        self.detection_result.config(text=message.text)
+        if self._clear_result_job is not None:
+            self.root.after_cancel(self._clear_result_job)
+        self._clear_result_job = self.root.after(3000, self._clear_detection_result)
+    
+    def _clear_detection_result(self):
+        self._clear_result_job = None
+        self.detection_result.config(text="")
+    
+    def _on_session_data(self, message: SessionData):
+        data = message.counts
+        self.plastic_count.config(text=f"Plastic Bottles: {data.get('plastic_count', 0)}")
+        self.can_count.config(text=f"Cans: {data.get('can_count', 0)}")
+        self.reject_count.config(text=f"Rejected Items: {data.get('rejected_count', 0)}")
+        self.total_count.config(text=f"Total Items: {data.get('total_count', 0)}")
+        
+        # Flash the background to show update
+        self._flash_background()
+    
+    def _on_display_qr(self, message: DisplayQR):
+        self.display_qr_window(message.qr_image, message.counts, message.qr_id)
+    
+    def _on_qr_generation_failed(self, message: QRGenerationFailed):
+        messagebox.showerror(
+            "Error",
+            "Failed to generate QR code for your session."
+        )
+    
+    def _on_session_started(self, message: SessionStarted):
+        # Also sent for sessions recovered after a restart, so sync the controls
+        self.session_active = True
+        self.start_button.config(state=tk.DISABLED)
+        self.end_button.config(state=tk.NORMAL)
+        self.status_label.config(text="Session active - please insert items")
+        
+        # Reset the session counters
+        self.plastic_count.config(text="Plastic Bottles: 0")
+        self.can_count.config(text="Cans: 0")
+        self.reject_count.config(text="Rejected Items: 0")
+        self.total_count.config(text="Total Items: 0")
+        self.detection_result.config(text="")
+    
+    def _on_system_shutdown(self, message: SystemShutdown):
+        messagebox.showinfo(
+            "System Shutting Down",
+            "The system is shutting down. Please complete your session."
+        )
+    
+    def _on_restart_ui(self, message: RestartUI):
+        """Tear down this Tk instance so the controller can start a fresh one"""
+        self.logger.warning("Restarting UI to reclaim memory")
+        self.restart_requested = True
+        self._close_qr_window()
+        self.root.quit()
     
     def display_qr_window(self, qr_image: Image.Image, counts: dict, qr_id: str):
-        """Display QR code in a new window"""
-        QRDisplayWindow(self.root, qr_image, counts, qr_id)
+        """Display QR code in a new window, replacing any receipt still open"""
+        self._close_qr_window()
+        self.qr_window = QRDisplayWindow(self.root, qr_image, counts, qr_id, printer=self.printer)
+    
+    def _close_qr_window(self):
+        if self.qr_window is not None:
+            try:
+                self.qr_window.on_close()
+            except tk.TclError:
+                pass  # Already closed by the user
+            self.qr_window = None
 
     def _flash_background(self):
         """Flash the background to visually indicate update"""
@@ -200,13 +299,6 @@ class RVMachineUI:
             widget.config(background='light green')
             self.root.after(100, lambda w=widget, bg=original_bg: w.config(background=bg))
     
-    def show_qr_message(self, qr_path):
-        """Show message with QR code information"""
-        messagebox.showinfo(
-            "Session Complete",
-            f"Thank you for recycling!\n\nQR code saved to:\n{qr_path}"
-        )
-    
     def on_close(self):
         """Handle window close event"""
         self.command_queue.put("QUIT")
@@ -214,4 +306,8 @@ class RVMachineUI:
     
     def run(self):
         """Start the UI main loop"""
-        self.root.mainloop()
\ No newline at end of file
+        self.root.mainloop()
+        if self.restart_requested:
+            if self._poll_job is not None:
+                self.root.after_cancel(self._poll_job)
+            self.root.destroy()
\ No newline at end of file
@@ -0,0 +1,65 @@
+"""
+Typed messages sent from MainController to the UI over ``ui_response_queue``.
+
+The UI drains the queue on the Tk thread in batches. Messages marked
+``coalesce = True`` supersede earlier messages of the same type in a batch,
+so a burst of counter updates results in a single redraw. Messages marked
+``evictable = True`` carry large payloads and may be dropped, oldest first,
+when the queue is full; everything else is a small control message that is
+never dropped.
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List
+
+class UIMessage:
+    """Base class for controller-to-UI messages"""
+    coalesce = False
+    evictable = False
+
+@dataclass(frozen=True)
+class SessionStarted(UIMessage):
+    pass
+
+@dataclass(frozen=True)
+class SessionData(UIMessage):
+    counts: Dict[str, int] = field(default_factory=dict)
+    coalesce = True
+
+@dataclass(frozen=True)
+class DetectionResult(UIMessage):
+    text: str = ""
+    coalesce = True
+
+@dataclass(frozen=True)
+class DisplayQR(UIMessage):
+    qr_image: Any
+    counts: Dict[str, int]
+    qr_id: str
+    # The receipt is already in the ledger; only the newest one needs showing
+    evictable = True
+
+@dataclass(frozen=True)
+class QRGenerationFailed(UIMessage):
+    pass
+
+@dataclass(frozen=True)
+class SystemShutdown(UIMessage):
+    pass
+
+@dataclass(frozen=True)
+class RestartUI(UIMessage):
+    pass
+
+def coalesce_messages(messages: Iterable[UIMessage]) -> List[UIMessage]:
+    """Drop coalescable messages superseded by a later one of the same type, keeping order"""
+    messages = list(messages)
+    seen = set()
+    kept = []
+    for message in reversed(messages):
+        if message.coalesce:
+            if type(message) in seen:
+                continue
+            seen.add(type(message))
+        kept.append(message)
+    kept.reverse()
+    return kept
@@ -3,14 +3,24 @@ from tkinter import messagebox
 from PIL import Image, ImageTk
 import platform
 import os
+import logging
 import tempfile
+import threading
+import subprocess
 
 class QRDisplayWindow:
-    def __init__(self, parent, qr_image: Image.Image, summary_data: dict, qr_id: str):
+    # Seconds a temporary print file is kept for the spooler or viewer to read
+    TEMP_FILE_GRACE_SECONDS = 60
+    
+    def __init__(self, parent, qr_image: Image.Image, summary_data: dict, qr_id: str, printer=None):
         self.parent = parent
         self.qr_image = qr_image
         self.summary_data = summary_data
         self.qr_id = qr_id
+        self.printer = printer
+        self.logger = logging.getLogger(__name__)
+        self._print_thread = None
+        self._print_error = None
         
         self.window = tk.Toplevel(parent)
         self.window.title("Recycling Receipt")
@@ -73,36 +83,87 @@ class QRDisplayWindow:
         close_btn.pack(side=tk.LEFT, padx=10)
     
     def print_receipt(self):
-        """Cross-platform printing of receipt with QR ID"""
+        """Print on a worker thread: over ESC/POS when a printer is configured, else through the OS"""
+        if self._print_thread is not None and self._print_thread.is_alive():
+            return
+        target = self._print_escpos if self.printer is not None else self._print_file
+        self._print_error = None
+        self._print_thread = threading.Thread(target=self._print_worker, args=(target,), daemon=True)
+        self._print_thread.start()
+        self._after(100, self._check_print_done)
+    
+    def _print_worker(self, target):
         try:
-            # Create temporary file
-            with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tmp:
-                temp_path = tmp.name
-                self.qr_image.save(temp_path)
-                
-                # Platform-specific printing
-                system = platform.system()
-                if system == "Windows":
-                    os.startfile(temp_path, "print")
-                elif system == "Darwin":  # macOS
-                    os.system(f"lpr -o fit-to-page {temp_path}")
-                else:  # Linux
-                    os.system(f"xdg-open {temp_path}")
-                
-                # Queue file for deletion after printing
-                self.window.after(10000, lambda: os.unlink(temp_path))
-                
-                # Show success message
-                messagebox.showinfo(
-                    "Printing",
-                    f"Receipt with QR ID {self.qr_id} sent to printer"
-                )
-                
+            target()
         except Exception as e:
+            # Logged here too, in case no window is left to show it
+            self.logger.error(f"Could not print receipt {self.qr_id}: {str(e)}", exc_info=True)
+            self._print_error = e
+    
+    def _print_escpos(self):
+        self.printer.print_receipt(self.qr_image, self.summary_data, self.qr_id)
+    
+    def _print_file(self):
+        """Hand a temporary PNG to the platform's print or viewer command"""
+        fd, temp_path = tempfile.mkstemp(suffix=".png")
+        os.close(fd)
+        try:
+            self.qr_image.save(temp_path)
+            
+            # Platform-specific printing
+            system = platform.system()
+            if system == "Windows":
+                os.startfile(temp_path, "print")
+            elif system == "Darwin":  # macOS
+                subprocess.run(["lpr", "-o", "fit-to-page", temp_path], check=True)
+            else:  # Linux
+                subprocess.run(["xdg-open", temp_path], check=True)
+        finally:
+            # The spooler or viewer may still open the file after the command returns
+            cleanup = threading.Timer(self.TEMP_FILE_GRACE_SECONDS, self._remove_file, args=(temp_path,))
+            cleanup.daemon = True
+            cleanup.start()
+    
+    @staticmethod
+    def _remove_file(path: str):
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+    
+    def _after(self, ms: int, callback):
+        """Schedule on the root window, which outlives this one"""
+        try:
+            self.parent.after(ms, callback)
+        except tk.TclError:
+            self.logger.warning(f"UI closed while printing receipt {self.qr_id}")
+    
+    def _window_exists(self) -> bool:
+        try:
+            return bool(self.window.winfo_exists())
+        except tk.TclError:
+            return False
+    
+    def _check_print_done(self):
+        if self._print_thread.is_alive():
+            self._after(100, self._check_print_done)
+            return
+        # The window may have been closed (timeout, new session) while printing
+        window_open = self._window_exists()
+        if self._print_error is not None:
             messagebox.showerror(
                 "Print Error",
-                f"Could not print receipt:\n{str(e)}"
+                f"Could not print receipt:\n{str(self._print_error)}",
+                parent=self.window if window_open else self.parent
+            )
+        elif window_open:
+            messagebox.showinfo(
+                "Printing",
+                f"Receipt with QR ID {self.qr_id} sent to printer",
+                parent=self.window
             )
+        else:
+            self.logger.info("Receipt %s sent to printer", self.qr_id)
     
     def on_close(self):
         """Clean up when window is closed"""
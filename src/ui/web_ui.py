@@ -0,0 +1,368 @@
+import io
+import hmac
+import json
+import logging
+import secrets
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from queue import Queue, Empty, Full
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from ui.messages import (
+    coalesce_messages, DetectionResult, DisplayQR, QRGenerationFailed,
+    RestartUI, SessionData, SessionStarted, SystemShutdown
+)
+
+PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Reverse Vending Machine</title>
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<style>
+body{font-family:sans-serif;margin:2em;text-align:center}
+#counts div{font-size:1.4em;margin:.3em}
+#result{min-height:1.5em;font-size:1.3em;color:#060;margin:1em}
+button{font-size:1.2em;padding:.6em 1.4em;margin:.5em}
+#receipt img{width:240px;height:240px}
+</style></head><body>
+<h1>Reverse Vending Machine</h1>
+<div id="status">Connecting...</div>
+<div id="counts">
+<div>Plastic Bottles: <span id="plastic_count">0</span></div>
+<div>Cans: <span id="can_count">0</span></div>
+<div>Rejected Items: <span id="rejected_count">0</span></div>
+<div>Total Items: <span id="total_count">0</span></div>
+</div>
+<div id="result"></div>
+<button id="start" onclick="send('START_SESSION')">Start Session</button>
+<button id="end" onclick="send('END_SESSION')" disabled>End Session</button>
+<div id="receipt"></div>
+<script>
+const $ = id => document.getElementById(id);
+const TOKEN = "__TOKEN__";
+function send(command) { fetch("/command", {method: "POST", headers: {"X-Kiosk-Token": TOKEN}, body: command}); }
+function setActive(active) {
+  $("start").disabled = active; $("end").disabled = !active;
+  $("status").textContent = active ? "Session active - please insert items" : "Session ended - waiting for user";
+}
+function setCounts(counts) {
+  for (const key of ["plastic_count", "can_count", "rejected_count", "total_count"]) $(key).textContent = counts[key] || 0;
+}
+let clearResult = null;
+const events = new EventSource("/events");
+events.addEventListener("session", e => {
+  const data = JSON.parse(e.data); setActive(data.active);
+  if (data.active) $("receipt").innerHTML = "";
+});
+events.addEventListener("counts", e => setCounts(JSON.parse(e.data)));
+events.addEventListener("detection", e => {
+  $("result").textContent = JSON.parse(e.data).text;
+  clearTimeout(clearResult); clearResult = setTimeout(() => $("result").textContent = "", 3000);
+});
+events.addEventListener("receipt", e => {
+  const data = JSON.parse(e.data); setCounts(data.counts);
+  $("receipt").innerHTML = '<h2>Your receipt</h2><img src="' + (data.svg || data.png) + '" alt="QR receipt">' +
+    '<div>Receipt ID: ' + data.qr_id + '</div>';
+});
+events.addEventListener("qr_failed", () => $("receipt").textContent = "Failed to generate QR code for your session.");
+events.addEventListener("shutdown", () => { $("status").textContent = "The system is shutting down."; events.close(); });
+</script></body></html>
+"""
+
+def qr_svg(qr_image) -> Optional[bytes]:
+    """Render a qrcode image's module matrix as a compact SVG, or None if unavailable"""
+    modules = getattr(qr_image, "modules", None)
+    if not modules:
+        return None
+    border = getattr(qr_image, "border", 4)
+    size = len(modules) + 2 * border
+    path = "".join(
+        f"M{x + border} {y + border}h1v1h-1z"
+        for y, row in enumerate(modules) for x, dark in enumerate(row) if dark
+    )
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {size} {size}" '
+            f'shape-rendering="crispEdges"><rect width="{size}" height="{size}" fill="#fff"/>'
+            f'<path d="{path}" fill="#000"/></svg>').encode("ascii")
+
+def qr_png(qr_image) -> bytes:
+    buffer = io.BytesIO()
+    qr_image.save(buffer)
+    return buffer.getvalue()
+
+class EventHub:
+    """
+    Fans server-sent events out to connected browsers. Each client has a
+    small queue; a client too slow to keep up is disconnected and, since
+    EventSource reconnects by itself, comes back with a fresh snapshot.
+    """
+
+    def __init__(self, client_queue_size: int = 64):
+        self.client_queue_size = client_queue_size
+        self.logger = logging.getLogger(__name__)
+        self._clients: List[Queue] = []
+        self._lock = threading.Lock()
+        # Latest event of each kind, replayed to new clients
+        self._state: "OrderedDict[str, str]" = OrderedDict()
+
+    def subscribe(self) -> Tuple[Queue, List[Tuple[str, str]]]:
+        client = Queue(self.client_queue_size)
+        with self._lock:
+            self._clients.append(client)
+            return client, list(self._state.items())
+
+    def unsubscribe(self, client: Queue):
+        with self._lock:
+            if client in self._clients:
+                self._clients.remove(client)
+
+    def publish(self, event: str, data: Dict, sticky: bool = True):
+        payload = json.dumps(data, separators=(",", ":"))
+        with self._lock:
+            if sticky:
+                self._state[event] = payload
+                self._state.move_to_end(event)
+            for client in list(self._clients):
+                try:
+                    client.put_nowait((event, payload))
+                except Full:
+                    self.logger.warning("Web UI client too slow; disconnecting it")
+                    self._clients.remove(client)
+                    self._disconnect(client)
+
+    def close(self):
+        """End every stream after the events already queued for it"""
+        with self._lock:
+            for client in self._clients:
+                self._disconnect(client, drop_pending=False)
+            self._clients.clear()
+
+    @staticmethod
+    def _disconnect(client: Queue, drop_pending: bool = True):
+        """Queue the end-of-stream marker, discarding pending events unless asked to keep them"""
+        with client.mutex:
+            if drop_pending:
+                client.queue.clear()
+            client.queue.append(None)
+            client.not_empty.notify()
+
+    def forget(self, *events: str):
+        with self._lock:
+            for event in events:
+                self._state.pop(event, None)
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    ui: "WebKioskUI" = None
+    protocol_version = "HTTP/1.1"
+    KEEPALIVE_SECONDS = 15
+
+    def log_message(self, format, *args):
+        self.ui.logger.debug("Web UI %s - " + format, self.address_string(), *args)
+
+    def _send(self, status: int, body: bytes, content_type: str, cache: bool = False):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "public, max-age=86400, immutable" if cache else "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/":
+            self._send(200, self.ui.page, "text/html; charset=utf-8")
+        elif self.path == "/events":
+            self._stream_events()
+        elif self.path.startswith("/qr/"):
+            receipt = self.ui.receipt_file(self.path[len("/qr/"):])
+            if receipt is None:
+                self._send(404, b"Not found", "text/plain")
+            else:
+                self._send(200, receipt[0], receipt[1], cache=True)
+        else:
+            self._send(404, b"Not found", "text/plain")
+
+    def do_POST(self):
+        if self.path != "/command":
+            self._send(404, b"Not found", "text/plain")
+            return
+        if not self._authorized():
+            self.close_connection = True
+            self._send(403, b"Forbidden", "text/plain")
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        if length > 64:
+            # The rest of the body is never read, so the connection cannot be reused
+            self.close_connection = True
+        command = self.rfile.read(min(length, 64)).decode("ascii", "replace").strip()
+        if command not in WebKioskUI.COMMANDS:
+            self._send(400, b"Unknown command", "text/plain")
+            return
+        self.ui.command_queue.put(command)
+        self._send(204, b"", "text/plain")
+
+    def _authorized(self) -> bool:
+        """Only the kiosk page itself may send commands, not other pages or LAN clients"""
+        origin = self.headers.get("Origin")
+        if origin is not None and urlsplit(origin).netloc != self.headers.get("Host"):
+            return False
+        token = self.headers.get("X-Kiosk-Token", "")
+        return hmac.compare_digest(token.encode("ascii", "replace"), self.ui.token.encode("ascii"))
+
+    def _stream_events(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-store")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        client, snapshot = self.ui.hub.subscribe()
+        try:
+            for event, payload in snapshot:
+                self.wfile.write(f"event: {event}\ndata: {payload}\n\n".encode("utf-8"))
+            self.wfile.flush()
+            while True:
+                try:
+                    item = client.get(timeout=self.KEEPALIVE_SECONDS)
+                except Empty:
+                    # Comment line: keeps proxies from timing out and detects closed sockets
+                    self.wfile.write(b": keepalive\n\n")
+                    self.wfile.flush()
+                    continue
+                if item is None:
+                    break
+                event, payload = item
+                self.wfile.write(f"event: {event}\ndata: {payload}\n\n".encode("utf-8"))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            self.ui.hub.unsubscribe(client)
+
+class WebKioskUI:
+    """
+    Headless UI: serves a single local web page and pushes session counters,
+    detection results and QR receipts to it over server-sent events. Start and
+    end commands come back as POSTs to /command, which must carry the token
+    embedded in the page; a new token is made for every launch. Drop-in for
+    RVMachineUI.
+    """
+
+    COMMANDS = ("START_SESSION", "END_SESSION")
+
+    def __init__(self, command_queue: Queue, response_queue: Queue, settings=None, frame_source=None):
+        self.command_queue = command_queue
+        self.response_queue = response_queue
+        self.settings = settings
+        self.logger = logging.getLogger(__name__)
+        self.hub = EventHub()
+        self.restart_requested = False
+        self.token = secrets.token_urlsafe(16)
+        self.page = PAGE.replace("__TOKEN__", self.token).encode("utf-8")
+        self._receipts: "OrderedDict[str, Tuple[bytes, Optional[bytes]]]" = OrderedDict()
+        self._receipts_lock = threading.Lock()
+        self._max_receipts = settings.WEB_UI_QR_CACHE if settings is not None else 16
+        self._running = True
+
+        self._handlers = {
+            SessionStarted: self._on_session_started,
+            SessionData: self._on_session_data,
+            DetectionResult: self._on_detection_result,
+            DisplayQR: self._on_display_qr,
+            QRGenerationFailed: self._on_qr_generation_failed,
+            SystemShutdown: self._on_system_shutdown,
+            RestartUI: self._on_restart_ui,
+        }
+
+        host = settings.WEB_UI_HOST if settings is not None else "127.0.0.1"
+        port = settings.WEB_UI_PORT if settings is not None else 8080
+        handler = type("KioskRequestHandler", (_RequestHandler,), {"ui": self})
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self.hub.publish("session", {'active': False})
+        self.logger.info("Web UI serving on http://%s:%d/", host, self.server.server_address[1])
+
+    def receipt_file(self, name: str) -> Optional[Tuple[bytes, str]]:
+        """Cached (body, content type) for '<qr_id>.png' or '<qr_id>.svg'"""
+        qr_id, _, extension = name.rpartition(".")
+        with self._receipts_lock:
+            cached = self._receipts.get(qr_id)
+        if cached is None:
+            return None
+        png, svg = cached
+        if extension == "png":
+            return png, "image/png"
+        if extension == "svg" and svg is not None:
+            return svg, "image/svg+xml"
+        return None
+
+    def run(self):
+        """Serve HTTP on a worker thread and relay controller messages until shutdown"""
+        server_thread = threading.Thread(target=self.server.serve_forever, name="web-ui", daemon=True)
+        server_thread.start()
+        try:
+            while self._running:
+                # Blocks until the controller sends something; no polling interval
+                try:
+                    batch = [self.response_queue.get(timeout=1.0)]
+                except Empty:
+                    continue
+                try:
+                    while True:
+                        batch.append(self.response_queue.get_nowait())
+                except Empty:
+                    pass
+                for message in coalesce_messages(batch):
+                    handler = self._handlers.get(type(message))
+                    if handler is None:
+                        self.logger.warning(f"Unhandled UI message: {message!r}")
+                        continue
+                    try:
+                        handler(message)
+                    except Exception as e:
+                        self.logger.error(f"Error handling {type(message).__name__}: {e}", exc_info=True)
+        finally:
+            self.hub.close()
+            self.server.shutdown()
+            self.server.server_close()
+
+    def _on_session_started(self, message: SessionStarted):
+        self.hub.forget("receipt", "qr_failed", "detection")
+        self.hub.publish("session", {'active': True})
+        self.hub.publish("counts", {})
+
+    def _on_session_data(self, message: SessionData):
+        self.hub.publish("counts", message.counts)
+
+    def _on_detection_result(self, message: DetectionResult):
+        self.hub.publish("detection", {'text': message.text}, sticky=False)
+
+    def _on_display_qr(self, message: DisplayQR):
+        # Encode once; every client and reload is then served from memory
+        png = qr_png(message.qr_image)
+        svg = qr_svg(message.qr_image)
+        with self._receipts_lock:
+            self._receipts[message.qr_id] = (png, svg)
+            while len(self._receipts) > self._max_receipts:
+                self._receipts.popitem(last=False)
+        self.hub.publish("session", {'active': False})
+        self.hub.publish("receipt", {
+            'qr_id': message.qr_id,
+            'counts': message.counts,
+            'png': f"/qr/{message.qr_id}.png",
+            'svg': f"/qr/{message.qr_id}.svg" if svg is not None else None,
+        })
+
+    def _on_qr_generation_failed(self, message: QRGenerationFailed):
+        self.hub.publish("session", {'active': False})
+        self.hub.publish("qr_failed", {}, sticky=False)
+
+    def _on_system_shutdown(self, message: SystemShutdown):
+        self.hub.publish("shutdown", {}, sticky=False)
+        self._running = False
+
+    def _on_restart_ui(self, message: RestartUI):
+        # Returning from run() lets the controller build a new UI and re-arm the
+        # memory watchdog, as for Tk; browsers reconnect to the new server
+        self.logger.info("UI restart requested")
+        self.restart_requested = True
+        self._running = False
@@ -0,0 +1,90 @@
+import logging
+from queue import Queue
+
+class BoundedQueue(Queue):
+    """
+    Queue with a capacity whose put() never blocks the producer.
+
+    When the queue is full:
+      - a coalescable item (``item.coalesce`` is true) replaces the queued
+        item of the same type, since only the latest one matters;
+      - otherwise the oldest queued coalescable item is dropped to make room,
+        and for any other item the oldest evictable one (``item.evictable``,
+        e.g. a QR image) after that;
+      - if nothing can be dropped, a coalescable item is dropped itself. A
+        control item (a "QUIT" command, RestartUI) is never dropped: it is
+        queued over capacity unless it repeats the last queued item.
+    Large payloads therefore never exceed the capacity; only small control
+    items can. Dropped, coalesced and over-capacity items are counted so
+    they can be reported.
+    """
+
+    def __init__(self, maxsize: int, name: str = "queue"):
+        super().__init__(maxsize)
+        self.name = name
+        self.logger = logging.getLogger(__name__)
+        self.dropped = 0
+        self.coalesced = 0
+        self.overflowed = 0
+
+    def put(self, item, block=False, timeout=None) -> bool:
+        """Enqueue without blocking; returns False if the item was dropped or repeats the last one"""
+        with self.not_full:
+            if 0 < self.maxsize <= self._qsize() and not self._make_room(item):
+                if getattr(item, "coalesce", False):
+                    self.dropped += 1
+                    self._log_drop(item)
+                    return False
+                if item == self.queue[-1]:
+                    # A repeated START_SESSION or RestartUI adds nothing
+                    self.coalesced += 1
+                    return False
+                self.overflowed += 1
+                if self.overflowed == 1 or self.overflowed % 100 == 0:
+                    self.logger.warning(f"{self.name} full ({self.maxsize}); queued "
+                                        f"{type(item).__name__} over capacity, total: {self.overflowed}")
+            self._put(item)
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+            return True
+
+    def _make_room(self, item) -> bool:
+        """Remove one queued item to fit ``item``; called with the mutex held"""
+        coalesce = getattr(item, "coalesce", False)
+        if coalesce:
+            for queued in self.queue:
+                if type(queued) is type(item):
+                    self._remove(queued)
+                    self.coalesced += 1
+                    return True
+
+        # A counter update never pushes out a QR image
+        droppable = ("coalesce",) if coalesce else ("coalesce", "evictable")
+        for attribute in droppable:
+            for queued in self.queue:
+                if getattr(queued, attribute, False):
+                    self._remove(queued)
+                    self.dropped += 1
+                    self._log_drop(queued)
+                    return True
+        return False
+
+    def _remove(self, queued):
+        self.queue.remove(queued)
+        self.unfinished_tasks -= 1
+
+    def _log_drop(self, item):
+        # Log the first drop and then every 100th to avoid flooding the log
+        if self.dropped == 1 or self.dropped % 100 == 0:
+            self.logger.warning(f"{self.name} full ({self.maxsize}); dropped "
+                                f"{type(item).__name__}, total dropped: {self.dropped}")
+
+    def stats(self) -> dict:
+        """Return queue depth and drop counters"""
+        return {
+            'size': self.qsize(),
+            'maxsize': self.maxsize,
+            'dropped': self.dropped,
+            'coalesced': self.coalesced,
+            'overflowed': self.overflowed
+        }
@@ -1,6 +1,16 @@
 import logging
 from typing import List, Dict, Tuple, Optional
 
+def iou(a: List[float], b: List[float]) -> float:
+    """Intersection over union of two xyxy boxes"""
+    width = min(a[2], b[2]) - max(a[0], b[0])
+    height = min(a[3], b[3]) - max(a[1], b[1])
+    if width <= 0 or height <= 0:
+        return 0.0
+    inter = width * height
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
 class DecisionHelper:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
@@ -0,0 +1,218 @@
+import os
+import time
+from multiprocessing import resource_tracker, shared_memory
+from typing import Optional, Tuple
+
+from .helpers import lazy_import
+
+np = lazy_import("numpy")
+cv2 = lazy_import("cv2")
+
+MAGIC = 0x524D5646  # "RVMF"
+HEADER_FIELDS = 8
+# Header layout (int64): magic, slots, height, width, channels, latest_seq, owner_pid, reserved
+_H_MAGIC, _H_SLOTS, _H_HEIGHT, _H_WIDTH, _H_CHANNELS, _H_LATEST, _H_OWNER = range(7)
+
+def _pid_alive(pid: int) -> bool:
+    """True unless process ``pid`` is known to have exited"""
+    try:
+        import psutil
+        return psutil.pid_exists(pid)
+    except ImportError:
+        pass
+    if os.name == "nt":
+        # Windows frees a segment with its last handle, so one that still
+        # exists has a live owner; os.kill(pid, 0) would terminate it
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+class FrameOverwritten(Exception):
+    """The requested frame was replaced by the writer before the reader got to it"""
+
+class FrameRing:
+    """
+    Ring buffer of fixed-shape uint8 frames in shared memory, written by one
+    process and mapped zero-copy by any number of readers. Frame ``seq`` lives
+    in slot ``seq % slots``. Each slot carries the sequence number it holds;
+    the writer sets it to 0 while copying pixels in, so a reader that sees the
+    same sequence number before and after its read knows the frame is intact.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        self._shm = shm
+        self.owner = owner
+        self.name = shm.name
+        self._header = np.ndarray((HEADER_FIELDS,), dtype=np.int64, buffer=shm.buf)
+        if self._header[_H_MAGIC] != MAGIC:
+            self._header = None
+            shm.close()
+            raise ValueError(f"Shared memory {shm.name!r} is not a frame ring")
+        self.slots = int(self._header[_H_SLOTS])
+        self.shape = (int(self._header[_H_HEIGHT]), int(self._header[_H_WIDTH]), int(self._header[_H_CHANNELS]))
+        offset = HEADER_FIELDS * 8
+        self._slot_seq = np.ndarray((self.slots,), dtype=np.int64, buffer=shm.buf, offset=offset)
+        offset += self.slots * 8
+        self._frames = np.ndarray((self.slots, *self.shape), dtype=np.uint8, buffer=shm.buf, offset=offset)
+        self.written = 0
+        self.overwrites = 0
+
+    @staticmethod
+    def _size(slots: int, shape: Tuple[int, int, int]) -> int:
+        height, width, channels = shape
+        return (HEADER_FIELDS + slots) * 8 + slots * height * width * channels
+
+    @classmethod
+    def create(cls, name: str, shape: Tuple[int, int, int], slots: int = 8) -> "FrameRing":
+        """
+        Create the ring as its single writer. A ring left by a process that has
+        exited is replaced; raises FileExistsError if the name is taken by a
+        live writer or by shared memory that is not a frame ring.
+        """
+        shape = tuple(int(dim) for dim in shape)
+        size = cls._size(slots, shape)
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            cls._unlink_stale(name)
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+
+        header = np.ndarray((HEADER_FIELDS,), dtype=np.int64, buffer=shm.buf)
+        header[:] = 0
+        header[_H_OWNER] = os.getpid()
+        header[_H_SLOTS] = slots
+        header[_H_HEIGHT], header[_H_WIDTH], header[_H_CHANNELS] = shape
+        np.ndarray((slots,), dtype=np.int64, buffer=shm.buf, offset=HEADER_FIELDS * 8)[:] = 0
+        # Written last so readers never attach to a half-initialised ring
+        header[_H_MAGIC] = MAGIC
+        del header
+        return cls(shm, owner=True)
+
+    @classmethod
+    def _unlink_stale(cls, name: str):
+        """Remove an existing ring whose writer has exited; raise FileExistsError otherwise"""
+        existing = cls._open(name)
+        is_ring, owner = False, 0
+        try:
+            if existing.size >= HEADER_FIELDS * 8:
+                header = np.ndarray((HEADER_FIELDS,), dtype=np.int64, buffer=existing.buf)
+                is_ring, owner = header[_H_MAGIC] == MAGIC, int(header[_H_OWNER])
+                del header
+        finally:
+            existing.close()
+        if not is_ring:
+            raise FileExistsError(f"Shared memory {name!r} exists and is not a frame ring")
+        if owner <= 0 or _pid_alive(owner):
+            raise FileExistsError(f"Frame ring {name!r} is in use by process {owner}")
+        if getattr(existing, "_track", True):
+            # Before Python 3.13 unlink() unregisters the segment, so register it first
+            resource_tracker.register(existing._name, "shared_memory")
+        existing.unlink()
+
+    @staticmethod
+    def _open(name: str) -> shared_memory.SharedMemory:
+        """Map an existing segment without handing it to this process's resource tracker"""
+        try:
+            return shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # Before Python 3.13 mapping a segment registers it with the resource
+            # tracker, which would unlink it when this process exits; the tracker
+            # is shared with the writer, so skip registering instead of undoing it
+            register = resource_tracker.register
+            resource_tracker.register = lambda name, rtype: None
+            try:
+                return shared_memory.SharedMemory(name=name)
+            finally:
+                resource_tracker.register = register
+
+    @classmethod
+    def attach(cls, name: str) -> "FrameRing":
+        """Map an existing ring read-only by convention; shape and slot count come from its header"""
+        return cls(cls._open(name), owner=False)
+
+    def write(self, frame) -> int:
+        """Copy a frame into the next slot and return its sequence number"""
+        if frame.ndim != 3 or frame.shape[2] != self.shape[2] or frame.dtype != np.uint8:
+            # cv2.resize would silently allocate a new array instead of filling the slot
+            raise ValueError(f"Frame {frame.shape} {frame.dtype} does not fit a ring of "
+                             f"{self.shape} uint8")
+        seq = int(self._header[_H_LATEST]) + 1
+        slot = seq % self.slots
+        self._slot_seq[slot] = 0
+        target = self._frames[slot]
+        if frame.shape == self.shape:
+            np.copyto(target, frame)
+        else:
+            cv2.resize(frame, (self.shape[1], self.shape[0]), dst=target, interpolation=cv2.INTER_AREA)
+        self._slot_seq[slot] = seq
+        self._header[_H_LATEST] = seq
+        self.written += 1
+        return seq
+
+    def latest_seq(self) -> int:
+        return int(self._header[_H_LATEST])
+
+    def read(self, seq: Optional[int] = None, copy: bool = True) -> Tuple[int, Optional[object]]:
+        """
+        Return (seq, frame) for ``seq``, or the newest frame when seq is None.
+        Returns (seq, None) if that frame has not been written yet and raises
+        FrameOverwritten if the writer has already lapped it. With copy=False
+        the frame is a view into shared memory; call is_valid(seq) after using it.
+        """
+        latest = self.latest_seq()
+        if seq is None:
+            seq = latest
+        if seq <= 0 or seq > latest:
+            return seq, None
+        if latest - seq >= self.slots:
+            self.overwrites += 1
+            raise FrameOverwritten(f"Frame {seq} overwritten; newest is {latest}")
+
+        slot = seq % self.slots
+        if self._slot_seq[slot] != seq:
+            self.overwrites += 1
+            raise FrameOverwritten(f"Frame {seq} overwritten while reading")
+        frame = self._frames[slot].copy() if copy else self._frames[slot]
+        if copy and self._slot_seq[slot] != seq:
+            self.overwrites += 1
+            raise FrameOverwritten(f"Frame {seq} overwritten while reading")
+        return seq, frame
+
+    def is_valid(self, seq: int) -> bool:
+        """True while frame ``seq`` is still intact in its slot"""
+        return seq > 0 and self._slot_seq[seq % self.slots] == seq
+
+    def wait_for_frame(self, after_seq: int, timeout: float = 1.0,
+                       poll_interval: float = 0.005) -> Tuple[int, Optional[object]]:
+        """Poll until a frame newer than ``after_seq`` is available, then read the newest one"""
+        deadline = time.monotonic() + timeout
+        while self.latest_seq() <= after_seq:
+            if time.monotonic() >= deadline:
+                return after_seq, None
+            time.sleep(poll_interval)
+        while True:
+            try:
+                return self.read()
+            except FrameOverwritten:
+                # The writer lapped us mid-read; retry with whatever is newest now
+                if time.monotonic() >= deadline:
+                    return after_seq, None
+
+    def close(self):
+        """Release this process's mapping; the owner also removes the ring"""
+        if self._shm is None:
+            return
+        # numpy views must be gone before the buffer can be released
+        self._header = self._slot_seq = self._frames = None
+        self._shm.close()
+        if self.owner:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+        self._shm = None
@@ -1,4 +1,23 @@
 import os
+import sys
+import types
+import importlib
 
 def ensure_dir(path: str):
-    os.makedirs(path, exist_ok=True)
\ No newline at end of file
+    os.makedirs(path, exist_ok=True)
+
+class LazyModule(types.ModuleType):
+    """Module stand-in that performs the real import on first attribute access"""
+
+    def __getattr__(self, attr):
+        module = self.__dict__.get("_module")
+        if module is None:
+            module = importlib.import_module(self.__name__)
+            self.__dict__["_module"] = module
+        return getattr(module, attr)
+
+def lazy_import(name: str) -> types.ModuleType:
+    """Return the module if already loaded, otherwise a proxy that loads it on first use"""
+    if name in sys.modules:
+        return sys.modules[name]
+    return LazyModule(name)
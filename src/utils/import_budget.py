@@ -0,0 +1,85 @@
+"""
+Import-time budget check.
+
+Runs ``python -X importtime -c "import <module>"`` in a fresh interpreter for
+each budgeted module and fails if a heavy dependency was pulled in eagerly.
+Import times depend on the machine and on a cold or warm disk cache, so a
+module over its budget only warns, and only past ADVISORY_MARGIN times the
+budget. tests/test_import_budget.py enforces the heavy-module check. Run
+from ``src``:
+
+    python -m utils.import_budget
+"""
+import os
+import re
+import sys
+import subprocess
+from typing import Dict, List, Tuple
+
+# Cumulative import time budgets in milliseconds
+IMPORT_BUDGETS_MS: Dict[str, float] = {
+    "config.settings": 50.0,
+    "controllers.recycling_controller": 50.0,
+    "services.qr_service": 100.0,
+}
+
+# Times beyond budget * ADVISORY_MARGIN are reported, never failed
+ADVISORY_MARGIN = 2.0
+
+# Modules that must only load on first use
+HEAVY_MODULES = ("cv2", "torch", "ultralytics", "tkinter", "PIL", "qrcode", "serial")
+
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+def measure_import(module: str, cwd: str = None) -> Tuple[float, List[str]]:
+    """Return (cumulative import time in ms, names of all modules imported) for a module"""
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=cwd,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{proc.stderr}")
+
+    cumulative_us = 0
+    imported = []
+    for line in proc.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        name = match.group(4)
+        imported.append(name)
+        if name == module:
+            cumulative_us = int(match.group(2))
+    return cumulative_us / 1000.0, imported
+
+def heavy_imports(imported: List[str]) -> List[str]:
+    """Names among ``imported`` that belong to a HEAVY_MODULES package"""
+    return sorted({name for name in imported if name.split(".")[0] in HEAVY_MODULES})
+
+def check_budgets(budgets: Dict[str, float] = None, cwd: str = None) -> Tuple[List[str], List[str]]:
+    """Check every budgeted module; returns (violations, timing warnings)"""
+    budgets = budgets or IMPORT_BUDGETS_MS
+    cwd = cwd or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    violations = []
+    warnings = []
+    for module, budget_ms in budgets.items():
+        elapsed_ms, imported = measure_import(module, cwd)
+        print(f"{module}: {elapsed_ms:.1f} ms (budget {budget_ms:.0f} ms)")
+        if elapsed_ms > budget_ms * ADVISORY_MARGIN:
+            warnings.append(f"{module} took {elapsed_ms:.1f} ms, budget is {budget_ms:.0f} ms")
+        eager = heavy_imports(imported)
+        if eager:
+            violations.append(f"{module} eagerly imports: {', '.join(eager)}")
+    return violations, warnings
+
+if __name__ == "__main__":
+    problems, slow = check_budgets()
+    for warning in slow:
+        print(f"WARN: {warning}")
+    for problem in problems:
+        print(f"FAIL: {problem}")
+    sys.exit(1 if problems else 0)
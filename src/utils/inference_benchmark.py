@@ -0,0 +1,95 @@
+"""
+Inference thread-count benchmark.
+
+For each intra-op thread count, runs the YOLO model repeatedly on one frame
+while a probe thread ticks every 10 ms the way the Tk event loop does, and
+reports inference latency next to how late the probe ticks were. Pick
+INFERENCE_BUSY_THREADS / INFERENCE_RESERVED_CORES from the trade-off. Run
+from ``src``:
+
+    python -m utils.inference_benchmark [--image IMG] [--runs N] [--threads 1,2,3]
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+from typing import Dict, List
+
+from config.settings import Settings
+
+PROBE_INTERVAL = 0.01
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+def _probe(stop: threading.Event, lateness: List[float]):
+    """Stand-in for the UI loop: record how late each 10 ms tick fires"""
+    expected = time.perf_counter() + PROBE_INTERVAL
+    while not stop.is_set():
+        time.sleep(max(0.0, expected - time.perf_counter()))
+        now = time.perf_counter()
+        lateness.append((now - expected) * 1000.0)
+        expected = now + PROBE_INTERVAL
+
+def run_benchmark(model, source, thread_counts: List[int], runs: int, conf: float) -> List[Dict]:
+    import torch
+
+    rows = []
+    for threads in thread_counts:
+        torch.set_num_threads(threads)
+        model(source, conf=conf, verbose=False)  # warm-up at this thread count
+
+        lateness: List[float] = []
+        stop = threading.Event()
+        probe = threading.Thread(target=_probe, args=(stop, lateness), daemon=True)
+        probe.start()
+        latencies = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            model(source, conf=conf, verbose=False)
+            latencies.append((time.perf_counter() - started) * 1000.0)
+        stop.set()
+        probe.join()
+
+        rows.append({
+            'threads': threads,
+            'p50_ms': _percentile(latencies, 50),
+            'p95_ms': _percentile(latencies, 95),
+            'ui_p95_late_ms': _percentile(lateness, 95),
+            'ui_max_late_ms': max(lateness) if lateness else 0.0,
+        })
+    return rows
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--image", help="frame to classify (default: a synthetic 640x480 frame)")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--threads", help="comma-separated thread counts (default: 1..cpu_count)")
+    args = parser.parse_args(argv)
+
+    settings = Settings()
+    cores = os.cpu_count() or 1
+    thread_counts = ([int(n) for n in args.threads.split(",")] if args.threads
+                     else list(range(1, cores + 1)))
+
+    import ultralytics
+    model = ultralytics.YOLO(settings.YOLO_MODEL_PATH)
+    if args.image:
+        source = args.image
+    else:
+        import numpy as np
+        source = np.random.default_rng(0).integers(0, 255, (480, 640, 3), dtype=np.uint8)
+
+    print(f"{cores} cores, {args.runs} runs per setting")
+    print(f"{'threads':>7} {'p50 ms':>9} {'p95 ms':>9} {'UI p95 late':>12} {'UI max late':>12}")
+    for row in run_benchmark(model, source, thread_counts, args.runs, settings.CONFIDENCE_THRESHOLD):
+        print(f"{row['threads']:>7} {row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} "
+              f"{row['ui_p95_late_ms']:>12.1f} {row['ui_max_late_ms']:>12.1f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
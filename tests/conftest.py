@@ -0,0 +1,35 @@
+import os
+import sys
+
+# Modules under src mix package-relative imports (``from ..config``) with
+# imports rooted at src (``from utils``), so both directories go on the path.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (ROOT, os.path.join(ROOT, "src")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import pytest
+
+class FakeBoxes(list):
+    """Stand-in for ultralytics Boxes: each box has cls, conf and xyxy as 1-element sequences"""
+
+class FakeResult:
+    """Stand-in for one ultralytics Results object"""
+
+    def __init__(self, names, boxes):
+        self.names = names
+        self.boxes = FakeBoxes(boxes)
+
+@pytest.fixture
+def model_result():
+    """Build a detect_objects-style result from (label, confidence[, xyxy]) tuples"""
+    from types import SimpleNamespace
+
+    def build(*detections):
+        names = {0: "plastic", 1: "can"}
+        ids = {name: cls for cls, name in names.items()}
+        boxes = [SimpleNamespace(cls=[ids[label]], conf=[confidence],
+                                 xyxy=[rest[0] if rest else [0.0, 0.0, 10.0, 10.0]])
+                 for label, confidence, *rest in detections]
+        return [FakeResult(names, boxes)]
+    return build
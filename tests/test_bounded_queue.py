@@ -0,0 +1,67 @@
+from ui.messages import DetectionResult, DisplayQR, RestartUI, SessionData
+from utils.bounded_queue import BoundedQueue
+
+def drain(queue):
+    items = []
+    while not queue.empty():
+        items.append(queue.get_nowait())
+    return items
+
+def test_coalescable_item_replaces_queued_one_of_same_type():
+    queue = BoundedQueue(2, name="test")
+    queue.put(SessionData(counts={'can': 1}))
+    queue.put(DetectionResult(text="can"))
+    assert queue.put(SessionData(counts={'can': 2}))
+    assert drain(queue) == [DetectionResult(text="can"), SessionData(counts={'can': 2})]
+    assert queue.stats()['coalesced'] == 1
+
+def test_display_qr_evicts_coalescable_item():
+    queue = BoundedQueue(2, name="test")
+    queue.put(SessionData(counts={'can': 1}))
+    queue.put(DetectionResult(text="can"))
+    qr = DisplayQR(qr_image=None, counts={'can': 1}, qr_id="abc")
+    assert queue.put(qr)
+    assert drain(queue) == [DetectionResult(text="can"), qr]
+    assert queue.stats()['dropped'] == 1
+
+def test_display_qr_is_capped_by_evicting_the_oldest():
+    queue = BoundedQueue(2, name="test")
+    qrs = [DisplayQR(qr_image=None, counts={}, qr_id=str(n)) for n in range(4)]
+    for qr in qrs:
+        assert queue.put(qr)
+    assert drain(queue) == qrs[2:]
+    assert queue.stats()['dropped'] == 2
+
+def test_counter_update_never_evicts_display_qr():
+    queue = BoundedQueue(1, name="test")
+    qr = DisplayQR(qr_image=None, counts={}, qr_id="a")
+    queue.put(qr)
+    assert not queue.put(SessionData(counts={'can': 1}))
+    assert drain(queue) == [qr]
+
+def test_control_items_are_never_dropped():
+    queue = BoundedQueue(2, name="test")
+    queue.put(DisplayQR(qr_image=None, counts={}, qr_id="a"))
+    queue.put(DetectionResult(text="can"))
+    for item in ["START_SESSION", RestartUI(), "QUIT"]:
+        assert queue.put(item)
+    assert drain(queue) == ["START_SESSION", RestartUI(), "QUIT"]
+    stats = queue.stats()
+    assert stats['dropped'] == 2
+    assert stats['overflowed'] == 1
+
+def test_repeated_control_item_over_capacity_is_collapsed():
+    queue = BoundedQueue(1, name="test")
+    queue.put("START_SESSION")
+    assert not queue.put("START_SESSION")
+    assert queue.put("END_SESSION")
+    assert not queue.put("END_SESSION")
+    assert drain(queue) == ["START_SESSION", "END_SESSION"]
+    assert queue.stats()['coalesced'] == 2
+
+def test_coalescable_item_dropped_when_nothing_can_make_room():
+    queue = BoundedQueue(1, name="test")
+    queue.put("QUIT")
+    assert not queue.put(DetectionResult(text="can"))
+    assert drain(queue) == ["QUIT"]
+    assert queue.stats()['dropped'] == 1
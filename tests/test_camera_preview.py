@@ -0,0 +1,131 @@
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+pytest.importorskip("tkinter")
+pytest.importorskip("PIL.ImageTk")
+
+from ui import camera_preview
+from ui.camera_preview import CameraPreview
+from ui.main_ui import RVMachineUI
+from utils.bounded_queue import BoundedQueue
+
+class FakePhoto:
+    """Stands in for ImageTk.PhotoImage, which needs a display"""
+    created = 0
+
+    def __init__(self, image):
+        FakePhoto.created += 1
+        self.size = image.size
+        self.pastes = 0
+
+    def paste(self, image):
+        assert image.size == self.size
+        self.pastes += 1
+
+class FakeWidget:
+    def __init__(self):
+        self.jobs = []
+        self.options = {}
+
+    def after(self, ms, callback):
+        self.jobs.append(callback)
+        return len(self.jobs)
+
+    def config(self, **options):
+        self.options.update(options)
+
+class FakeClock:
+    """thread_time and perf_counter advanced by the test"""
+
+    def __init__(self):
+        self.cpu = 0.0
+        self.wall = 100.0
+
+    def thread_time(self):
+        return self.cpu
+
+    def perf_counter(self):
+        return self.wall
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(camera_preview, "time", clock)
+    monkeypatch.setattr(camera_preview.ImageTk, "PhotoImage", FakePhoto)
+    FakePhoto.created = 0
+    return clock
+
+def make_preview(frame_source, size=(32, 24)):
+    preview = CameraPreview.__new__(CameraPreview)
+    preview.frame_source = frame_source
+    preview.interval_ms = 200
+    preview.size = size
+    preview.frame = FakeWidget()
+    preview.label = FakeWidget()
+    preview._photo = preview._photo_size = preview._resized = preview._rgb = None
+    preview._last_seq = -1
+    preview._job = None
+    preview._cpu_time = 0.0
+    preview._frames = 0
+    preview._window_start = camera_preview.time.perf_counter()
+    preview.cpu_percent = preview.ms_per_frame = preview.actual_fps = 0.0
+    return preview
+
+def bgr(value, shape=(48, 64, 3)):
+    return np.full(shape, value, dtype=np.uint8)
+
+def test_buffers_are_reused_for_frames_of_the_same_size(clock):
+    preview = make_preview(None)
+    preview._render(bgr(10))
+    resized, rgb, photo = preview._resized, preview._rgb, preview._photo
+    # A new camera resolution still lands in the same preview-sized buffers
+    preview._render(bgr(20, shape=(96, 128, 3)))
+    assert preview._resized is resized and preview._rgb is rgb and preview._photo is photo
+    assert photo.pastes == 1 and FakePhoto.created == 1
+    assert rgb.shape == (24, 32, 3)
+
+def test_buffers_are_reallocated_when_the_preview_size_changes(clock):
+    preview = make_preview(None)
+    preview._render(bgr(10))
+    resized, rgb = preview._resized, preview._rgb
+    preview.size = (16, 12)
+    preview._render(bgr(10))
+    assert preview._resized is not resized and preview._rgb is not rgb
+    assert preview._rgb.shape == (12, 16, 3)
+    assert FakePhoto.created == 2 and preview._photo.size == (16, 12)
+    assert preview.label.options['width'] == 16
+
+def test_cpu_percent_counts_only_the_preview_thread_time(clock):
+    frames = iter(range(1, 100))
+
+    def frame_source():
+        # Rendering a frame costs 4 ms of this thread's CPU time
+        clock.cpu += 0.004
+        return next(frames), bgr(0)
+
+    preview = make_preview(frame_source)
+    for _ in range(10):
+        preview._tick()
+        clock.wall += 0.2
+    # No stats until a full two-second window has passed
+    assert preview.cpu_percent == 0.0
+    preview._tick()
+
+    assert preview.actual_fps == pytest.approx(11 / 2.0)
+    assert preview.cpu_percent == pytest.approx(100 * 11 * 0.004 / 2.0)
+    assert preview.ms_per_frame == pytest.approx(4.0)
+    assert preview.stats_text() == "Preview: 5.5 fps, 4.0 ms/frame, 2.2% CPU"
+
+def test_debug_overlay_shows_preview_and_queue_stats():
+    ui = RVMachineUI.__new__(RVMachineUI)
+    ui.preview = SimpleNamespace(stats_text=lambda: "Preview: 5.0 fps, 3.0 ms/frame, 1.5% CPU")
+    ui.response_queue = BoundedQueue(1, name="test")
+    ui.response_queue.put("QUIT")
+    ui.debug_label = FakeWidget()
+    ui.root = FakeWidget()
+    ui._refresh_debug_overlay()
+    assert ui.debug_label.options['text'] == "Preview: 5.0 fps, 3.0 ms/frame, 1.5% CPU | UI queue: 1 | dropped: 0"
+    assert ui.root.jobs == [ui._refresh_debug_overlay]
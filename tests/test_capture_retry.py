@@ -0,0 +1,145 @@
+import logging
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+from src.controllers.camera_controller import CameraController
+from src.main import MainController
+
+class UVCCamera:
+    """V4L2-style device: exposure can only be set in manual mode (AUTO_EXPOSURE == 1)"""
+
+    def __init__(self, honours_exposure=True):
+        self.props = {cv2.CAP_PROP_AUTO_EXPOSURE: 3, cv2.CAP_PROP_EXPOSURE: -6.0,
+                      cv2.CAP_PROP_AUTO_WB: 0}
+        self.honours_exposure = honours_exposure
+        self.calls = []
+
+    def getBackendName(self):
+        return "V4L2"
+
+    def get(self, prop):
+        return self.props[prop]
+
+    def set(self, prop, value):
+        self.calls.append((prop, value))
+        if prop == cv2.CAP_PROP_EXPOSURE and (self.props[cv2.CAP_PROP_AUTO_EXPOSURE] != 1
+                                               or not self.honours_exposure):
+            return False
+        self.props[prop] = value
+        return True
+
+def make_camera(device, steps=(-1.0, 1.0), auto_wb=False):
+    camera = CameraController.__new__(CameraController)
+    camera.settings = SimpleNamespace(CAPTURE_RETRY_EXPOSURE_STEPS=list(steps),
+                                      CAPTURE_RETRY_AUTO_WB=auto_wb, CAPTURE_RETRY_SETTLE_FRAMES=0)
+    camera.logger = logging.getLogger("test-camera")
+    camera.camera = device
+    camera._device_lock = threading.Lock()
+    camera._saved_props = None
+    camera._exposure_warned = False
+    camera._frame_cond = threading.Condition()
+    camera._frame_seq = 0
+    camera._latest_frame = None
+    return camera
+
+def test_exposure_step_switches_to_manual_and_restores_auto():
+    device = UVCCamera()
+    camera = make_camera(device, auto_wb=True)
+
+    camera.adjust_for_retry(1)
+    assert device.props[cv2.CAP_PROP_AUTO_EXPOSURE] == 1
+    assert device.props[cv2.CAP_PROP_EXPOSURE] == -7.0
+    assert device.props[cv2.CAP_PROP_AUTO_WB] == 1
+    camera.adjust_for_retry(2)
+    # Steps are relative to the settings before the first retry
+    assert device.props[cv2.CAP_PROP_EXPOSURE] == -5.0
+
+    camera.restore_settings()
+    assert device.props == {cv2.CAP_PROP_AUTO_EXPOSURE: 3, cv2.CAP_PROP_EXPOSURE: -6.0,
+                            cv2.CAP_PROP_AUTO_WB: 0}
+    # Auto exposure comes back last, so the driver owns exposure again
+    assert device.calls[-1] == (cv2.CAP_PROP_AUTO_EXPOSURE, 3)
+
+def test_ignored_exposure_step_is_logged_once(caplog):
+    camera = make_camera(UVCCamera(honours_exposure=False))
+    with caplog.at_level(logging.WARNING):
+        camera.adjust_for_retry(1)
+        camera.adjust_for_retry(2)
+    assert caplog.text.count("Camera ignored the retry exposure step") == 1
+
+class RetryCamera:
+    def __init__(self):
+        self.delays = []
+        self.adjusted = []
+        self.restored = 0
+
+    def capture_images(self, count=None, delay=None):
+        self.delays.append(delay)
+        return [f"frame{len(self.delays)}.jpg"]
+
+    def adjust_for_retry(self, attempt):
+        self.adjusted.append(attempt)
+
+    def restore_settings(self):
+        self.restored += 1
+
+class ScriptedDetector:
+    """Rejects inconclusively until ``accept_on`` calls have been made"""
+
+    def __init__(self, accept_on):
+        self.accept_on = accept_on
+        self.calls = 0
+        self.last_image_results = []
+
+    def process_images(self, paths):
+        self.calls += 1
+        if self.calls >= self.accept_on:
+            self.last_image_results = [(paths[0], {'label': 'can', 'confidence': 0.95})]
+            return True, "FINAL CLASSIFICATION: CAN (confidence: 0.95)"
+        self.last_image_results = [(paths[0], {'label': 'rejected', 'confidence': 0.7})]
+        return False, "FINAL CLASSIFICATION: NO VALID DETECTION"
+
+    def is_inconclusive(self):
+        return self.last_image_results[0][1]['label'] == 'rejected'
+
+def make_controller(accept_on, budget=2.0, attempts=2):
+    controller = MainController.__new__(MainController)
+    controller.settings = SimpleNamespace(CAPTURE_RETRY_ENABLED=True, CAPTURE_RETRY_BUDGET=budget,
+                                          CAPTURE_RETRY_MAX_ATTEMPTS=attempts, IMAGE_COUNT=3,
+                                          IMAGE_DELAY=0.5, BULK_MODE=False)
+    controller.logger = logging.getLogger("test-controller")
+    controller.camera = RetryCamera()
+    controller.detector = ScriptedDetector(accept_on)
+    controller.archive = None
+    controller.capture_retries = 0
+    return controller
+
+def test_retry_frames_are_spaced_within_the_budget():
+    controller = make_controller(accept_on=3)
+    materials, text = controller._capture_and_classify()
+    assert (materials, text) == (["can"], "Item accepted: can")
+    camera = controller.camera
+    assert camera.adjusted == [1, 2] and camera.restored == 1
+    first, *retries = camera.delays
+    assert first is None
+    # 2 s over two attempts, half of each share for frames, over three frames
+    assert retries[0] == pytest.approx(2.0 / 2 / 2 / 3, rel=0.05)
+    assert all(0 < delay <= 0.5 for delay in retries)
+
+def test_no_retry_after_budget_is_spent():
+    controller = make_controller(accept_on=5, budget=0.0)
+    materials, _ = controller._capture_and_classify()
+    assert materials == ["rejected"]
+    assert controller.camera.adjusted == [] and controller.camera.restored == 0
+
+def test_spacing_shrinks_as_the_budget_runs_out():
+    controller = make_controller(accept_on=1)
+    now = time.monotonic()
+    assert controller._retry_frame_spacing(now + 100, 1) == 0.5
+    assert controller._retry_frame_spacing(now + 0.6, 2) == pytest.approx(0.1, rel=0.05)
+    assert controller._retry_frame_spacing(now - 1, 2) == 0.0
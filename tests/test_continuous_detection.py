@@ -0,0 +1,117 @@
+import threading
+import time
+from types import SimpleNamespace
+
+from src.models.object_detector import ObjectDetector
+from src.services.continuous_detection import ContinuousClassifier, IoUTracker
+from src.services.detection_service import DetectionService
+
+BOTTLE = [100.0, 100.0, 200.0, 300.0]
+CAN = [300.0, 100.0, 360.0, 220.0]
+
+def shifted(box, dx):
+    return [box[0] + dx, box[1], box[2] + dx, box[3]]
+
+def test_tracker_follows_objects_and_votes_on_material():
+    tracker = IoUTracker(min_iou=0.3, max_age=1.0)
+    tracker.update([("plastic", 0.9, BOTTLE), ("can", 0.95, CAN)], now=0.0)
+    tracker.update([("plastic", 0.8, shifted(BOTTLE, 10)), ("can", 0.9, shifted(CAN, 5))], now=0.1)
+    tracker.update([("can", 0.6, shifted(BOTTLE, 20))], now=0.2)
+
+    assert len(tracker.tracks) == 2
+    bottle = min(tracker.tracks.values(), key=lambda track: track.box[0])
+    assert bottle.hits == 3
+    label, hits, confidence = bottle.leading()
+    assert (label, hits) == ("plastic", 2)
+    assert abs(confidence - 0.85) < 1e-9
+
+def test_tracker_starts_new_track_without_overlap_and_drops_stale_ones():
+    tracker = IoUTracker(min_iou=0.3, max_age=1.0)
+    tracker.update([("plastic", 0.9, BOTTLE)], now=0.0)
+    tracker.update([("plastic", 0.9, shifted(BOTTLE, 150))], now=0.5)
+    assert sorted(tracker.tracks) == [1, 2]
+    tracker.update([], now=1.2)
+    assert sorted(tracker.tracks) == [2]
+
+def tracking_settings(**overrides):
+    settings = dict(TRACKING_FPS=50.0, TRACKING_IOU=0.3, TRACKING_MAX_AGE=2.0, TRACKING_MIN_HITS=3,
+                    TRACKING_SETTLED_MAX_AGE=1.0, DETECTION_CACHE_ENABLED=False,
+                    CONFIDENCE_THRESHOLD=0.5, MATERIAL_TYPES=["plastic", "can"], BULK_OVERLAP_IOU=0.5)
+    settings.update(overrides)
+    return SimpleNamespace(**settings)
+
+class FakeCamera:
+    def __init__(self):
+        self.seq = 0
+
+    def get_latest_frame(self):
+        self.seq += 1
+        return self.seq, object()
+
+class StreamDetector:
+    def __init__(self, result):
+        self.result = result
+        self.frames = 0
+
+    def detect_batch(self, frames):
+        self.frames += len(frames)
+        return [self.result for _ in frames]
+
+def run_classifier(classifier, frames):
+    classifier.start()
+    deadline = time.monotonic() + 5
+    while classifier.frames_processed < frames and time.monotonic() < deadline:
+        time.sleep(0.01)
+    classifier.stop()
+
+def test_settled_object_is_claimed_once(model_result):
+    settings = tracking_settings()
+    service = DetectionService(settings, detector=StreamDetector(model_result(("can", 0.95, CAN))))
+    classifier = ContinuousClassifier(settings, FakeCamera(), service)
+    run_classifier(classifier, 4)
+
+    [taken] = classifier.take_settled()
+    assert taken['label'] == "can" and taken['hits'] >= 3
+    # The same object is never credited twice
+    assert classifier.take_settled() == []
+    assert (classifier.settled_hits, classifier.misses) == (1, 1)
+
+def test_low_confidence_object_never_settles(model_result):
+    settings = tracking_settings()
+    service = DetectionService(settings, detector=StreamDetector(model_result(("plastic", 0.6, BOTTLE))))
+    classifier = ContinuousClassifier(settings, FakeCamera(), service)
+    run_classifier(classifier, 4)
+    assert classifier.take_settled() == []
+
+def test_model_calls_are_serialised():
+    """The continuous classifier and the capture path share one YOLO model"""
+    active = []
+    overlaps = []
+
+    def model(source, conf):
+        active.append(1)
+        if len(active) > 1:
+            overlaps.append(len(active))
+        time.sleep(0.005)
+        active.pop()
+        return [source] if isinstance(source, str) else list(source)
+
+    detector = ObjectDetector.__new__(ObjectDetector)
+    detector.settings = SimpleNamespace(CONFIDENCE_THRESHOLD=0.5)
+    detector.model = model
+    detector._lock = threading.Lock()
+
+    def stream():
+        for _ in range(20):
+            detector.detect_batch([object()])
+
+    def capture():
+        for _ in range(20):
+            detector.detect_objects("frame.jpg")
+
+    threads = [threading.Thread(target=stream), threading.Thread(target=capture)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    assert overlaps == []
@@ -0,0 +1,74 @@
+import logging
+from types import SimpleNamespace
+
+from src.main import MainController
+from src.services.detection_service import DetectionService
+
+def bulk_settings(**overrides):
+    settings = dict(DETECTION_CACHE_ENABLED=False, CONFIDENCE_THRESHOLD=0.5,
+                    MATERIAL_TYPES=["plastic", "can"], BULK_OVERLAP_IOU=0.5, BULK_MAX_ITEMS=10)
+    settings.update(overrides)
+    return SimpleNamespace(**settings)
+
+class FrameDetector:
+    """Returns a prepared result per frame, in call order"""
+
+    def __init__(self, results):
+        self.results = results
+
+    def detect_batch(self, paths):
+        return [self.results[path] for path in paths]
+
+    def detect_objects(self, path):
+        return self.results[path]
+
+LEFT, MIDDLE, RIGHT = [0, 0, 10, 10], [20, 0, 30, 10], [40, 0, 50, 10]
+
+def test_bulk_counts_take_the_median_across_frames(model_result):
+    frames = {
+        "1.jpg": model_result(("plastic", 0.9, LEFT), ("can", 0.95, MIDDLE), ("can", 0.9, RIGHT)),
+        # One frame misses an item and one sees a phantom; neither changes the count
+        "2.jpg": model_result(("plastic", 0.9, LEFT), ("can", 0.95, MIDDLE)),
+        "3.jpg": model_result(("plastic", 0.9, LEFT), ("can", 0.95, MIDDLE), ("can", 0.9, RIGHT),
+                              ("plastic", 0.9, [60, 0, 70, 10])),
+    }
+    service = DetectionService(bulk_settings(), detector=FrameDetector(frames))
+    counts, summary = service.count_instances(list(frames))
+    assert counts == {'plastic': 1, 'can': 2, 'rejected': 0}
+    assert "CONSENSUS COUNTS: PLASTIC 1, CAN 2" in summary
+
+def test_overlapping_boxes_of_different_classes_count_once(model_result):
+    # The model suppresses overlaps within a class only
+    frames = {"1.jpg": model_result(("plastic", 0.9, LEFT), ("can", 0.7, [1, 0, 11, 10]))}
+    service = DetectionService(bulk_settings(), detector=FrameDetector(frames))
+    counts, _ = service.count_instances(list(frames))
+    assert counts == {'plastic': 1, 'can': 0, 'rejected': 0}
+
+def test_bulk_credit_is_capped(model_result):
+    boxes = [("can", 0.95, [n * 20, 0, n * 20 + 10, 10]) for n in range(6)]
+    frames = {"1.jpg": model_result(*boxes)}
+    service = DetectionService(bulk_settings(BULK_MAX_ITEMS=4), detector=FrameDetector(frames))
+    counts, _ = service.count_instances(list(frames))
+    assert counts['can'] == 4
+
+def bulk_controller(frames):
+    controller = MainController.__new__(MainController)
+    controller.settings = bulk_settings()
+    controller.logger = logging.getLogger("test-controller")
+    controller.detector = DetectionService(controller.settings, detector=FrameDetector(frames))
+    return controller
+
+def test_mixed_bulk_drop_is_rejected_as_a_whole(model_result):
+    # A can the model is unsure of would be swept in uncredited with the bottle
+    frames = {"1.jpg": model_result(("plastic", 0.95, LEFT), ("can", 0.6, MIDDLE))}
+    controller = bulk_controller(frames)
+    assert controller.detector.count_instances(list(frames))[0] == {'plastic': 1, 'can': 0, 'rejected': 1}
+    materials, text = controller._classify_bulk(list(frames))
+    assert materials == ["rejected"]
+    assert text.startswith("Items rejected")
+
+def test_clean_bulk_drop_credits_every_item(model_result):
+    frames = {"1.jpg": model_result(("plastic", 0.95, LEFT), ("can", 0.9, MIDDLE), ("can", 0.9, RIGHT))}
+    materials, text = bulk_controller(frames)._classify_bulk(list(frames))
+    assert sorted(materials) == ["can", "can", "plastic"]
+    assert text == "Items accepted: 1 plastic, 2 can"
@@ -0,0 +1,170 @@
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+import uuid
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+from src.controllers.camera_controller import CameraController
+from src.utils.frame_ring import FrameOverwritten, FrameRing
+
+SHAPE = (4, 6, 3)
+
+@pytest.fixture
+def ring():
+    ring = FrameRing.create(f"rvm_test_{uuid.uuid4().hex[:8]}", SHAPE, slots=4)
+    yield ring
+    ring.close()
+
+def frame(value, shape=SHAPE):
+    return np.full(shape, value, dtype=np.uint8)
+
+def test_reader_sees_frames_by_sequence(ring):
+    reader = FrameRing.attach(ring.name)
+    try:
+        assert reader.shape == SHAPE and reader.slots == 4
+        assert reader.read() == (0, None)
+        for value in range(1, 4):
+            ring.write(frame(value))
+        seq, latest = reader.read()
+        assert seq == 3 and (latest == 3).all()
+        seq, older = reader.read(2)
+        assert seq == 2 and (older == 2).all()
+        assert reader.read(4) == (4, None)
+    finally:
+        reader.close()
+
+def test_lapped_frame_raises_instead_of_tearing(ring):
+    for value in range(1, 7):
+        ring.write(frame(value))
+    with pytest.raises(FrameOverwritten):
+        ring.read(2)
+    seq, view = ring.read(6, copy=False)
+    assert ring.is_valid(seq)
+    ring.write(frame(7))
+    ring.write(frame(8))
+    assert ring.is_valid(seq)
+    for value in range(9, 11):
+        ring.write(frame(value))
+    # Four more frames have reused the view's slot
+    assert not ring.is_valid(seq)
+
+def test_mismatched_frame_is_resized(ring):
+    seq = ring.write(frame(9, shape=(8, 12, 3)))
+    assert (ring.read(seq)[1] == 9).all()
+
+def test_wait_for_frame_times_out_then_returns_newest(ring):
+    assert ring.wait_for_frame(0, timeout=0.05) == (0, None)
+    threading.Timer(0.05, ring.write, args=(frame(5),)).start()
+    seq, latest = ring.wait_for_frame(0, timeout=2)
+    assert seq == 1 and (latest == 5).all()
+
+def test_wait_for_frame_retries_until_a_read_succeeds(ring, monkeypatch):
+    ring.write(frame(1))
+    original = ring.read
+    failures = iter([True, True, False])
+
+    def flaky_read(*args, **kwargs):
+        if next(failures):
+            raise FrameOverwritten("lapped")
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(ring, "read", flaky_read)
+    seq, latest = ring.wait_for_frame(0, timeout=1)
+    assert seq == 1 and (latest == 1).all()
+
+def test_reader_in_another_process(ring):
+    ring.write(frame(42))
+    src = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    code = (
+        "from src.utils.frame_ring import FrameRing\n"
+        f"ring = FrameRing.attach({ring.name!r})\n"
+        "seq, frame = ring.read()\n"
+        "print(seq, int(frame.mean()))\n"
+        "ring.close()\n"
+    )
+    out = subprocess.run([sys.executable, "-c", code], cwd=src, capture_output=True,
+                         text=True, timeout=30)
+    assert out.returncode == 0, out.stderr
+    assert out.stdout.split() == ["1", "42"]
+    assert "leaked" not in out.stderr
+    # The reader exiting must not unlink the writer's ring
+    ring.write(frame(43))
+    assert (FrameRing.attach(ring.name).read()[1] == 43).all()
+
+class FakeCamera:
+    def __init__(self, frames):
+        self.frames = list(frames)
+
+    def read(self):
+        if self.frames:
+            return True, self.frames.pop(0)
+        time.sleep(0.01)
+        return False, None
+
+def test_bad_frame_does_not_stop_the_grabber(ring, caplog):
+    camera = CameraController.__new__(CameraController)
+    camera.logger = logging.getLogger("test-camera")
+    camera.camera = FakeCamera([np.zeros((4, 6), dtype=np.uint8), frame(7)])
+    camera.frame_ring = ring
+    camera.ring_errors = 0
+    camera._device_lock = threading.Lock()
+    camera._frame_cond = threading.Condition()
+    camera._latest_frame = None
+    camera._frame_seq = 0
+    camera._running = True
+
+    grabber = threading.Thread(target=camera._grab_loop, daemon=True)
+    with caplog.at_level(logging.ERROR):
+        grabber.start()
+        seq, latest = camera.wait_for_frame(1, timeout=2)
+        camera._running = False
+        grabber.join(timeout=2)
+
+    assert seq == 2 and (latest == 7).all()
+    assert camera.ring_errors == 1
+    assert ring.latest_seq() == 1 and (ring.read()[1] == 7).all()
+    assert "Frame ring write failed" in caplog.text
+
+def test_create_refuses_a_ring_with_a_live_writer(ring):
+    with pytest.raises(FileExistsError, match="in use"):
+        FrameRing.create(ring.name, SHAPE, slots=4)
+    ring.write(frame(3))
+    assert (ring.read()[1] == 3).all()
+
+def test_create_replaces_a_ring_left_by_an_exited_writer():
+    name = f"rvm_test_{uuid.uuid4().hex[:8]}"
+    src = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = (
+        "from multiprocessing import resource_tracker\n"
+        "from src.utils.frame_ring import FrameRing\n"
+        f"ring = FrameRing.create({name!r}, {SHAPE!r}, slots=4)\n"
+        "ring.write(__import__('numpy').full(ring.shape, 9, dtype='uint8'))\n"
+        # Exit as a crash would: without close() and without the tracker's cleanup
+        "resource_tracker.unregister(ring._shm._name, 'shared_memory')\n"
+        "import os; os._exit(0)\n"
+    )
+    out = subprocess.run([sys.executable, "-c", code], cwd=src, capture_output=True, text=True, timeout=30)
+    assert out.returncode == 0, out.stderr
+
+    ring = FrameRing.create(name, SHAPE, slots=4)
+    try:
+        assert ring.latest_seq() == 0
+    finally:
+        ring.close()
+
+def test_create_leaves_other_shared_memory_alone():
+    from multiprocessing import shared_memory
+    other = shared_memory.SharedMemory(name=f"rvm_test_{uuid.uuid4().hex[:8]}", create=True, size=4096)
+    try:
+        with pytest.raises(FileExistsError, match="not a frame ring"):
+            FrameRing.create(other.name, SHAPE, slots=4)
+    finally:
+        other.close()
+        other.unlink()
@@ -0,0 +1,74 @@
+import csv
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+
+from src.services.image_archive import ImageArchive
+
+def archive_settings(tmp_path, **overrides):
+    settings = dict(ARCHIVE_DIR=tmp_path / "archive", ARCHIVE_DUP_DISTANCE=4, ARCHIVE_DUP_WINDOW=16,
+                    ARCHIVE_MAX_MB=100, ARCHIVE_MAX_AGE_DAYS=90, ARCHIVE_RETENTION_INTERVAL=300.0,
+                    DETECTED_IMAGE_PATH=tmp_path / "export", MATERIAL_TYPES=["plastic", "can"])
+    settings.update(overrides)
+    return SimpleNamespace(**settings)
+
+def capture(path, seed, noise=0):
+    rng = np.random.default_rng(seed)
+    image = cv2.resize(rng.integers(0, 255, (8, 9, 3), dtype=np.uint8), (288, 256),
+                       interpolation=cv2.INTER_NEAREST)
+    if noise:
+        jitter = np.random.default_rng(seed + 1000).integers(-noise, noise + 1, image.shape)
+        image = np.clip(image.astype(int) + jitter, 0, 255).astype(np.uint8)
+    cv2.imwrite(str(path), image)
+    return str(path)
+
+def run_archive(archive, submissions):
+    archive.start()
+    for args in submissions:
+        archive.submit(*args)
+    archive.stop()
+
+def test_duplicates_are_skipped_and_frames_exported(tmp_path):
+    archive = ImageArchive(archive_settings(tmp_path))
+    first = capture(tmp_path / "a.jpg", seed=1)
+    same = capture(tmp_path / "a_copy.jpg", seed=1)
+    similar = capture(tmp_path / "a_noisy.jpg", seed=1, noise=2)
+    other = capture(tmp_path / "b.jpg", seed=2)
+    run_archive(archive, [(first, "can", 0.95, "s1"), (same, "can", 0.95, "s1"),
+                          (similar, "can", 0.9, "s1"), (other, "plastic", 0.9, "s1")])
+
+    assert (archive.stored, archive.duplicates) == (2, 2)
+    # Captured files are moved into the archive or deleted, never left behind
+    assert list(tmp_path.glob("*.jpg")) == []
+    assert len(list((tmp_path / "archive").rglob("*.jpg"))) == 2
+
+    assert archive.export(labels=["can"]) == 1
+    with open(tmp_path / "export" / "labels.csv") as f:
+        rows = list(csv.DictReader(f))
+    assert [row['label'] for row in rows] == ["can"]
+    assert (tmp_path / "export" / rows[0]['file']).exists()
+
+def test_archive_remembers_hashes_across_restarts(tmp_path):
+    settings = archive_settings(tmp_path)
+    run_archive(ImageArchive(settings), [(capture(tmp_path / "a.jpg", seed=1), "can", 0.95)])
+    archive = ImageArchive(settings)
+    run_archive(archive, [(capture(tmp_path / "a2.jpg", seed=1, noise=2), "can", 0.95)])
+    assert (archive.stored, archive.duplicates) == (0, 1)
+
+def test_retention_removes_oldest_over_size_budget(tmp_path):
+    settings = archive_settings(tmp_path)
+    archive = ImageArchive(settings)
+    run_archive(archive, [(capture(tmp_path / f"{n}.jpg", seed=n), "can", 0.9) for n in range(3)])
+    assert archive.stored == 3
+
+    settings.ARCHIVE_MAX_MB = 0
+    conn = archive._connect()  # reloads the archive size from the index
+    try:
+        archive._apply_retention(conn)
+        assert conn.execute("SELECT COUNT(*) FROM images").fetchone()[0] == 0
+    finally:
+        conn.close()
+    assert list((tmp_path / "archive").rglob("*.jpg")) == []
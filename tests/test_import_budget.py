@@ -0,0 +1,23 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from utils.import_budget import HEAVY_MODULES, IMPORT_BUDGETS_MS, heavy_imports
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+@pytest.mark.parametrize("module", sorted(IMPORT_BUDGETS_MS))
+def test_budgeted_module_loads_no_heavy_dependency(module):
+    # A fresh interpreter, so nothing imported by other tests hides an eager import
+    proc = subprocess.run(
+        [sys.executable, "-c", f"import sys, {module}; print('\\n'.join(sys.modules))"],
+        cwd=SRC, capture_output=True, text=True, check=True,
+    )
+    assert heavy_imports(proc.stdout.split()) == []
+
+def test_heavy_imports_matches_submodules():
+    assert heavy_imports(["os", "PIL.Image", "torch", "torchvision", "serial.tools"]) == \
+        ["PIL.Image", "serial.tools", "torch"]
+    assert set(HEAVY_MODULES) >= {"cv2", "torch", "ultralytics"}
@@ -0,0 +1,133 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from src.models.inference_scheduler import InferenceScheduler
+
+class FakeDetector:
+    """Records each batch and returns the image path as its result"""
+
+    def __init__(self, delay=0.0):
+        self.batches = []
+        self.delay = delay
+
+    def detect_batch(self, paths):
+        self.batches.append(list(paths))
+        time.sleep(self.delay)
+        return [f"result:{path}" for path in paths]
+
+def make_scheduler(detector, max_batch=4, wait_ms=50, target_ms=1000, timeout_ms=5000):
+    settings = SimpleNamespace(INFERENCE_MAX_BATCH=max_batch, INFERENCE_BATCH_WAIT_MS=wait_ms,
+                               INFERENCE_LATENCY_TARGET_MS=target_ms, INFERENCE_REQUEST_TIMEOUT_MS=timeout_ms)
+    return InferenceScheduler(settings, detector=detector)
+
+def test_lanes_share_batches_and_get_their_own_results():
+    detector = FakeDetector()
+    scheduler = make_scheduler(detector, max_batch=8)
+    scheduler.start()
+    try:
+        results = {}
+        def run_lane(lane_id):
+            client = scheduler.client(lane_id)
+            results[lane_id] = client.detect_batch([f"lane{lane_id}/{n}.jpg" for n in range(3)])
+
+        threads = [threading.Thread(target=run_lane, args=(lane,)) for lane in (0, 1)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=5)
+    finally:
+        scheduler.stop()
+
+    for lane in (0, 1):
+        assert results[lane] == [f"result:lane{lane}/{n}.jpg" for n in range(3)]
+    # Both lanes arrived within the batch window, so they shared one model call
+    assert len(detector.batches) == 1
+    assert scheduler.lane_stats[0]['requests'] == scheduler.lane_stats[1]['requests'] == 1
+
+def test_busy_lane_cannot_starve_another():
+    scheduler = make_scheduler(FakeDetector(), max_batch=2)
+    busy = scheduler.submit(0, [f"busy/{n}.jpg" for n in range(6)])
+    quiet = scheduler.submit(1, ["quiet/0.jpg"])
+    first = scheduler._take_batch()
+    # Round-robin: the quiet lane's only image is in the first batch
+    assert sorted(job.lane_id for job, _ in first) == [0, 1]
+    assert not busy.done() and not quiet.done()
+
+def test_overdue_lane_goes_first():
+    scheduler = make_scheduler(FakeDetector(), max_batch=1, target_ms=100)
+    scheduler.submit(0, ["fresh.jpg"])
+    scheduler.submit(1, ["stale.jpg"])
+    scheduler._pending[1][0][0].submitted -= 1.0
+    [(job, _)] = scheduler._take_batch()
+    assert job.lane_id == 1
+
+def test_failed_batch_fails_every_lane_in_it():
+    class Broken:
+        def detect_batch(self, paths):
+            raise RuntimeError("model crashed")
+
+    scheduler = make_scheduler(Broken(), wait_ms=20)
+    scheduler.start()
+    try:
+        futures = [scheduler.submit(lane, [f"{lane}.jpg"]) for lane in (0, 1)]
+        for future in futures:
+            with pytest.raises(RuntimeError, match="model crashed"):
+                future.result(timeout=5)
+    finally:
+        scheduler.stop()
+
+def test_stop_fails_queued_requests():
+    release = threading.Event()
+
+    class Blocking(FakeDetector):
+        def detect_batch(self, paths):
+            release.wait(5)
+            return super().detect_batch(paths)
+
+    scheduler = make_scheduler(Blocking(), max_batch=1, wait_ms=0)
+    scheduler.start()
+    running = scheduler.submit(0, ["first.jpg"])
+    while not scheduler.detector.batches and scheduler._pending_count():
+        time.sleep(0.01)
+    queued = scheduler.submit(1, ["second.jpg"])
+    stopper = threading.Thread(target=scheduler.stop)
+    stopper.start()
+    time.sleep(0.05)
+    release.set()
+    stopper.join(timeout=5)
+
+    assert running.result(timeout=1) == ["result:first.jpg"]
+    with pytest.raises(RuntimeError, match="stopped"):
+        queued.result(timeout=1)
+
+def test_lane_runs_the_model_itself_when_the_scheduler_is_not_running():
+    detector = FakeDetector()
+    scheduler = make_scheduler(detector)
+    assert scheduler.client(0).detect_objects("a.jpg") == "result:a.jpg"
+    assert detector.batches == [["a.jpg"]]
+    assert scheduler._pending_count() == 0
+
+def test_lane_gives_up_on_a_stuck_scheduler():
+    release = threading.Event()
+
+    class Stuck(FakeDetector):
+        def detect_batch(self, paths):
+            release.wait(5)
+            return super().detect_batch(paths)
+
+    scheduler = make_scheduler(Stuck(), max_batch=1, wait_ms=0, timeout_ms=200)
+    scheduler.start()
+    try:
+        scheduler.submit(0, ["stuck.jpg"])
+        while scheduler._pending_count():
+            time.sleep(0.01)
+        with pytest.raises(TimeoutError):
+            scheduler.client(1).detect_batch(["waiting.jpg"])
+        # The abandoned request is not left for the model to run later
+        assert scheduler._pending_count() == 0
+    finally:
+        release.set()
+        scheduler.stop()
@@ -0,0 +1,70 @@
+import logging
+from queue import Queue
+
+from src.services import logging_service
+from src.services.logging_service import DeferredQueueHandler, RateLimitFilter, SizeAndTimeRotatingFileHandler
+
+def write_lines(path, count, **kwargs):
+    handler = SizeAndTimeRotatingFileHandler(str(path), when="midnight", encoding="utf-8", **kwargs)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger = logging.Logger("rotation-test")
+    logger.addHandler(handler)
+    for n in range(count):
+        logger.info("line %03d of the rotation test", n)
+    handler.close()
+
+def read_lines(directory):
+    lines = []
+    for path in directory.iterdir():
+        lines.extend(path.read_text(encoding="utf-8").splitlines())
+    return lines
+
+def test_size_rollovers_within_one_interval_keep_every_line(tmp_path):
+    write_lines(tmp_path / "rvm.log", 60, max_bytes=50)
+
+    lines = read_lines(tmp_path)
+    assert sorted(lines) == [f"line {n:03d} of the rotation test" for n in range(60)]
+    backups = [path.name for path in tmp_path.iterdir() if path.name != "rvm.log"]
+    # More than nine backups, so indexes must sort numerically
+    assert len(backups) > 10
+    assert len({name.rsplit(".", 1)[0] for name in backups}) == 1
+
+def test_backup_count_keeps_newest_backups(tmp_path):
+    write_lines(tmp_path / "rvm.log", 60, max_bytes=50, backupCount=3)
+
+    names = sorted(path.name for path in tmp_path.iterdir())
+    assert len(names) == 4
+    kept = sorted(int(line.split()[1]) for line in read_lines(tmp_path))
+    # What survives is the most recent, unbroken run of lines
+    assert kept == list(range(kept[0], 60))
+
+def test_queued_record_keeps_args_as_logged():
+    queue = Queue()
+    logger = logging.Logger("prepare-test")
+    logger.addHandler(DeferredQueueHandler(queue))
+    counts = {'can_count': 1}
+    logger.info("Counts: %s", counts)
+    counts['can_count'] = 2
+
+    record = queue.get_nowait()
+    assert record.getMessage() == "Counts: {'can_count': 1}"
+    assert record.args is None
+
+def test_rate_limit_forgets_idle_windows(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(logging_service.time, "monotonic", lambda: clock[0])
+    limiter = RateLimitFilter(limit=2, interval=60.0)
+    logger = logging.Logger("rate-test")
+
+    def emit(msg, *args):
+        return limiter.filter(logger.makeRecord(logger.name, logging.INFO, __file__, 0, msg, args, None))
+
+    assert [emit("Item %d", n) for n in range(3)] == [True, True, False]
+    for n in range(100):
+        emit(f"Item {n}")
+    assert len(limiter._windows) == 101
+
+    clock[0] += 150
+    record = logger.makeRecord(logger.name, logging.INFO, __file__, 0, "Item %d", (4,), None)
+    assert limiter.filter(record)
+    assert len(limiter._windows) == 1
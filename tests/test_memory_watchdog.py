@@ -0,0 +1,52 @@
+from types import SimpleNamespace
+
+from src.services import memory_watchdog
+from src.services.memory_watchdog import MemoryWatchdog
+
+MB = 2**20
+
+def make_watchdog(monkeypatch, samples, budget_mb=100):
+    settings = SimpleNamespace(MEMORY_BUDGET_MB=budget_mb, MEMORY_SAMPLE_INTERVAL=60.0,
+                               MEMORY_TRACEMALLOC_FRAMES=0, MEMORY_TOP_ALLOCATORS=10)
+    readings = iter(samples)
+    monkeypatch.setattr(memory_watchdog, "get_rss_bytes", lambda: next(readings))
+    restarts = []
+    return MemoryWatchdog(settings, on_budget_exceeded=restarts.append), restarts
+
+def test_budget_applies_to_growth_over_baseline(monkeypatch):
+    # A process that starts well above the budget (model loaded) is not restarted
+    watchdog, restarts = make_watchdog(monkeypatch, [900 * MB, 950 * MB, 1010 * MB])
+    watchdog.sample()
+    watchdog.sample()
+    assert restarts == []
+    watchdog.sample()
+    assert restarts == [1010 * MB]
+
+def test_budget_fires_once_until_reset(monkeypatch):
+    watchdog, restarts = make_watchdog(monkeypatch, [500 * MB, 700 * MB, 750 * MB, 550 * MB, 620 * MB])
+    watchdog.sample()
+    watchdog.sample()
+    watchdog.sample()
+    assert restarts == [700 * MB]
+
+    # The restart freed memory, so a later breach restarts the UI again
+    watchdog.reset_budget()
+    watchdog.sample()
+    assert restarts == [700 * MB]
+    watchdog.sample()
+    assert restarts == [700 * MB, 620 * MB]
+
+def test_breach_surviving_a_restart_escalates(monkeypatch):
+    watchdog, restarts = make_watchdog(monkeypatch, [500 * MB, 700 * MB, 690 * MB, 800 * MB])
+    failures = []
+    watchdog.on_restart_failed = failures.append
+    watchdog.sample()
+    watchdog.sample()
+    assert restarts == [700 * MB]
+
+    # The baseline is kept across the restart, so the leak is still seen
+    watchdog.reset_budget()
+    watchdog.sample()
+    assert (restarts, failures) == ([700 * MB], [690 * MB])
+    watchdog.sample()
+    assert (restarts, failures) == ([700 * MB], [690 * MB])
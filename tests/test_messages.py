@@ -0,0 +1,23 @@
+from ui.messages import (
+    DetectionResult, DisplayQR, RestartUI, SessionData, SessionStarted, SystemShutdown, coalesce_messages
+)
+
+def test_latest_coalescable_message_of_each_type_is_kept_in_order():
+    batch = [
+        SessionData({"plastic": 1}),
+        DetectionResult("first"),
+        SessionData({"plastic": 2}),
+        SessionStarted(),
+        DetectionResult("second"),
+        SessionData({"plastic": 3}),
+    ]
+    assert coalesce_messages(batch) == [
+        SessionStarted(),
+        DetectionResult("second"),
+        SessionData({"plastic": 3}),
+    ]
+
+def test_non_coalescable_messages_are_never_dropped():
+    qr = DisplayQR(qr_image=None, counts={"can": 1}, qr_id="a")
+    batch = [qr, RestartUI(), qr, RestartUI(), SystemShutdown(), SystemShutdown()]
+    assert coalesce_messages(batch) == batch
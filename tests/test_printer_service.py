@@ -0,0 +1,99 @@
+import socket
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+
+from services.printer_service import (
+    ESC_ALIGN_CENTER, ESC_INIT, GS_CUT_FEED, RASTER_BAND_ROWS, ReceiptPrinter, feed_lines,
+)
+
+COUNTS = {'plastic_count': 2, 'can_count': 1, 'total_count': 3}
+
+def make_printer(device, width=384):
+    return ReceiptPrinter(SimpleNamespace(PRINTER_DEVICE=device, PRINTER_WIDTH_DOTS=width,
+                                          PRINTER_TIMEOUT=2.0))
+
+def qr_image(size=300):
+    image = Image.new("1", (size, size), 1)
+    for x in range(0, size, 20):
+        for y in range(0, size, 20):
+            if (x + y) % 40 == 0:
+                image.paste(0, (x, y, x + 10, y + 10))
+    return image
+
+def parse_bands(data: bytes, width_bytes: int):
+    """Split the raster section of a receipt into (rows, payload) per GS v 0 band"""
+    assert data.startswith(ESC_INIT + ESC_ALIGN_CENTER)
+    tail = feed_lines(4) + GS_CUT_FEED
+    assert data.endswith(tail)
+    raster = data[len(ESC_INIT + ESC_ALIGN_CENTER):-len(tail)]
+
+    bands = []
+    while raster:
+        assert raster[:4] == b"\x1d\x76\x30\x00"
+        x = raster[4] | raster[5] << 8
+        rows = raster[6] | raster[7] << 8
+        assert x == width_bytes
+        payload = raster[8:8 + x * rows]
+        assert len(payload) == x * rows
+        bands.append((rows, payload))
+        raster = raster[8 + x * rows:]
+    return bands
+
+def test_receipt_is_framed_as_esc_pos_raster_bands(tmp_path):
+    device = tmp_path / "lp0"
+    printer = make_printer(str(device))
+    printer.print_receipt(qr_image(), COUNTS, "abc123")
+
+    data = device.read_bytes()
+    bands = parse_bands(data, 384 // 8)
+    assert len(bands) > 1
+    assert all(rows == RASTER_BAND_ROWS for rows, _ in bands[:-1])
+    assert 0 < bands[-1][0] <= RASTER_BAND_ROWS
+    # The QR code at the top prints black dots; the margins do not
+    first_row = bands[0][1][:384 // 8]
+    assert any(first_row)
+
+def test_reprint_reuses_rendered_receipt(tmp_path, monkeypatch):
+    printer = make_printer(str(tmp_path / "lp0"))
+    composed = []
+    original = printer._compose
+    monkeypatch.setattr(printer, "_compose", lambda *args: composed.append(1) or original(*args))
+
+    first = printer.render_receipt(qr_image(), COUNTS, "abc123")
+    second = printer.render_receipt(qr_image(), COUNTS, "abc123")
+    assert second is first
+    assert len(composed) == 1
+
+    printer.render_receipt(qr_image(), COUNTS, "other")
+    assert len(composed) == 2
+
+def test_receipt_streams_to_network_printer():
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(1)
+    received = bytearray()
+
+    def accept():
+        conn, _ = server.accept()
+        with conn:
+            while True:
+                chunk = conn.recv(65536)
+                if not chunk:
+                    break
+                received.extend(chunk)
+
+    thread = threading.Thread(target=accept, daemon=True)
+    thread.start()
+    try:
+        printer = make_printer(f"tcp://127.0.0.1:{server.getsockname()[1]}", width=576)
+        printer.print_receipt(qr_image(), COUNTS, "abc123")
+        thread.join(timeout=5)
+    finally:
+        server.close()
+
+    assert bytes(received) == printer.render_receipt(qr_image(), COUNTS, "abc123")
+    parse_bands(bytes(received), 576 // 8)
@@ -0,0 +1,84 @@
+import threading
+import time
+
+import pytest
+
+tk = pytest.importorskip("tkinter")
+pytest.importorskip("PIL.ImageTk")
+Image = pytest.importorskip("PIL.Image")
+
+from ui import qr_display
+from ui.qr_display import QRDisplayWindow
+
+class FakeRoot:
+    """Collects after() callbacks so the test can run them without a display"""
+
+    def __init__(self):
+        self.callbacks = []
+
+    def after(self, ms, callback):
+        self.callbacks.append(callback)
+
+    def run_until_idle(self, timeout=5):
+        deadline = time.monotonic() + timeout
+        while self.callbacks and time.monotonic() < deadline:
+            self.callbacks.pop(0)()
+            time.sleep(0.01)
+
+class DestroyedWindow:
+    def winfo_exists(self):
+        raise tk.TclError('bad window path name ".!toplevel"')
+
+class FailingPrinter:
+    def __init__(self):
+        self.release = threading.Event()
+
+    def print_receipt(self, qr_image, counts, qr_id):
+        self.release.wait(5)
+        raise OSError("printer offline")
+
+@pytest.fixture
+def dialogs(monkeypatch):
+    shown = []
+    monkeypatch.setattr(qr_display.messagebox, "showerror", lambda title, text, parent: shown.append((title, parent)))
+    monkeypatch.setattr(qr_display.messagebox, "showinfo", lambda title, text, parent: shown.append((title, parent)))
+    return shown
+
+def make_window(printer=None):
+    window = QRDisplayWindow.__new__(QRDisplayWindow)
+    window.parent = FakeRoot()
+    window.window = DestroyedWindow()
+    window.qr_image = Image.new("1", (40, 40), 1)
+    window.summary_data = {'can_count': 1, 'total_count': 1}
+    window.qr_id = "abc"
+    window.printer = printer
+    window.logger = qr_display.logging.getLogger("test-qr-display")
+    window._print_thread = None
+    window._print_error = None
+    return window
+
+def test_print_error_survives_the_window_closing(dialogs):
+    printer = FailingPrinter()
+    window = make_window(printer)
+    window.print_receipt()
+    # The receipt window is destroyed (session timeout) while the printer is busy
+    printer.release.set()
+    window.parent.run_until_idle()
+    assert dialogs == [("Print Error", window.parent)]
+
+def test_fallback_print_file_is_removed(monkeypatch, dialogs):
+    commands = []
+    monkeypatch.setattr(qr_display.platform, "system", lambda: "Linux")
+    monkeypatch.setattr(qr_display.subprocess, "run", lambda args, check: commands.append(args))
+    monkeypatch.setattr(QRDisplayWindow, "TEMP_FILE_GRACE_SECONDS", 0.01)
+    window = make_window()
+    window.print_receipt()
+    window.parent.run_until_idle()
+
+    [[command, path]] = commands
+    assert command == "xdg-open" and path.endswith(".png")
+    deadline = time.monotonic() + 5
+    while qr_display.os.path.exists(path) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not qr_display.os.path.exists(path)
+    assert dialogs == []
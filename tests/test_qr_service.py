@@ -0,0 +1,27 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("qrcode")
+
+from services.qr_service import QRService, verify_payload
+
+COUNTS = {"plastic_count": 2, "can_count": 0}
+
+def test_saves_run_in_the_background_and_are_flushed_on_close(tmp_path):
+    service = QRService(SimpleNamespace(QR_OUTPUT_DIR=tmp_path, QR_SIGNING_KEY=None))
+    paths = [service.generate_qr_code(COUNTS)[0] for _ in range(3)]
+    assert service._writer.name == "qr-writer"
+    service.close()
+    assert all(path.exists() for path in paths)
+    assert service._writer is None
+
+def test_payload_is_minified_and_signed_only_with_a_key(tmp_path):
+    unsigned = QRService(SimpleNamespace(QR_OUTPUT_DIR=tmp_path, QR_SIGNING_KEY=None)).build_payload(COUNTS, "id-1")
+    assert unsigned == '[{"qr_id":"id-1","items":[{"class":"plastic","count":2}]}]'
+
+    signed = QRService(SimpleNamespace(QR_OUTPUT_DIR=tmp_path, QR_SIGNING_KEY="k")).build_payload(COUNTS, "id-1")
+    assert verify_payload(signed, "k") == json.loads(unsigned)[0]
+    assert verify_payload(signed, "other") is None
+    assert verify_payload(unsigned, "k") is None
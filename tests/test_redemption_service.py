@@ -0,0 +1,82 @@
+import json
+from types import SimpleNamespace
+
+from services.qr_service import QRService
+from services.redemption_service import (
+    ALREADY_REDEEMED, EXPIRED, INVALID_SIGNATURE, NOT_FOUND, REDEEMED,
+    RedemptionService, main, run_benchmark,
+)
+from src.services.session_ledger import SessionLedger
+
+KEY = "test-signing-key"
+COUNTS = {'plastic_count': 2, 'can_count': 1, 'total_count': 3}
+
+def issue_receipt(tmp_path, qr_id="qr-1", signing_key=KEY):
+    settings = SimpleNamespace(LEDGER_PATH=tmp_path / "ledger.db", LEDGER_BATCH_SIZE=64,
+                               LEDGER_FLUSH_INTERVAL=0.01, QR_CODE_EXPIRE_MINUTES=15,
+                               QR_SIGNING_KEY=signing_key, QR_OUTPUT_DIR=tmp_path / "qr")
+    ledger = SessionLedger(settings)
+    ledger.start()
+    ledger.open_session("session-1")
+    ledger.close_session("session-1", qr_id, counts=COUNTS)
+    assert ledger.flush()
+    ledger.close()
+    return settings, QRService(settings).build_payload(COUNTS, qr_id)
+
+def test_redeem_once_then_reject(tmp_path):
+    settings, qr_text = issue_receipt(tmp_path)
+    service = RedemptionService(settings)
+    try:
+        first = service.redeem_payload(qr_text)
+        assert first['status'] == REDEEMED
+        assert (first['plastic_count'], first['can_count'], first['total_count']) == (2, 1, 3)
+        assert service.redeem_payload(qr_text)['status'] == ALREADY_REDEEMED
+        assert service.lookup("qr-1")['redeemed_at'] is not None
+    finally:
+        service.close()
+
+def test_reject_bad_signature(tmp_path):
+    settings, qr_text = issue_receipt(tmp_path)
+    receipt = json.loads(qr_text)
+    receipt[0]['items'][0]['count'] = 20
+    tampered = json.dumps(receipt, separators=(",", ":"))
+    _, forged = issue_receipt(tmp_path / "other", signing_key="another-key")
+
+    service = RedemptionService(settings)
+    try:
+        assert service.redeem_payload(tampered)['status'] == INVALID_SIGNATURE
+        assert service.redeem_payload(forged)['status'] == INVALID_SIGNATURE
+        assert service.redeem_payload("not a receipt")['status'] == INVALID_SIGNATURE
+        # The genuine receipt is still redeemable
+        assert service.redeem_payload(qr_text)['status'] == REDEEMED
+    finally:
+        service.close()
+
+def test_reject_unknown_and_expired(tmp_path):
+    settings, _ = issue_receipt(tmp_path)
+    service = RedemptionService(settings)
+    try:
+        assert service.redeem("missing")['status'] == NOT_FOUND
+        expires_at = service.lookup("qr-1")['expires_at']
+        assert service.redeem("qr-1", now=expires_at + 1)['status'] == EXPIRED
+    finally:
+        service.close()
+
+def test_cli_redeems_against_configured_ledger(tmp_path, monkeypatch, capsys):
+    settings, qr_text = issue_receipt(tmp_path, signing_key=None)
+    monkeypatch.setattr("services.redemption_service.Settings", lambda: settings)
+    assert main(["redeem", qr_text]) == 0
+    assert json.loads(capsys.readouterr().out)['status'] == REDEEMED
+    assert main(["redeem", qr_text]) == 2
+    assert main(["totals"]) == 0
+
+def test_benchmark_leaves_ledger_untouched(tmp_path):
+    settings, _ = issue_receipt(tmp_path)
+    timings = run_benchmark(str(settings.LEDGER_PATH), receipts=200)
+    assert set(timings) == {'lookup_p50_us', 'lookup_p95_us', 'redeem_p50_us', 'redeem_p95_us'}
+    service = RedemptionService(settings)
+    try:
+        assert service.lookup("bench-0") is None
+        assert service.lookup("qr-1")['redeemed_at'] is None
+    finally:
+        service.close()
@@ -0,0 +1,69 @@
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from src.services import resource_scheduler
+from src.services.resource_scheduler import ResourceScheduler
+
+class FakeTorch:
+    def __init__(self):
+        self.threads = []
+        self.interop = []
+
+    def set_num_threads(self, n):
+        self.threads.append(n)
+
+    def set_num_interop_threads(self, n):
+        if self.interop:
+            raise RuntimeError("cannot set number of interop threads after parallel work has started")
+        self.interop.append(n)
+
+@pytest.fixture
+def torch(monkeypatch):
+    fake = FakeTorch()
+    monkeypatch.setitem(sys.modules, "torch", fake)
+    monkeypatch.setattr(resource_scheduler.os, "cpu_count", lambda: 4)
+    return fake
+
+def make_scheduler(**overrides):
+    settings = dict(INFERENCE_RESERVED_CORES=1, INFERENCE_BUSY_THREADS=0, INFERENCE_IDLE_THREADS=1,
+                    INFERENCE_INTEROP_THREADS=1, INFERENCE_CPU_AFFINITY=False)
+    settings.update(overrides)
+    return ResourceScheduler(SimpleNamespace(**settings))
+
+def test_cores_split_between_io_and_inference(torch):
+    scheduler = make_scheduler()
+    assert scheduler.io_cores == [0]
+    assert scheduler.inference_cores == [1, 2, 3]
+    assert (scheduler.busy_threads, scheduler.idle_threads) == (3, 1)
+
+def test_busy_profile_while_any_lane_has_a_session(torch):
+    scheduler = make_scheduler()
+    scheduler.apply(ResourceScheduler.IDLE)
+    scheduler.session_started()
+    scheduler.session_started()
+    scheduler.session_ended()
+    assert scheduler.profile == ResourceScheduler.BUSY
+    scheduler.session_ended()
+    assert scheduler.profile == ResourceScheduler.IDLE
+    # An unmatched end neither reapplies the profile nor lets the count go negative
+    scheduler.session_ended()
+    scheduler.session_started()
+    assert scheduler.profile == ResourceScheduler.BUSY
+    assert torch.threads == [1, 3, 1, 3]
+    assert torch.interop == [1]
+
+def test_thread_counts_clamped_to_available_cores(torch):
+    scheduler = make_scheduler(INFERENCE_RESERVED_CORES=8, INFERENCE_BUSY_THREADS=16, INFERENCE_IDLE_THREADS=4)
+    # At least one core is always left for inference
+    assert scheduler.inference_cores == [3]
+    assert (scheduler.busy_threads, scheduler.idle_threads) == (1, 1)
+
+def test_environment_caps_thread_pools(torch, monkeypatch):
+    monkeypatch.delenv("OMP_NUM_THREADS", raising=False)
+    monkeypatch.setenv("MKL_NUM_THREADS", "2")
+    make_scheduler().configure_environment()
+    assert resource_scheduler.os.environ["OMP_NUM_THREADS"] == "3"
+    # An explicit setting wins
+    assert resource_scheduler.os.environ["MKL_NUM_THREADS"] == "2"
@@ -0,0 +1,92 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+
+from src.services.detection_service import DetectionService
+from src.services.result_cache import DetectionResultCache
+
+def cache_settings(**overrides):
+    settings = dict(DETECTION_CACHE_ENABLED=True, DETECTION_CACHE_SIZE=4, DETECTION_CACHE_DISTANCE=3,
+                    DETECTION_CACHE_TTL=10.0, DETECTION_CACHE_VERIFY_RATE=0.0,
+                    DETECTION_CACHE_ROI=(0.0, 0.0, 1.0, 1.0), CONFIDENCE_THRESHOLD=0.5,
+                    MATERIAL_TYPES=["plastic", "can"], BULK_OVERLAP_IOU=0.5)
+    settings.update(overrides)
+    return SimpleNamespace(**settings)
+
+def save_image(path, seed, noise=0):
+    """A random 8x8 pattern upscaled to a frame; ``noise`` adds small per-pixel jitter"""
+    rng = np.random.default_rng(seed)
+    image = cv2.resize(rng.integers(0, 255, (8, 9), dtype=np.uint8), (288, 256),
+                       interpolation=cv2.INTER_NEAREST)
+    if noise:
+        jitter = np.random.default_rng(seed + 1000).integers(-noise, noise + 1, image.shape)
+        image = np.clip(image.astype(int) + jitter, 0, 255).astype(np.uint8)
+    cv2.imwrite(str(path), cv2.cvtColor(image, cv2.COLOR_GRAY2BGR))
+    return str(path)
+
+def test_near_identical_frame_hits_and_different_frame_misses(tmp_path):
+    cache = DetectionResultCache(cache_settings())
+    first = save_image(tmp_path / "a.png", seed=1)
+    again = save_image(tmp_path / "a2.png", seed=1, noise=2)
+    other = save_image(tmp_path / "b.png", seed=2)
+
+    cache.store(cache.key(first), {'label': 'can', 'confidence': 0.95})
+    assert cache.lookup(cache.key(again)) == {'label': 'can', 'confidence': 0.95}
+    assert cache.lookup(cache.key(other)) is None
+    assert cache.stats()['hit_rate'] == 0.5
+
+def test_entries_expire_and_are_evicted(tmp_path):
+    cache = DetectionResultCache(cache_settings(DETECTION_CACHE_SIZE=2, DETECTION_CACHE_TTL=0.05))
+    keys = [cache.key(save_image(tmp_path / f"{n}.png", seed=n)) for n in range(3)]
+    for key in keys:
+        cache.store(key, {'label': 'plastic', 'confidence': 0.9})
+    assert cache.lookup(keys[0]) is None
+    assert cache.lookup(keys[2]) is not None
+    time.sleep(0.1)
+    assert cache.lookup(keys[2]) is None
+    assert cache.stats()['entries'] == 0
+
+class CountingDetector:
+    def __init__(self, build, label="can", confidence=0.95):
+        self.calls = []
+        self.result = build((label, confidence))
+
+    def detect_batch(self, paths):
+        self.calls.append(list(paths))
+        return [self.result for _ in paths]
+
+    def detect_objects(self, path):
+        return self.detect_batch([path])[0]
+
+def test_detection_service_reuses_results_until_reset(tmp_path, model_result):
+    detector = CountingDetector(model_result)
+    service = DetectionService(cache_settings(), detector=detector)
+    frames = [save_image(tmp_path / f"{n}.png", seed=1, noise=n) for n in range(3)]
+
+    detected, summary = service.process_images(frames)
+    assert detected and "FINAL CLASSIFICATION: CAN" in summary
+    # Near-identical frames in one call share the first frame's result
+    assert detector.calls == [frames[:1]]
+
+    # A retry of the same insertion is served from the cache
+    assert service.process_images(frames)[0]
+    assert len(detector.calls) == 1
+
+    # Once the item is credited the next one must be classified afresh
+    service.reset_cache()
+    service.process_images(frames)
+    assert len(detector.calls) == 2
+
+def test_rejected_results_are_not_cached(tmp_path, model_result):
+    detector = CountingDetector(model_result, confidence=0.6)
+    service = DetectionService(cache_settings(), detector=detector)
+    frames = [save_image(tmp_path / f"{n}.png", seed=1, noise=n) for n in range(3)]
+
+    assert not service.process_images(frames)[0]
+    assert service.is_inconclusive()
+    service.process_images(frames)
+    assert sum(len(call) for call in detector.calls) == 6
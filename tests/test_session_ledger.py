@@ -0,0 +1,117 @@
+import logging
+import sqlite3
+from types import SimpleNamespace
+
+from controllers.recycling_controller import RecyclingSession
+from src.main import MainController
+from src.services.session_ledger import SessionLedger
+from utils.bounded_queue import BoundedQueue
+
+def make_ledger(tmp_path):
+    settings = SimpleNamespace(LEDGER_PATH=tmp_path / "data" / "ledger.db", LEDGER_BATCH_SIZE=64,
+                               LEDGER_FLUSH_INTERVAL=0.01, QR_CODE_EXPIRE_MINUTES=30)
+    ledger = SessionLedger(settings)
+    ledger.start()
+    return ledger
+
+def test_open_session_is_recovered_after_restart(tmp_path):
+    ledger = make_ledger(tmp_path)
+    session = RecyclingSession(ledger=ledger, lane_id=1)
+    session_id = session.start_session()
+    for material in ("plastic", "can", "rejected", "plastic"):
+        session.add_item(material)
+    assert ledger.flush()
+    # Stop the writer without closing the session, as a crash would
+    ledger.close()
+
+    ledger = make_ledger(tmp_path)
+    try:
+        assert ledger.find_open_sessions(lane_id=0) == []
+        [(recovered_id, _, items)] = ledger.find_open_sessions(lane_id=1)
+        assert recovered_id == session_id
+        assert [material for material, _ in items] == ["plastic", "can", "rejected", "plastic"]
+
+        restored = RecyclingSession(ledger=ledger, lane_id=1)
+        restored.restore_session(recovered_id, items)
+        assert restored.get_session_data() == {
+            'plastic_count': 2, 'can_count': 1, 'rejected_count': 1,
+            'no_detection_count': 0, 'total_count': 3,
+        }
+
+        # Restoring must not record the items a second time
+        restored.add_item("can")
+        restored.close_session("qr-1")
+        assert ledger.flush()
+        assert ledger.find_open_sessions(lane_id=1) == []
+    finally:
+        ledger.close()
+
+    conn = sqlite3.connect(str(tmp_path / "data" / "ledger.db"))
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 5
+        assert conn.execute("SELECT status, qr_id FROM sessions").fetchone() == ("closed", "qr-1")
+        assert conn.execute(
+            "SELECT plastic_count, can_count, total_count FROM receipts WHERE qr_id = 'qr-1'"
+        ).fetchone() == (2, 2, 4)
+        hourly = dict(conn.execute("SELECT material, SUM(count) FROM hourly_totals GROUP BY material"))
+        assert hourly == {'plastic': 2, 'can': 2, 'rejected': 1}
+    finally:
+        conn.close()
+
+def test_abandoned_session_closed_without_receipt(tmp_path):
+    ledger = make_ledger(tmp_path)
+    try:
+        ledger.open_session("old")
+        ledger.record_item("old", "can")
+        ledger.close_session("old", None, status="abandoned")
+        assert ledger.flush()
+        assert ledger.find_open_sessions() == []
+    finally:
+        ledger.close()
+
+    conn = sqlite3.connect(str(tmp_path / "data" / "ledger.db"))
+    try:
+        assert conn.execute("SELECT status FROM sessions").fetchone() == ("abandoned",)
+        assert conn.execute("SELECT COUNT(*) FROM receipts").fetchone()[0] == 0
+    finally:
+        conn.close()
+
+def test_older_open_sessions_get_a_receipt_on_recovery(tmp_path):
+    ledger = make_ledger(tmp_path)
+    for session_id, materials in (("older", ["can", "plastic", "rejected"]), ("empty", ["rejected"]),
+                                  ("newest", ["can"])):
+        ledger.open_session(session_id)
+        for material in materials:
+            ledger.record_item(session_id, material)
+        assert ledger.flush()
+
+    uploads = []
+    controller = MainController.__new__(MainController)
+    controller.lane_id = 0
+    controller.logger = logging.getLogger("test-controller")
+    controller.ledger = ledger
+    controller.uploader = SimpleNamespace(enqueue_session=lambda *args: uploads.append(args))
+    controller.recycling_session = RecyclingSession(ledger=ledger)
+    controller.shared = SimpleNamespace(resources=SimpleNamespace(session_started=lambda: None))
+    controller.continuous = None
+    controller.ui_response_queue = BoundedQueue(8, name="test")
+    try:
+        controller._recover_sessions()
+        assert ledger.flush()
+        assert controller.recycling_session.session_id == "newest"
+    finally:
+        ledger.close()
+
+    [(qr_id, session_id, counts, items)] = uploads
+    assert session_id == "older" and counts['total_count'] == 2
+    conn = sqlite3.connect(str(tmp_path / "data" / "ledger.db"))
+    try:
+        assert dict(conn.execute("SELECT session_id, status FROM sessions")) == {
+            'older': "abandoned", 'empty': "abandoned", 'newest': "open"}
+        assert conn.execute("SELECT session_id, plastic_count, can_count FROM receipts WHERE qr_id = ?",
+                            (qr_id,)).fetchone() == ("older", 1, 1)
+        # No credited items, so nothing to redeem
+        assert conn.execute("SELECT COUNT(*) FROM receipts").fetchone()[0] == 1
+        assert conn.execute("SELECT COUNT(*) FROM items WHERE session_id = 'empty'").fetchone()[0] == 1
+    finally:
+        conn.close()
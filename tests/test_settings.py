@@ -0,0 +1,48 @@
+import json
+
+import pytest
+
+from src.config.settings import CONFIG_FILE_ENV, LaneSettings, Settings
+
+@pytest.fixture
+def settings(tmp_path, monkeypatch):
+    """Settings reading an empty temporary config file, reset before and after the test"""
+    config_file = tmp_path / "rvm_config.json"
+    config_file.write_text("{}")
+    monkeypatch.setenv(CONFIG_FILE_ENV, str(config_file))
+    for name in ("RVM_BAUD_RATE", "RVM_MATERIAL_TYPES", "RVM_DETECTION_CACHE_ENABLED"):
+        monkeypatch.delenv(name, raising=False)
+    Settings.reload()
+    yield config_file
+    Settings.reload()
+
+def test_environment_overrides_config_file_over_default(settings, monkeypatch):
+    assert Settings.BAUD_RATE == 9600
+
+    settings.write_text(json.dumps({"BAUD_RATE": 57600}))
+    Settings.reload()
+    assert Settings.BAUD_RATE == 57600
+
+    monkeypatch.setenv("RVM_BAUD_RATE", "115200")
+    Settings.reload()
+    assert Settings.BAUD_RATE == 115200
+
+def test_values_take_the_type_of_their_default(settings, monkeypatch):
+    monkeypatch.setenv("RVM_MATERIAL_TYPES", "plastic, can, glass")
+    monkeypatch.setenv("RVM_DETECTION_CACHE_ENABLED", "yes")
+    assert Settings.MATERIAL_TYPES == ["plastic", "can", "glass"]
+    assert Settings.DETECTION_CACHE_ENABLED is True
+
+def test_values_are_resolved_once_until_reload(settings, monkeypatch):
+    assert Settings.BAUD_RATE == 9600
+    monkeypatch.setenv("RVM_BAUD_RATE", "115200")
+    assert Settings.BAUD_RATE == 9600
+    Settings.reload()
+    assert Settings.BAUD_RATE == 115200
+
+def test_lane_overrides_fall_back_to_shared_settings(settings):
+    lane = LaneSettings(Settings(), 2, {"BAUD_RATE": "19200"})
+    assert lane.BAUD_RATE == 19200
+    assert lane.WEB_UI_PORT == Settings.WEB_UI_PORT + 2
+    assert lane.IMAGE_SAVE_PATH == Settings.IMAGE_SAVE_PATH / "lane_2"
+    assert lane.MATERIAL_TYPES == Settings.MATERIAL_TYPES
@@ -0,0 +1,146 @@
+import json
+import sqlite3
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+from src.services.upload_service import UploadQueue
+
+class IngestServer:
+    """Local stand-in for the upload endpoint; ``respond`` picks each status"""
+
+    def __init__(self, respond, port=0):
+        self.respond = respond
+        self.requests = []
+        self.delivered = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                keys = [record["idempotency_key"] for record in body["records"]]
+                server.requests.append(keys)
+                status = server.respond(len(server.requests), keys)
+                if status is None:
+                    # Drop the connection without answering
+                    self.close_connection = True
+                    return
+                if 200 <= status < 300:
+                    server.delivered.extend(keys)
+                self.send_response(status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        ThreadingHTTPServer.allow_reuse_address = True
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.port = self.httpd.server_address[1]
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+def make_queue(tmp_path, port, **overrides):
+    settings = dict(UPLOAD_URL=f"http://127.0.0.1:{port}/ingest", UPLOAD_AUTH_TOKEN=None,
+                    UPLOAD_DB_PATH=tmp_path / "outbox.db", UPLOAD_BATCH_SIZE=3,
+                    UPLOAD_INTERVAL=0.02, UPLOAD_MAX_BACKOFF=0.1, UPLOAD_TIMEOUT=2.0,
+                    UPLOAD_MAX_DB_MB=50, UPLOAD_MAX_ATTEMPTS=2, MACHINE_ID="test")
+    settings.update(overrides)
+    return UploadQueue(SimpleNamespace(**settings))
+
+def wait_until(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+@pytest.fixture
+def servers():
+    started = []
+    yield started
+    for server in started:
+        server.close()
+
+def test_records_survive_server_errors_and_dropped_connections(tmp_path, servers):
+    outage = {1: 503, 2: None, 3: 502}
+    server = IngestServer(lambda n, keys: outage.get(n, 200))
+    servers.append(server)
+    queue = make_queue(tmp_path, server.port)
+    queue.start()
+    try:
+        keys = [f"qr-{n}" for n in range(5)]
+        for key in keys:
+            queue.enqueue(key, {'qr_id': key})
+        assert wait_until(lambda: sorted(server.delivered) == keys)
+    finally:
+        queue.stop()
+    assert queue.pending() == 0
+    assert queue.failed_attempts >= 3
+    assert queue.uploaded == 5
+
+def test_records_kept_while_server_is_down(tmp_path, servers):
+    probe = IngestServer(lambda n, keys: 200)
+    port = probe.port
+    probe.close()
+
+    queue = make_queue(tmp_path, port)
+    queue.start()
+    try:
+        queue.enqueue("qr-1", {'qr_id': "qr-1"})
+        assert wait_until(lambda: queue.failed_attempts >= 2)
+        assert queue.pending() == 1
+
+        server = IngestServer(lambda n, keys: 200, port=port)
+        servers.append(server)
+        assert wait_until(lambda: server.delivered == ["qr-1"])
+    finally:
+        queue.stop()
+    assert queue.pending() == 0
+
+def test_permanently_rejected_record_is_dead_lettered(tmp_path, servers):
+    server = IngestServer(lambda n, keys: 400 if "bad" in keys else 200)
+    servers.append(server)
+    queue = make_queue(tmp_path, server.port)
+    queue.start()
+    try:
+        for key in ("qr-1", "bad", "qr-2", "qr-3", "qr-4"):
+            queue.enqueue(key, {'qr_id': key})
+        assert wait_until(lambda: queue.dead_lettered == 1
+                          and sorted(server.delivered) == ["qr-1", "qr-2", "qr-3", "qr-4"])
+    finally:
+        queue.stop()
+
+    assert queue.pending() == 0
+    conn = sqlite3.connect(str(tmp_path / "outbox.db"))
+    try:
+        assert conn.execute("SELECT idempotency_key, attempts, status FROM dead_letter").fetchall() == [
+            ("bad", 2, 400)
+        ]
+    finally:
+        conn.close()
+    # The bad record was isolated, so it was sent on its own exactly UPLOAD_MAX_ATTEMPTS - 1 times
+    assert server.requests.count(["bad"]) == 1
+
+def test_conflict_counts_as_delivered(tmp_path, servers):
+    server = IngestServer(lambda n, keys: 409)
+    servers.append(server)
+    queue = make_queue(tmp_path, server.port)
+    queue.start()
+    try:
+        queue.enqueue("qr-1", {'qr_id': "qr-1"})
+        assert wait_until(lambda: queue.uploaded == 1)
+    finally:
+        queue.stop()
+    assert queue.pending() == 0
+    assert queue.dead_lettered == 0
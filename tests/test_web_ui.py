@@ -0,0 +1,150 @@
+import http.client
+import json
+import threading
+from queue import Queue
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("qrcode")
+pytest.importorskip("PIL")
+
+from services.qr_service import QRService
+from ui.messages import DetectionResult, DisplayQR, RestartUI, SessionData, SessionStarted, SystemShutdown
+from ui.web_ui import WebKioskUI
+
+class EventStream:
+    """Minimal server-sent events client"""
+
+    def __init__(self, port):
+        self.conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+        self.conn.request("GET", "/events")
+        self.response = self.conn.getresponse()
+        assert self.response.status == 200
+        assert self.response.getheader("Content-Type") == "text/event-stream"
+
+    def next(self):
+        """(event, data) of the next event, skipping keepalive comments; None at end of stream"""
+        event = data = None
+        while True:
+            line = self.response.fp.readline().decode("utf-8")
+            if not line:
+                return None
+            line = line.rstrip("\n")
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                data = json.loads(line[len("data: "):])
+            elif line == "" and event is not None:
+                return event, data
+
+    def close(self):
+        self.conn.close()
+
+@pytest.fixture
+def kiosk(tmp_path):
+    settings = SimpleNamespace(WEB_UI_HOST="127.0.0.1", WEB_UI_PORT=0, WEB_UI_QR_CACHE=2,
+                               QR_OUTPUT_DIR=tmp_path, QR_SIGNING_KEY=None)
+    commands, responses = Queue(), Queue()
+    ui = WebKioskUI(commands, responses, settings=settings)
+    thread = threading.Thread(target=ui.run, daemon=True)
+    thread.start()
+    kiosk = SimpleNamespace(ui=ui, commands=commands, responses=responses, thread=thread,
+                            port=ui.server.server_address[1], settings=settings)
+    yield kiosk
+    responses.put(SystemShutdown())
+    thread.join(timeout=5)
+
+def request(port, method, path, body=None, headers=None):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    try:
+        conn.request(method, path, body=body, headers=headers or {})
+        response = conn.getresponse()
+        return response.status, response.getheader("Content-Type"), response.read()
+    finally:
+        conn.close()
+
+def test_session_is_pushed_to_the_page(kiosk):
+    stream = EventStream(kiosk.port)
+    try:
+        assert stream.next() == ("session", {'active': False})
+
+        kiosk.responses.put(SessionStarted())
+        assert stream.next() == ("session", {'active': True})
+        assert stream.next() == ("counts", {})
+
+        kiosk.responses.put(SessionData(counts={'can_count': 1, 'total_count': 1}))
+        kiosk.responses.put(DetectionResult(text="Item accepted: can"))
+        assert stream.next() == ("counts", {'can_count': 1, 'total_count': 1})
+        assert stream.next() == ("detection", {'text': "Item accepted: can"})
+
+        counts = {'plastic_count': 1, 'can_count': 1, 'total_count': 2}
+        image, qr_id = QRService(kiosk.settings).generate_qr_image(counts)
+        kiosk.responses.put(DisplayQR(image, counts, qr_id))
+        assert stream.next() == ("session", {'active': False})
+        event, receipt = stream.next()
+        assert event == "receipt" and receipt['qr_id'] == qr_id
+
+        status, content_type, body = request(kiosk.port, "GET", receipt['png'])
+        assert (status, content_type) == (200, "image/png") and body.startswith(b"\x89PNG")
+        status, content_type, body = request(kiosk.port, "GET", receipt['svg'])
+        assert (status, content_type) == (200, "image/svg+xml") and body.startswith(b"<svg")
+
+        kiosk.responses.put(SystemShutdown())
+        assert stream.next() == ("shutdown", {})
+        assert stream.next() is None
+    finally:
+        stream.close()
+
+def test_new_client_gets_a_snapshot(kiosk):
+    kiosk.responses.put(SessionStarted())
+    kiosk.responses.put(SessionData(counts={'plastic_count': 2}))
+    first = EventStream(kiosk.port)
+    try:
+        # Wait until the first client sees the counts so the state is settled
+        while first.next() != ("counts", {'plastic_count': 2}):
+            pass
+    finally:
+        first.close()
+
+    late = EventStream(kiosk.port)
+    try:
+        assert late.next() == ("session", {'active': True})
+        assert late.next() == ("counts", {'plastic_count': 2})
+    finally:
+        late.close()
+
+def test_commands_are_forwarded(kiosk):
+    token = {"X-Kiosk-Token": kiosk.ui.token}
+    assert request(kiosk.port, "POST", "/command", b"START_SESSION", token)[0] == 204
+    assert kiosk.commands.get(timeout=1) == "START_SESSION"
+    assert request(kiosk.port, "POST", "/command", b"QUIT", token)[0] == 400
+    assert request(kiosk.port, "POST", "/command", b"X" * 1000, token)[0] == 400
+    assert request(kiosk.port, "POST", "/other", b"START_SESSION", token)[0] == 404
+    assert kiosk.commands.empty()
+
+def test_commands_need_the_page_token_and_origin(kiosk):
+    page = request(kiosk.port, "GET", "/")[2]
+    assert kiosk.ui.token.encode("ascii") in page
+
+    assert request(kiosk.port, "POST", "/command", b"START_SESSION")[0] == 403
+    assert request(kiosk.port, "POST", "/command", b"START_SESSION", {"X-Kiosk-Token": "guess"})[0] == 403
+    # A page on another site cannot post, even if it learned the token
+    foreign = {"X-Kiosk-Token": kiosk.ui.token, "Origin": "http://example.com"}
+    assert request(kiosk.port, "POST", "/command", b"START_SESSION", foreign)[0] == 403
+    assert kiosk.commands.empty()
+
+    same_origin = {"X-Kiosk-Token": kiosk.ui.token, "Origin": f"http://127.0.0.1:{kiosk.port}"}
+    assert request(kiosk.port, "POST", "/command", b"END_SESSION", same_origin)[0] == 204
+    assert kiosk.commands.get(timeout=1) == "END_SESSION"
+
+def test_restart_returns_from_run_like_tk(kiosk):
+    kiosk.responses.put(RestartUI())
+    kiosk.thread.join(timeout=5)
+    assert not kiosk.thread.is_alive()
+    assert kiosk.ui.restart_requested
+
+def test_unknown_receipt_is_not_found(kiosk):
+    assert request(kiosk.port, "GET", "/qr/missing.png")[0] == 404
+    status, content_type, body = request(kiosk.port, "GET", "/")
+    assert status == 200 and b"EventSource" in body